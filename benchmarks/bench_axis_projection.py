@@ -0,0 +1,86 @@
+"""
+Projection of the persistent scatters onto the deck axes by `DBPipeline.relate_axis_pspoints` with NumPy against the previous `ST_ShortestLine` query.
+
+The toy data set is preprocessed up to the relation of the points with the decks, then both versions project the same points and their projected points and normalized distances are compared.
+
+Usage:
+    python benchmarks/bench_axis_projection.py --points 100000 1000000
+"""
+import time
+import argparse
+import tempfile
+
+from synthetic import write_ps_pair, damage_assessment
+from safebridge.pipeline import DBPipeline
+
+
+class SQLPipeline(DBPipeline):
+    """ DBPipeline with the SQL version of the axis projection. """
+
+    def relate_axis_pspoints(self):
+        self.connection.execute(f"""
+            CREATE OR REPLACE TEMP TABLE scatter_axis AS
+            SELECT ps_table, p_uid, (ST_Distance(ST_StartPoint(lgeom), proj_axis)/linelen)::FLOAT AS ndist_axis, proj_axis
+            FROM (
+                SELECT second.ps_table, second.uid as p_uid, first.geom as lgeom, first.length as linelen,
+                    ST_EndPoint(ST_ShortestLine(second.geom, first.geom)) as proj_axis
+                FROM (SELECT * FROM proc_{self.damage.axis.table_name} QUALIFY row_number() OVER (PARTITION BY rdeck ORDER BY uid) = 1) AS first
+                JOIN ({self.scatter_union("uid, geom, rdeck")}) AS second
+                ON first.rdeck = second.rdeck
+            );
+        """)
+        for obj in self.scatters:
+            self.connection.execute(f"""
+                CREATE OR REPLACE TABLE proc_{obj.table_name} AS
+                SELECT first.*, second.ndist_axis, second.proj_axis
+                FROM proc_{obj.table_name} AS first
+                LEFT JOIN (SELECT p_uid, ndist_axis, proj_axis FROM scatter_axis WHERE ps_table = '{obj.table_name}') AS second
+                ON first.uid = second.p_uid;
+            """)
+        self.connection.execute("DROP TABLE scatter_axis")
+
+
+def timed(pipeline: DBPipeline, tables: list[str]) -> float:
+    """ Restore the related point tables and time the projection of the pipeline. """
+    for table_name in tables:
+        pipeline.connection.execute(f"CREATE OR REPLACE TABLE proc_{table_name} AS SELECT * FROM related_{table_name}")
+    st = time.time()
+    pipeline.relate_axis_pspoints()
+    return time.time() - st
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type = int, nargs = "+", default = [100_000, 1_000_000], help = "number of points of each orbit")
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as folder:
+        for n_points in args.points:
+            assessment = damage_assessment(*write_ps_pair(folder, n_points, 2), workspace_root = folder)
+            assessment.load_source_files()
+            pipeline = DBPipeline(assessment.damage, assessment.db.con)
+            for name, stage in pipeline.stages("EPSG:28992", 6):
+                stage()
+                if name == "relate_deck_pspoints":
+                    break
+            connection = assessment.db.con
+            tables = [obj.table_name for obj in pipeline.scatters]
+            for table_name in tables:
+                connection.execute(f"CREATE TABLE related_{table_name} AS SELECT * FROM proc_{table_name}")
+
+            sql = timed(SQLPipeline(assessment.damage, connection), tables)
+            for table_name in tables:
+                connection.execute(f"CREATE OR REPLACE TABLE sql_{table_name} AS SELECT uid, ndist_axis, proj_axis FROM proc_{table_name}")
+            vectorized = timed(pipeline, tables)
+
+            related, ndist_error, proj_error = connection.sql(" UNION ALL ".join(f"""
+                SELECT first.uid, abs(first.ndist_axis - second.ndist_axis) AS ndist_error, ST_Distance(first.proj_axis, second.proj_axis) AS proj_error
+                FROM proc_{table_name} AS first JOIN sql_{table_name} AS second ON first.uid = second.uid
+            """ for table_name in tables)).aggregate("COUNT(*), max(ndist_error), max(proj_error)").fetchone()
+            rows.append((n_points, related, sql, vectorized, ndist_error, proj_error))
+            connection.close()
+
+    print(f"\n{'points':>10}{'related':>10}{'SQL [s]':>10}{'NumPy [s]':>11}{'speedup':>9}{'max ndist diff':>16}{'max proj diff':>15}")
+    for n_points, related, sql, vectorized, ndist_error, proj_error in rows:
+        print(f"{n_points:>10}{related:>10}{sql:>10.2f}{vectorized:>11.2f}{sql / vectorized:>9.1f}{ndist_error:>16.2e}{proj_error:>15.2e}")
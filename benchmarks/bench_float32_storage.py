@@ -0,0 +1,62 @@
+"""
+Load time, database size and in-memory size of the persistent scatter tables with DOUBLE and FLOAT displacement columns.
+
+The database file is compressed by DuckDB, the displacements written with a fixed number of decimals compress well in both types, so the difference is mostly visible in the uncompressed displacement matrix read by the solvers and stored in the displacement cubes.
+
+Usage:
+    python benchmarks/bench_float32_storage.py --points 200000 --epochs 200
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+import numpy as np
+
+from synthetic import write_ps_pair, damage_assessment
+
+
+def run(ascending_file: str, descending_file: str, layout: str, displacement_type: str, workspace_root: str) -> dict:
+    """ Load the synthetic files and measure the loading time, the size of the database file and the time and size of reading the ascending displacement matrix. """
+    assessment = damage_assessment(ascending_file, descending_file, workspace_root, time_series_layout = layout, displacement_type = displacement_type)
+    st = time.time()
+    assessment.load_source_files()
+    elapsed = time.time() - st
+    assessment.db.con.execute("CHECKPOINT")
+
+    st = time.time()
+    if layout == "array":
+        matrix = assessment.db.con.sql("SELECT unnest(ts) AS value FROM ascending").fetchnumpy()['value']
+    else:
+        fields = assessment._extract_dates(assessment.db.con.sql("SELECT * FROM ascending LIMIT 0").columns)[0]
+        columns = assessment.db.con.sql(f"SELECT {', '.join(fields)} FROM ascending").fetchnumpy()
+        matrix = np.column_stack([columns[field] for field in fields])
+    fetch = time.time() - st
+
+    db_path = assessment.db._db_path
+    assessment.db.con.close()
+    size = os.path.getsize(db_path)
+    shutil.rmtree(os.path.dirname(db_path))
+    return dict(layout = layout, displacement_type = displacement_type, load_seconds = elapsed, db_megabytes = size / 1024**2, fetch_seconds = fetch, matrix_megabytes = matrix.nbytes / 1024**2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type = int, default = 100_000, help = "number of points of each orbit")
+    parser.add_argument("--epochs", type = int, default = 150, help = "number of acquisition dates of each orbit")
+    parser.add_argument("--repeat", type = int, default = 3, help = "number of runs of each configuration, the fastest one is reported")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as folder:
+        ascending_file, descending_file = write_ps_pair(folder, args.points, args.epochs)
+        print(f"Source files: 2 x {os.path.getsize(ascending_file) / 1024**2:.1f} MB, {args.points} points, {args.epochs} epochs")
+
+        rows = []
+        for layout in ["columns", "array"]:
+            for displacement_type in ["DOUBLE", "FLOAT"]:
+                runs = [run(ascending_file, descending_file, layout, displacement_type, folder) for _ in range(args.repeat)]
+                rows.append(min(runs, key = lambda row: row["load_seconds"]))
+
+    print(f"\n{'layout':<10}{'type':<8}{'load [s]':>10}{'db [MB]':>10}{'fetch [s]':>11}{'matrix [MB]':>13}")
+    for row in rows:
+        print(f"{row['layout']:<10}{row['displacement_type']:<8}{row['load_seconds']:>10.2f}{row['db_megabytes']:>10.1f}{row['fetch_seconds']:>11.2f}{row['matrix_megabytes']:>13.1f}")
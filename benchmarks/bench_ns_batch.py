@@ -0,0 +1,67 @@
+"""
+Quadratic fits of the NS decks with `NS_BatchSolver` against one `NS_Solver` per deck.
+
+Random decks with a parabolic displacement profile and noise are fitted with both solvers. The time covers the fits, the tilt, the deflection and the 50 point curves stored in the `result` table, the analytical beam curves are fitted per deck by both and are not included. The tilt and the deflection of the solvers are compared, the deflection of the batch solver is the exact maximum over the deck instead of the maximum over 50 points.
+
+Usage:
+    python benchmarks/bench_ns_batch.py --decks 1000 10000 --points 50
+"""
+import time
+import argparse
+import numpy as np
+
+from safebridge.solvers import NS_Solver, NS_BatchSolver
+
+
+def random_decks(n_decks: int, n_points: int, seed: int = 0) -> tuple:
+    """ The flat points of random decks with 3 to 2 * n_points points each. """
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(3, 2 * n_points, n_decks)
+    index = np.repeat(np.arange(n_decks), counts)
+    ndist = np.concatenate([np.sort(rng.uniform(0, 1, count)) for count in counts])
+    curvature = rng.normal(0, 10, n_decks)
+    disp = curvature[index] * (ndist - 0.5) ** 2 + rng.normal(0, 2, ndist.size)
+    return ndist, disp, index, rng.uniform(10, 200, n_decks), rng.integers(1, 3, n_decks)
+
+
+def per_deck(ndist, disp, index, deck_length, span_count) -> tuple:
+    """ The tilt, the deflection and the curves of every deck with its own NS_Solver. """
+    starts = np.searchsorted(index, np.arange(deck_length.size))
+    ends = np.append(starts[1:], index.size)
+    tilt, deflection = [], []
+    for deck, (st, ed) in enumerate(zip(starts, ends)):
+        points = dict(ndist = ndist[st:ed], disp = disp[st:ed])
+        solver = NS_Solver(dict(deck = dict(deck_length = deck_length[deck:deck + 1], span_count = span_count[deck:deck + 1]), ascending = points, descending = points))
+        tilt.append(solver.quadratic_tilt('ascending'))
+        deflection.append(solver.quadratic_deflection('ascending'))
+        solver._quadratic_x('ascending'), solver._quadratic_y('ascending')
+    return np.array(tilt), np.array(deflection)
+
+
+def batch(ndist, disp, index, deck_length, span_count) -> tuple:
+    """ The tilt, the deflection and the curves of all decks with one NS_BatchSolver. """
+    solver = NS_BatchSolver(ndist, disp, index, deck_length, span_count)
+    solver._quadratic_x(), solver._quadratic_y()
+    return solver.quadratic_tilt(), solver.quadratic_deflection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--decks", type = int, nargs = "+", default = [1_000, 10_000], help = "number of decks")
+    parser.add_argument("--points", type = int, default = 50, help = "mean number of points of a deck")
+    args = parser.parse_args()
+
+    rows = []
+    for n_decks in args.decks:
+        data = random_decks(n_decks, args.points)
+        st = time.time()
+        tilt, deflection = per_deck(*data)
+        single = time.time() - st
+        st = time.time()
+        batch_tilt, batch_deflection = batch(*data)
+        batched = time.time() - st
+        rows.append((n_decks, data[0].size, single, batched, np.abs(batch_tilt - tilt).max() / np.abs(tilt).max(), ((batch_deflection - deflection) / deflection).max()))
+
+    print(f"\n{'decks':>8}{'points':>10}{'NS_Solver [s]':>15}{'batch [s]':>11}{'speedup':>9}{'tilt diff':>11}{'deflection diff':>17}")
+    for n_decks, n_points, single, batched, tilt_error, deflection_error in rows:
+        print(f"{n_decks:>8}{n_points:>10}{single:>15.3f}{batched:>11.4f}{single / batched:>9.0f}{tilt_error:>11.1e}{deflection_error:>17.1e}")
@@ -0,0 +1,39 @@
+"""
+Wall time of `DamageAssessment.run_tiled` with an increasing number of worker processes.
+
+The toy decks with synthetic persistent scatters are split into the same number of partitions for every run, so the runs differ only by the number of processes. The single process run preprocesses and assesses the partitions one after the other.
+
+Usage:
+    python benchmarks/bench_partition_processes.py --points 200000 --epochs 100 --processes 1 2 4 8
+"""
+import os
+import time
+import argparse
+import tempfile
+
+from synthetic import write_ps_pair, damage_assessment
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type = int, default = 100_000, help = "number of points of each orbit")
+    parser.add_argument("--epochs", type = int, default = 100, help = "number of acquisition dates of each orbit")
+    parser.add_argument("--processes", type = int, nargs = "+", default = [1, 2, 4], help = "numbers of worker processes")
+    parser.add_argument("--partitions", type = int, default = 16, help = "number of partitions of every run")
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as folder:
+        ascending_file, descending_file = write_ps_pair(folder, args.points, args.epochs)
+        for processes in args.processes:
+            assessment = damage_assessment(ascending_file, descending_file, workspace_root = folder)
+            assessment.load_source_files()
+            st = time.time()
+            assessment.run_tiled("EPSG:28992", 6, partitions = args.partitions, processes = processes)
+            rows.append((processes, time.time() - st, assessment.db.con.sql("SELECT COUNT(*) FROM result").fetchone()[0]))
+            assessment.db.con.close()
+
+    print(f"\nCPU count: {os.cpu_count()}")
+    print(f"{'processes':>10}{'time [s]':>10}{'speedup':>9}{'decks':>7}")
+    for processes, elapsed, decks in rows:
+        print(f"{processes:>10}{elapsed:>10.2f}{rows[0][1] / elapsed:>9.2f}{decks:>7}")
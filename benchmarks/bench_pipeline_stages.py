@@ -0,0 +1,349 @@
+"""
+Per-stage timing of the `CREATE TABLE AS SELECT` stages of `DBPipeline` against the former `ALTER TABLE ... ADD COLUMN` and `UPDATE ... FROM` stages.
+
+The former stages are kept in `UpdatePipeline` below as they were before the stages were rebuilt, both pipelines run the same stage list of `DBPipeline.stages` on the same synthetic data.
+
+Usage:
+    python benchmarks/bench_pipeline_stages.py --points 200000 --epochs 20
+"""
+import time
+import shutil
+import argparse
+import tempfile
+
+from synthetic import write_ps_pair, damage_assessment
+from safebridge.pipeline import DBPipeline
+from safebridge.gis_ops import *
+
+
+class UpdatePipeline(DBPipeline):
+    """ The pipeline stages that add the derived columns with `ALTER TABLE` and fill them with `UPDATE` statements. """
+
+    def process_axis(self):
+        """ Process the axis data by reordering vertices and calculating length and azimuth.
+
+        This method ensures that the axis geometries start from the leftmost point on north oriented map, and adds length and azimuth columns to the axis table.
+        
+        Raises
+        ------
+        ValueError: If the axis table does not exist or is empty.
+        """
+        self.connection.execute(f"""\
+            -- Reorder the axis geometries based on the centroid
+            -- This ensures that the axis starts from the leftmost point in north aligned map view.
+                        
+            UPDATE proc_{self.damage.axis.table_name} SET geom = CASE
+                WHEN ST_Y(ST_StartPoint(geom)) > ST_Y(ST_Centroid(geom)) 
+                    THEN ST_Reverse(geom) 
+                WHEN ST_Y(ST_StartPoint(geom)) = ST_Y(ST_Centroid(geom)) AND ST_X(ST_StartPoint(geom)) > ST_X(ST_Centroid(geom)) 
+                    THEN ST_Reverse(geom) 
+                ELSE 
+                    geom
+            END;
+        
+            -- Add length and azimuth columns to the axis table
+                        
+            ALTER TABLE proc_{self.damage.axis.table_name} ADD COLUMN length FLOAT;
+            ALTER TABLE proc_{self.damage.axis.table_name} ADD COLUMN azimuth FLOAT;
+            UPDATE proc_{self.damage.axis.table_name}
+            SET length = ST_Distance(ST_StartPoint(geom), ST_EndPoint(geom)),
+                azimuth = degrees(2*pi() + pi()/2 - atan2(ST_Y(ST_EndPoint(geom)) - ST_Y(ST_StartPoint(geom)), ST_X(ST_EndPoint(geom)) - ST_X(ST_StartPoint(geom))) % (2*pi())) % 360 ;
+        """)
+
+        print(f"Geometries in proc_{self.damage.axis.table_name} have been reordered based on the axis centroid for further evaluation.")
+        print(f"Length and azimuth columns have been added to proc_{self.damage.axis.table_name} table.")
+
+    def process_deck(self, buffer_distance:float):
+        """ Process the deck data by generating mulitple attiributes.
+
+        This method calculates the span count for each deck geometry based on overlaps with support,
+        establishes the relation between support and deck, creates buffer, and relates deck with axis.
+        
+        Arguments
+        ---------
+        buffer_distance : float
+            The distance to buffer geometries in meters.
+        """
+        
+        self.connection.execute(f"""
+            -- Calculate the span count for each deck geometry based on overlaps with support geometries
+                        
+            ALTER TABLE proc_{self.damage.deck.table_name} ADD COLUMN span_count INTEGER;
+            UPDATE proc_{self.damage.deck.table_name} 
+            SET span_count = COALESCE(second.overlap + 1, 1)
+            FROM (
+                SELECT first.uid, COUNT(second.uid) AS overlap
+                FROM proc_{self.damage.deck.table_name} AS first
+                LEFT JOIN proc_{self.damage.support.table_name} AS second
+                ON ST_Overlaps(first.geom, second.geom)
+                GROUP BY first.uid
+            ) AS second
+            WHERE proc_{self.damage.deck.table_name}.uid = second.uid;
+        
+            
+            -- Establish the relation between support and deck geometries
+
+            ALTER TABLE proc_{self.damage.support.table_name} ADD COLUMN rdeck INTEGER;
+            UPDATE proc_{self.damage.support.table_name}
+            SET rdeck = second.rdeck
+            FROM (
+                SELECT first.uid as sup_uid, second.uid AS rdeck
+                FROM proc_{self.damage.support.table_name} AS first
+                JOIN proc_{self.damage.deck.table_name} AS second
+                ON ST_Intersects(first.geom, second.geom)
+            ) AS second
+            WHERE proc_{self.damage.support.table_name}.uid = second.sup_uid;
+            
+            -- if not related deck exists remove the support geometries
+            DELETE FROM proc_{self.damage.support.table_name} WHERE rdeck IS NULL;
+    
+            
+            -- Create buffer geometries for the deck geometries
+            
+            ALTER TABLE proc_{self.damage.deck.table_name} ADD COLUMN buffer GEOMETRY;
+            UPDATE proc_{self.damage.deck.table_name} 
+            SET buffer = ST_Buffer(geom, {buffer_distance});
+        """)
+        print(f"Span count has been calculated for proc_{self.damage.deck.table_name} table.")
+        print(f"The relation between {self.damage.support.table_name} and {self.damage.deck.table_name} has been established.")
+        print(f"Buffer geometries have been created for proc_{self.damage.deck.table_name} table with a distance of {buffer_distance}.")
+
+    def relate_deck_axis(self):
+        """ Data pipelines to relate deck and axis geometries.
+        
+        This method establishes the relation between deck and axis geometries, adding deck_edge, deck_length, buffer_edge, and orientation columns to the deck table, and rdeck column to the axis table. It calculates the deck_edge, deck_length, and buffer_edge based on the intersection of deck and axis geometries, and determines the orientation based on the azimuth of the axis geometry.
+        """
+
+        self.connection.execute(f"""
+            -- Establish the relation between deck and axis geometries
+            -- Add raxis column to the deck table and calculate deck_edge, deck_length, and buffer_edge
+            -- Update the deck table with the related axis geometries
+            
+            ALTER TABLE proc_{self.damage.deck.table_name} ADD COLUMN deck_edge GEOMETRY;
+            ALTER TABLE proc_{self.damage.deck.table_name} ADD COLUMN deck_length FLOAT;
+            ALTER TABLE proc_{self.damage.deck.table_name} ADD COLUMN buffer_edge GEOMETRY;
+            ALTER TABLE proc_{self.damage.deck.table_name} ADD COLUMN orientation CHAR(2);
+            UPDATE proc_{self.damage.deck.table_name} 
+            SET deck_edge = second.deck_edge,
+                deck_length = second.deck_length,
+                buffer_edge = second.buffer_edge,
+                orientation = second.orient
+            FROM (
+                SELECT 
+                    first.uid, 
+                    ST_Intersection(first.geom, second.geom) AS deck_edge,
+                    ST_Length(ST_Intersection(first.geom, second.geom)) AS deck_length,
+                    ST_Intersection(first.buffer, second.geom) AS buffer_edge,
+                    CASE 
+                        WHEN
+                            (second.azimuth >= 0 AND second.azimuth <= 45) OR
+                            (second.azimuth >= 315 AND second.azimuth <= 360) OR
+                            (second.azimuth >= 135 AND second.azimuth <= 225)
+                        THEN 'NS'
+                        ELSE 'EW'
+                    END AS orient
+                FROM proc_{self.damage.deck.table_name} AS first
+                JOIN proc_{self.damage.axis.table_name} AS second
+                ON ST_Intersects(first.geom, second.geom)
+            ) AS second
+            WHERE proc_{self.damage.deck.table_name}.uid = second.uid;
+            
+            -- if not related axis exists remove the deck geometries
+            DELETE FROM proc_{self.damage.deck.table_name} WHERE orientation IS NULL;
+        
+            
+            -- Add rdeck column to the axis table and update it with the related deck geometries
+                            
+            ALTER TABLE proc_{self.damage.axis.table_name} ADD COLUMN rdeck INTEGER;
+            UPDATE proc_{self.damage.axis.table_name}
+            SET rdeck = second.related
+            FROM (
+                SELECT first.uid as uid, second.uid AS related
+                FROM proc_{self.damage.axis.table_name} AS first
+                JOIN proc_{self.damage.deck.table_name} AS second
+                ON ST_Intersects(first.geom, second.geom)
+            ) AS second
+            WHERE proc_{self.damage.axis.table_name}.uid = second.uid;
+        """)
+        print(f"The relation between {self.damage.deck.table_name} and {self.damage.axis.table_name} has been established.")
+
+    def create_sectors(self):
+        """ Create sectors from the deck geometries, calculating centroids and normalized distances.
+
+        This method extracts relevant data from the deck table, creates a sequence for sector IDs, and generates a sectors table with `geometry`, `sector_tag`, and `rdeck` columns. It also calculates centroids for each sector based on the deck edges and adds a normalized distance column. The sectors are created by splitting the deck buffer geometries with extended lines from the deck edges.
+        """
+        data = self.connection.sql(f"""
+            --- Extract relevant data from the deck table for sector creation
+
+            SELECT
+                uid,
+                ST_AsWKB(geom),
+                ST_AsWKB(buffer),
+                ST_AsWKB(buffer_edge),
+                ST_AsWKB(ST_Centroid(ST_MakeLine(ST_StartPoint(deck_edge), ST_StartPoint(buffer_edge)))) AS start,
+                ST_AsWKB(ST_Centroid(ST_MakeLine(ST_EndPoint(deck_edge), ST_EndPoint(buffer_edge)))) AS finish,
+            FROM proc_{self.damage.deck.table_name}
+        """).fetchall()
+
+        self.connection.execute(f"""
+            -- Create a sequence for sector IDs and a table for sectors with geometry, sector_tag, and rdeck columns
+            DROP SEQUENCE IF EXISTS sector_id CASCADE;
+            -- Create a new sequence and table for sectors
+            -- The sectors table will store the geometries of the sectors, their tags (N, C, S), and the related deck ID (rdeck)
+            CREATE OR REPLACE SEQUENCE sector_id;
+            CREATE OR REPLACE TABLE sectors (uid INTEGER DEFAULT nextval('sector_id'), geom GEOMETRY, sector_tag CHAR(1), rdeck INTEGER);
+        """)
+        sector_tags = ["N","C","S"]
+        for i in data:
+            edges = extract_intersecting_edges(i[1], i[3])
+            split_lines = [extend_line(edge, 1e3) for edge in edges]  # Extend lines by 1 km
+            points = sort_by_centroid([wkbloads(point) for point in [i[4], i[5]]])
+
+            split_lines = move_lines_to_points(split_lines, points)
+            res = multisplit(wkbloads(i[2]), split_lines)
+            for t in range(3):
+                self.connection.execute(f"INSERT INTO sectors (geom, sector_tag, rdeck) VALUES (?, ?, ?)", (res[t].wkt, sector_tags[t], i[0]))
+
+        self.connection.execute(f"""
+            -- Add center column to the sectors table and update it with the calculated centroids based on sector_tag
+                            
+            ALTER TABLE sectors ADD COLUMN center GEOMETRY;
+            UPDATE sectors SET center = CASE
+            WHEN sector_tag = 'N' THEN subquery.n_center
+            WHEN sector_tag = 'C' THEN subquery.c_center
+            WHEN sector_tag = 'S' THEN subquery.s_center
+            END
+            FROM (
+                SELECT
+                    uid,
+                    ST_Centroid(ST_MakeLine(ST_EndPoint(buffer_edge), ST_Centroid(ST_MakeLine(ST_EndPoint(deck_edge), ST_EndPoint(buffer_edge))))) as n_center,
+                    ST_Centroid(ST_MakeLine(ST_StartPoint(deck_edge), ST_EndPoint(deck_edge))) as c_center,
+                    ST_Centroid(ST_MakeLine(ST_StartPoint(buffer_edge), ST_Centroid(ST_MakeLine(ST_StartPoint(deck_edge), ST_StartPoint(buffer_edge))))) as s_center
+                FROM 
+                    proc_{self.damage.deck.table_name}
+            ) AS subquery
+            WHERE sectors.rdeck = subquery.uid;
+
+            
+            -- Add ndist column to the sectors table and calculate the normalized distance from the start point of the axis line
+                            
+            ALTER TABLE sectors ADD COLUMN ndist FLOAT;
+            UPDATE sectors SET ndist = 
+            ST_Distance(ST_StartPoint(first.geom), second.center)/first.length
+            FROM proc_{self.damage.axis.table_name} AS first
+            JOIN sectors as second
+            ON first.rdeck = second.rdeck
+            WHERE second.uid = sectors.uid;        
+        """)
+        print(f"Sectors have been generated for the deck geometries in proc_{self.damage.deck.table_name} table.")
+
+    def deck_edge_control(self, buffer_distance:float):
+
+        """ Checks if there is at least one projected point for both orbital orientations within the radius of buffer_distance / 2 at both edges of the deck geometry.
+    
+        Arguments
+        ---------
+        buffer_distance : float
+            The distance to buffer geometries in meters.
+        """      
+
+        self.connection.execute(f"""                
+            -- Add edge_check column to the deck table and update it based on the existence of projected points within the buffer distance from the deck edges
+            -- This will help to identify if the deck is covered by both ascending and descending points
+            -- The edge_check will be TRUE if there is at least one projected point within the buffer distance from both edges of the deck geometry
+                            
+            ALTER TABLE proc_{self.damage.deck.table_name} ADD COLUMN edge_check BOOLEAN;
+            UPDATE proc_{self.damage.deck.table_name}
+            SET edge_check = 
+                EXISTS (
+                    SELECT 1
+                    FROM proc_{self.damage.ascending.table_name} AS asc_table
+                    WHERE asc_table.rdeck = proc_{self.damage.deck.table_name}.uid
+                    AND ST_DWithin( ST_StartPoint(proc_{self.damage.deck.table_name}.deck_edge), asc_table.proj_axis, {buffer_distance / 2})
+                ) AND EXISTS (
+                    SELECT 1
+                    FROM proc_{self.damage.descending.table_name} AS desc_table
+                    WHERE desc_table.rdeck = proc_{self.damage.deck.table_name}.uid
+                    AND ST_DWithin( ST_EndPoint(proc_{self.damage.deck.table_name}.deck_edge), desc_table.proj_axis,  {buffer_distance / 2})
+                );
+        """)
+
+    def relate_axis_pspoints(self):
+        """ Relating axis and point data.
+
+        This method adds `ndist_axis` and `proj_axis` columns to the ascending and descending tables, calculating the normalized distance along the axis line and the projected point on the axis line. It uses the axis geometries to determine the distance and projection for each point in the ascending and descending tables.
+        """
+
+        self.connection.execute(f"""
+            -- Add ndist_axis and proj_axis columns to the ascending and descending tables
+            -- Calculate the normalized distance along the axis line and the projected point on the axis line
+                            
+            ALTER TABLE proc_{self.damage.ascending.table_name} ADD COLUMN ndist_axis FLOAT;
+            ALTER TABLE proc_{self.damage.ascending.table_name} ADD COLUMN proj_axis GEOMETRY;
+            UPDATE proc_{self.damage.ascending.table_name}
+            SET ndist_axis = ST_Distance(ST_StartPoint(subquery.lgeom), ST_EndPoint(ST_ShortestLine(subquery.geom, subquery.lgeom)))/subquery.linelen,
+                proj_axis = ST_EndPoint(ST_ShortestLine(subquery.geom, subquery.lgeom))
+            FROM (
+                SELECT second.*, first.geom as lgeom, first.length as linelen
+                FROM proc_{self.damage.axis.table_name} AS first
+                JOIN proc_{self.damage.ascending.table_name} AS second
+                ON first.rdeck = second.rdeck
+                ) AS subquery
+            WHERE proc_{self.damage.ascending.table_name}.uid = subquery.uid;
+            
+            --- Add ndist_axis and proj_axis columns to the descending table and calculate them similarly
+
+            ALTER TABLE proc_{self.damage.descending.table_name} ADD COLUMN ndist_axis FLOAT;
+            ALTER TABLE proc_{self.damage.descending.table_name} ADD COLUMN proj_axis GEOMETRY;
+            UPDATE proc_{self.damage.descending.table_name}
+            SET ndist_axis = ST_Distance(ST_StartPoint(subquery.lgeom), ST_EndPoint(ST_ShortestLine(subquery.geom, subquery.lgeom)))/subquery.linelen,
+                proj_axis = ST_EndPoint(ST_ShortestLine(subquery.geom, subquery.lgeom))
+            FROM (
+                SELECT second.*, first.geom as lgeom, first.length as linelen
+                FROM proc_{self.damage.axis.table_name} AS first
+                JOIN proc_{self.damage.descending.table_name} AS second
+                ON first.rdeck = second.rdeck
+                ) AS subquery
+            WHERE proc_{self.damage.descending.table_name}.uid = subquery.uid;
+        """)
+        print(f"Normalized distance along the axis line has been calculated for the {self.damage.ascending.table_name} and {self.damage.descending.table_name} tables.")
+
+
+def run(pipeline_class: type, ascending_file: str, descending_file: str, workspace_root: str) -> dict:
+    """ Load the data and run the preprocessing stages with a pipeline class, measuring the time of each stage. """
+    assessment = damage_assessment(ascending_file, descending_file, workspace_root)
+    assessment.load_source_files()
+    pipeline = pipeline_class(assessment.damage, assessment.db.con)
+    timings = dict()
+    for name, stage in pipeline.stages("EPSG:28992", 6):
+        st = time.time()
+        stage()
+        timings[name] = time.time() - st
+    timings['related points'] = assessment.db.con.sql(f"SELECT COUNT(*) FROM proc_{assessment.damage.ascending.table_name}").fetchone()[0]
+    assessment.db.con.close()
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type = int, default = 200_000, help = "number of points of each orbit")
+    parser.add_argument("--epochs", type = int, default = 20, help = "number of acquisition dates of each orbit")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp()
+    try:
+        files = write_ps_pair(folder, args.points, args.epochs)
+        update = run(UpdatePipeline, *files, folder)
+        ctas = run(DBPipeline, *files, folder)
+    finally:
+        shutil.rmtree(folder)
+
+    print(f"\n{'stage':<24}{'update [s]':>12}{'ctas [s]':>10}{'speedup':>9}")
+    for name in update:
+        if name == 'related points':
+            continue
+        print(f"{name:<24}{update[name]:>12.3f}{ctas[name]:>10.3f}{update[name] / max(ctas[name], 1e-9):>9.1f}")
+    total_update = sum(value for name, value in update.items() if name != 'related points')
+    total_ctas = sum(value for name, value in ctas.items() if name != 'related points')
+    print(f"{'total':<24}{total_update:>12.3f}{total_ctas:>10.3f}{total_update / total_ctas:>9.1f}")
+    print(f"related points: {update['related points']} (update), {ctas['related points']} (ctas)")
@@ -0,0 +1,82 @@
+"""
+Throughput of the reprojection of the persistent scatters in `DBPipeline.build_process_tables` in points per second.
+
+The synthetic points in EPSG:4326 are reprojected to EPSG:28992 row by row with `ST_Transform`, in bulk with pyproj by `DBPipeline.reproject_points`, the opt-in path of `build_process_tables(..., bulk_reprojection=True)`, when pyproj is installed, and copied without a transformation when the computational projection is the source projection. The bulk points are compared with the `ST_Transform` points.
+
+The bulk path is not always faster: it has run at 0.85x to 1.25x the points per second of `ST_Transform` for 200k points per orbit and at 1.15x to 1.3x for 1M points per orbit, depending on the machine.
+
+Usage:
+    python benchmarks/bench_reprojection.py --points 100000 1000000
+"""
+import time
+import argparse
+import tempfile
+
+from synthetic import write_ps_pair, damage_assessment
+from safebridge.pipeline import DBPipeline, Transformer
+
+
+def sql_transform(dbpipeline: DBPipeline, computational_projection: str):
+    """ The reprojection of the point tables with `ST_Transform` on every row. """
+    for obj in dbpipeline.scatters:
+        dbpipeline.connection.execute(f"""
+            CREATE OR REPLACE TABLE proc_{obj.table_name} AS
+            SELECT uid, ST_Transform(geom, '{obj.source_projection}', '{computational_projection}', always_xy := true) AS geom FROM {obj.table_name};
+        """)
+
+
+def bulk_transform(dbpipeline: DBPipeline, computational_projection: str):
+    """ The reprojection of the point tables in bulk with pyproj. """
+    for obj in dbpipeline.scatters:
+        dbpipeline.reproject_points(obj, computational_projection)
+
+
+def identity(dbpipeline: DBPipeline, computational_projection: str):
+    """ The process tables of the point tables when the computational projection is the source projection. """
+    for obj in dbpipeline.scatters:
+        dbpipeline.connection.execute(f"CREATE OR REPLACE TABLE proc_{obj.table_name} AS SELECT uid, geom FROM {obj.table_name}")
+
+
+def timed(method, dbpipeline: DBPipeline, computational_projection: str) -> float:
+    """ Time the reprojection of the point tables with the given method. """
+    st = time.time()
+    method(dbpipeline, computational_projection)
+    return time.time() - st
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type = int, nargs = "+", default = [100_000, 1_000_000], help = "number of points of each orbit")
+    args = parser.parse_args()
+
+    if Transformer is None:
+        print("pyproj is not installed, only the ST_Transform and the identity paths are measured.")
+    rows = []
+    with tempfile.TemporaryDirectory() as folder:
+        for n_points in args.points:
+            assessment = damage_assessment(*write_ps_pair(folder, n_points, 2), workspace_root = folder)
+            assessment.load_source_files()
+            connection = assessment.db.con
+            dbpipeline = DBPipeline(assessment.damage, connection)
+            dbpipeline.build_point_geometry()
+            total = n_points * len(dbpipeline.scatters)
+
+            sql = timed(sql_transform, dbpipeline, "EPSG:28992")
+            for obj in dbpipeline.scatters:
+                connection.execute(f"CREATE OR REPLACE TABLE sql_{obj.table_name} AS SELECT * FROM proc_{obj.table_name}")
+            bulk, error = None, None
+            if Transformer is not None:
+                bulk = timed(bulk_transform, dbpipeline, "EPSG:28992")
+                error = max(connection.sql(f"""
+                    SELECT max(ST_Distance(first.geom, second.geom))
+                    FROM proc_{obj.table_name} AS first JOIN sql_{obj.table_name} AS second ON first.uid = second.uid
+                """).fetchone()[0] for obj in dbpipeline.scatters)
+            same = timed(identity, dbpipeline, "EPSG:4326")
+            rows.append((total, sql, bulk, same, error))
+            connection.close()
+
+    print(f"\n{'points':>10}{'ST_Transform [pt/s]':>21}{'pyproj [pt/s]':>15}{'identity [pt/s]':>17}{'max diff [m]':>14}")
+    for total, sql, bulk, same, error in rows:
+        bulk_rate = "-" if bulk is None else f"{total / bulk:,.0f}"
+        error = "-" if error is None else f"{error:.2e}"
+        print(f"{total:>10}{total / sql:>21,.0f}{bulk_rate:>15}{total / same:>17,.0f}{error:>14}")
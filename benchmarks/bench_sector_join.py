@@ -0,0 +1,93 @@
+"""
+Point to sector assignment of `DBPipeline.relate_deck_pspoints` against the plain `ST_Within` join at increasing point counts.
+
+The decks and sectors of the toy data set are processed once, then the processed point tables are replaced by random points spread over the extent of the sectors, most of them outside the decks like in a national data set.
+
+Usage:
+    python benchmarks/bench_sector_join.py --points 100000 1000000 5000000
+"""
+import time
+import shutil
+import argparse
+import tempfile
+
+from synthetic import write_ps_pair, damage_assessment
+from safebridge.pipeline import DBPipeline
+
+
+def plain_join(connection, table_name: str):
+    """ The point to sector assignment with a bare `ST_Within` join predicate. """
+    connection.execute(f"""
+        ALTER TABLE proc_{table_name} ADD COLUMN rdeck INTEGER;
+        ALTER TABLE proc_{table_name} ADD COLUMN rsector INTEGER;
+        UPDATE proc_{table_name}
+        SET rdeck = second.rdeck,
+            rsector = second.rsector
+        FROM (
+            SELECT second.rdeck as rdeck, second.uid as rsector, first.uid as p_uid
+            FROM proc_{table_name} AS first
+            JOIN sectors AS second
+            ON ST_Within(first.geom, second.geom)
+        ) AS second
+        WHERE proc_{table_name}.uid = second.p_uid;
+        DELETE FROM proc_{table_name} WHERE rdeck IS NULL;
+    """)
+
+
+def random_points(connection, table_name: str, n_points: int, extent: tuple, seed: float):
+    """ Replace a processed point table with random points in the extent. """
+    xmin, xmax, ymin, ymax = extent
+    connection.execute(f"""
+        SELECT setseed({seed});
+        CREATE OR REPLACE TABLE proc_{table_name} AS
+        SELECT range::INTEGER AS uid, ST_Point({xmin} + random() * {xmax - xmin}, {ymin} + random() * {ymax - ymin}) AS geom
+        FROM range({n_points});
+    """)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = __doc__, formatter_class = argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--points", type = int, nargs = "+", default = [100_000, 1_000_000, 5_000_000], help = "number of points of each orbit")
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp()
+    try:
+        assessment = damage_assessment(*write_ps_pair(folder, 1000, 10), workspace_root = folder)
+        assessment.load_source_files()
+        pipeline = DBPipeline(assessment.damage, assessment.db.con)
+        pipeline.build_point_geometry()
+        pipeline.build_process_tables("EPSG:28992")
+        pipeline.process_axis()
+        pipeline.process_deck(6)
+        pipeline.relate_deck_axis()
+        pipeline.create_sectors()
+
+        connection = assessment.db.con
+        extent = connection.sql("""
+            SELECT ST_XMin(ST_Extent_Agg(geom)), ST_XMax(ST_Extent_Agg(geom)), ST_YMin(ST_Extent_Agg(geom)), ST_YMax(ST_Extent_Agg(geom)) FROM sectors
+        """).fetchone()
+        tables = [assessment.damage.ascending.table_name, assessment.damage.descending.table_name]
+
+        rows = []
+        for n_points in args.points:
+            for i, table_name in enumerate(tables):
+                random_points(connection, table_name, n_points, extent, 0.1 * (i + 1))
+            st = time.time()
+            for table_name in tables:
+                plain_join(connection, table_name)
+            plain = time.time() - st
+            related = connection.sql(f"SELECT COUNT(*) FROM proc_{tables[0]}").fetchone()[0]
+
+            for i, table_name in enumerate(tables):
+                random_points(connection, table_name, n_points, extent, 0.1 * (i + 1))
+            st = time.time()
+            pipeline.relate_deck_pspoints()
+            grid = time.time() - st
+            rows.append((n_points, related, plain, grid))
+        connection.close()
+    finally:
+        shutil.rmtree(folder)
+
+    print(f"\n{'points':>10}{'related':>10}{'ST_Within [s]':>15}{'grid [s]':>10}{'speedup':>9}")
+    for n_points, related, plain, grid in rows:
+        print(f"{n_points:>10}{related:>10}{plain:>15.2f}{grid:>10.2f}{plain / grid:>9.1f}")
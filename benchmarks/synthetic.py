@@ -0,0 +1,143 @@
+"""
+Synthetic persistent scatter data for the SafeBridge benchmarks.
+
+The points are sampled on the decks of the toy data set in `examples/toy_data` and uniformly around them, the time series are random displacements in millimetres with a linear trend. The files have the `pid, lat, lon, height` fields and one `DYYYYMMDD` column per acquisition date like the persistent scatter files used in the examples.
+"""
+import os
+import duckdb
+import shapely
+import numpy as np
+from datetime import date, timedelta
+
+TOY_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "examples", "toy_data")
+
+
+def toy_decks(buffer: float = 0.00004) -> np.ndarray:
+    """ Read the deck geometries of the toy data set in EPSG:4326.
+
+    Arguments
+    ---------
+    buffer : float
+        The distance in degrees by which the decks are expanded. Defaults to 0.00004, about 4 metres.
+
+    Returns
+    -------
+    np.ndarray: The shapely polygons of the decks.
+    """
+    con = duckdb.connect()
+    con.load_extension("spatial")
+    wkbs = con.sql(f"SELECT ST_AsWKB(ST_Buffer(geom, {buffer})) FROM ST_Read('{os.path.join(TOY_DATA, 'deck.shp')}')").fetchall()
+    con.close()
+    return shapely.from_wkb([bytes(wkb[0]) for wkb in wkbs])
+
+
+def write_ps_file(path: str, n_points: int, n_epochs: int, on_deck_fraction: float = 0.5, start: date = date(2018, 1, 3), step: int = 12, seed: int = 0) -> str:
+    """ Write a synthetic persistent scatter CSV file.
+
+    Arguments
+    ---------
+    path : str
+        The path of the CSV file.
+    n_points : int
+        The number of points.
+    n_epochs : int
+        The number of acquisition dates.
+    on_deck_fraction : float
+        The fraction of the points sampled on the decks, the rest is spread uniformly around them. Defaults to 0.5.
+    start : date
+        The first acquisition date. Defaults to 2018-01-03.
+    step : int
+        The number of days between the acquisitions. Defaults to 12.
+    seed : int
+        The seed of the random generator. Defaults to 0.
+
+    Returns
+    -------
+    str: The path of the CSV file.
+    """
+    rng = np.random.default_rng(seed)
+    decks = toy_decks()
+    minx, miny, maxx, maxy = shapely.total_bounds(decks)
+
+    # rejection sampling inside the deck envelopes, the decks are roughly rectangular so few candidates are dropped
+    n_deck = int(n_points * on_deck_fraction)
+    chosen = rng.integers(0, len(decks), n_deck * 2)
+    bounds = shapely.bounds(decks)[chosen]
+    candidates = shapely.points(rng.uniform(bounds[:, 0], bounds[:, 2]), rng.uniform(bounds[:, 1], bounds[:, 3]))
+    on_deck = candidates[shapely.contains(decks[chosen], candidates)][:n_deck]
+
+    n_rest = n_points - len(on_deck)
+    x = np.concatenate([shapely.get_x(on_deck), rng.uniform(minx - 0.05, maxx + 0.05, n_rest)])
+    y = np.concatenate([shapely.get_y(on_deck), rng.uniform(miny - 0.05, maxy + 0.05, n_rest)])
+
+    trend = rng.uniform(-0.1, 0.0, (n_points, 1)) * np.arange(n_epochs)
+    displacement = np.round(rng.normal(0, 1.5, (n_points, n_epochs)) + trend, 2)
+
+    data = dict(
+        pid = np.array([f"P{i}" for i in range(n_points)]),
+        lat = np.round(y, 8),
+        lon = np.round(x, 8),
+        height = np.round(rng.uniform(0, 20, n_points), 2),
+    )
+    for i in range(n_epochs):
+        data[(start + timedelta(days=step * i)).strftime("D%Y%m%d")] = displacement[:, i]
+
+    con = duckdb.connect()
+    con.execute(f"COPY (SELECT * FROM data) TO '{path}' (HEADER, DELIMITER ',')")
+    con.close()
+    return path
+
+
+def write_ps_pair(folder: str, n_points: int, n_epochs: int, seed: int = 0) -> tuple[str, str]:
+    """ Write synthetic ascending and descending persistent scatter files into a folder.
+
+    Arguments
+    ---------
+    folder : str
+        The folder of the files, it is created if it does not exist.
+    n_points : int
+        The number of points of each orbit.
+    n_epochs : int
+        The number of acquisition dates of each orbit.
+    seed : int
+        The seed of the random generator. Defaults to 0.
+
+    Returns
+    -------
+    tuple[str, str]: The paths of the ascending and descending files.
+    """
+    os.makedirs(folder, exist_ok=True)
+    ascending = write_ps_file(os.path.join(folder, f"ascending_{n_points}x{n_epochs}.csv"), n_points, n_epochs, start=date(2018, 1, 3), seed=seed)
+    descending = write_ps_file(os.path.join(folder, f"descending_{n_points}x{n_epochs}.csv"), n_points, n_epochs, start=date(2018, 1, 8), seed=seed + 1)
+    return ascending, descending
+
+
+def damage_assessment(ascending_file: str, descending_file: str, workspace_root: str = "safebridgeDB", **options):
+    """ Create a DamageAssessment of the toy decks with synthetic persistent scatter files.
+
+    Arguments
+    ---------
+    ascending_file : str
+        The path of the ascending file.
+    descending_file : str
+        The path of the descending file.
+    workspace_root : str
+        The root directory of the run workspaces. Defaults to `"safebridgeDB"`.
+    **options
+        Extra attributes of the Ascending and Descending data, e.g. `time_series_layout` or `displacement_type`.
+
+    Returns
+    -------
+    DamageAssessment: The damage assessment object.
+    """
+    from safebridge.damage_assessment import DamageAssessment
+    from safebridge.data import Deck, Axis, Support, Ascending, Descending
+
+    return DamageAssessment(
+        deck = Deck(source_file = os.path.join(TOY_DATA, "deck.shp")),
+        axis = Axis(source_file = os.path.join(TOY_DATA, "axis.shp")),
+        support = Support(source_file = os.path.join(TOY_DATA, "support.shp")),
+        ascending = Ascending(source_file = ascending_file, unit = "mm", lat_field = "lat", lon_field = "lon", orbit_azimuth = 348.66, incidence_angle = 31.1, **options),
+        descending = Descending(source_file = descending_file, unit = "mm", lat_field = "lat", lon_field = "lon", orbit_azimuth = 190.72, incidence_angle = 35.4, **options),
+        workspace_root = workspace_root,
+    )
@@ -0,0 +1,178 @@
+"""
+This module provides the DisplacementCube class, a memory-mapped points x epochs matrix of the persistent scatter displacements that is stored as a NumPy sidecar file next to the DuckDB database file. The solvers slice its rows directly instead of querying the database for every sector and deck.
+"""
+import os
+import numpy as np
+from duckdb import DuckDBPyConnection
+
+
+class DisplacementCube:
+    """ Memory-mapped displacement matrix of a persistent scatter table.
+
+    The rows of the matrix are the points of the `proc_{table_name}` table ordered by deck, sector and uid, the columns are the acquisition dates in chronological order. Since the points of a deck and of a sector are stored in consecutive rows, the rows of a deck or a sector are returned as views of the memory-mapped file without copies.
+
+    Attributes
+    ----------
+    values : np.memmap
+        The points x epochs displacement matrix.
+    index : np.ndarray
+        Structured array with the `uid`, `rdeck`, `rsector` and `ndist_axis` of each row.
+
+    Methods
+    -------
+    export(connection: DuckDBPyConnection, table_name: str, fields: list[str], file_prefix: str, chunk_size: int, dtype: str) -> DisplacementCube
+        Exports the displacement matrix of a table to the sidecar files and opens it.
+    deck(rdeck: int) -> np.ndarray
+        Gets the rows of a deck.
+    sector(rsector: int) -> np.ndarray
+        Gets the rows of a sector.
+    deck_profile(rdeck: int) -> dict
+        Gets the normalized distance and the total displacement of the points of a deck.
+    sector_mean_ts(rsector: int, scaling_factor: float) -> tuple
+        Calculates the mean time series of a sector.
+    """
+    index_dtype = np.dtype([('uid', 'i8'), ('rdeck', 'i8'), ('rsector', 'i8'), ('ndist_axis', 'f4')])
+
+    def __init__(self, cube_file: str, index_file: str):
+        """ Open the sidecar files of a displacement cube.
+
+        Arguments
+        ---------
+        cube_file : str
+            The path to the `.npy` file of the displacement matrix.
+        index_file : str
+            The path to the `.npy` file of the row index.
+        """
+        self.values = np.load(cube_file, mmap_mode='r')
+        self.index = np.load(index_file)
+        self._decks = self._slices(self.index['rdeck'])
+        self._sectors = self._slices(self.index['rsector'])
+
+    @staticmethod
+    def _slices(keys: np.ndarray) -> dict:
+        """ Map each key to the slice of its consecutive rows. """
+        uniques, starts, counts = np.unique(keys, return_index=True, return_counts=True)
+        return {int(key): slice(int(start), int(start + count)) for key, start, count in zip(uniques, starts, counts)}
+
+    @classmethod
+    def export(cls, connection: DuckDBPyConnection, table_name: str, fields: list[str], file_prefix: str, chunk_size: int = 100_000, dtype: str = "float64") -> "DisplacementCube":
+        """ Export the displacement matrix of a persistent scatter table and open it as a memory-mapped cube.
+
+        The matrix is written chunk by chunk, so the export does not hold the full matrix in memory. The files are named `{file_prefix}_{table_name}_cube.npy` and `{file_prefix}_{table_name}_index.npy`.
+
+        Arguments
+        ---------
+        connection : DuckDBPyConnection
+            The database connection.
+        table_name : str
+            The name of the persistent scatter table, the rows are taken from `proc_{table_name}`.
+        fields : list[str]
+            The SQL expressions selecting the displacement of each date in chronological order.
+        file_prefix : str
+            The path prefix of the sidecar files, e.g. the database file path without extension.
+        chunk_size : int
+            The number of rows written at once. Defaults to 100000.
+        dtype : str
+            The NumPy type of the stored displacements, `"float32"` halves the size of the cube for tables with `FLOAT` displacements. Defaults to `"float64"`.
+
+        Returns
+        -------
+        DisplacementCube: The exported cube.
+        """
+        connection.execute(f"""
+            CREATE OR REPLACE TEMP TABLE cube_rows AS
+            SELECT row_number() OVER (ORDER BY first.rdeck, first.rsector, first.uid) - 1 AS row, first.uid, first.rdeck, first.rsector, first.ndist_axis
+            FROM proc_{table_name} AS first
+            WHERE first.rdeck IS NOT NULL
+        """)
+        count = connection.execute("SELECT COUNT(*) FROM cube_rows").fetchone()[0]
+        cube_file = f"{file_prefix}_{table_name}_cube.npy"
+        index_file = f"{file_prefix}_{table_name}_index.npy"
+
+        values = np.lib.format.open_memmap(cube_file, mode='w+', dtype=dtype, shape=(count, len(fields)))
+        index = np.empty(count, dtype=cls.index_dtype)
+        for start in range(0, count, chunk_size):
+            chunk = connection.execute(f"""
+                SELECT first.uid, first.rdeck, first.rsector, first.ndist_axis, {", ".join(f"second.{field} AS f{i}" for i, field in enumerate(fields))}
+                FROM cube_rows AS first
+                JOIN {table_name} AS second
+                ON first.uid = second.uid
+                WHERE first.row >= {start} AND first.row < {start + chunk_size}
+                ORDER BY first.row
+            """).fetchnumpy()
+            stop = start + chunk['uid'].shape[0]
+            for name in cls.index_dtype.names:
+                index[name][start:stop] = chunk[name]
+            values[start:stop] = np.column_stack([np.ma.filled(chunk[f"f{i}"].astype(dtype), np.nan) for i in range(len(fields))])
+
+        values.flush()
+        del values
+        np.save(index_file, index)
+        connection.execute("DROP TABLE cube_rows")
+        print(f"Displacement cube of {table_name} with {count} points and {len(fields)} epochs has been exported to {os.path.basename(cube_file)}.")
+        return cls(cube_file, index_file)
+
+    def deck(self, rdeck: int) -> np.ndarray:
+        """ Get the rows of the points related to a deck as a view of the cube.
+
+        Arguments
+        ---------
+        rdeck : int
+            The uid of the deck.
+
+        Returns
+        -------
+        np.ndarray: The displacement rows of the deck points, empty if the deck has no points.
+        """
+        return self.values[self._decks.get(int(rdeck), slice(0, 0))]
+
+    def sector(self, rsector: int) -> np.ndarray:
+        """ Get the rows of the points related to a sector as a view of the cube.
+
+        Arguments
+        ---------
+        rsector : int
+            The uid of the sector.
+
+        Returns
+        -------
+        np.ndarray: The displacement rows of the sector points, empty if the sector has no points.
+        """
+        return self.values[self._sectors.get(int(rsector), slice(0, 0))]
+
+    def deck_profile(self, rdeck: int) -> dict:
+        """ Get the normalized distance along the axis and the total displacement of the points of a deck.
+
+        Arguments
+        ---------
+        rdeck : int
+            The uid of the deck.
+
+        Returns
+        -------
+        dict: The `ndist` and `disp` arrays of the deck points ordered by the normalized distance, as expected by the NS_Solver.
+        """
+        rows = self._decks.get(int(rdeck), slice(0, 0))
+        values = self.values[rows].astype(np.float64)
+        ndist = self.index['ndist_axis'][rows]
+        order = np.argsort(ndist, kind='stable')
+        return dict(ndist = ndist[order], disp = (values[:, -1] - values[:, 0])[order])
+
+    def sector_mean_ts(self, rsector: int, scaling_factor: float = 1.0) -> tuple:
+        """ Calculate the mean time series of a sector relative to the first date.
+
+        Arguments
+        ---------
+        rsector : int
+            The uid of the sector.
+        scaling_factor : float
+            The scaling factor of the displacement values. Defaults to 1.0.
+
+        Returns
+        -------
+        tuple: The mean displacement of each date, `None` values if the sector has no points.
+        """
+        values = self.sector(rsector).astype(np.float64)
+        if values.shape[0] == 0:
+            return (None,) * self.values.shape[1]
+        return tuple((np.nanmean(values - values[:, :1], axis=0) * scaling_factor).tolist())
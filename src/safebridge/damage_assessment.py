@@ -1,15 +1,26 @@
+import os
 import re
+import json
+import glob
+import shutil
+import multiprocessing
 import time
 import warnings
 import dateutil.parser as dsparser
 
-from .data import Deck, Axis, Support, Ascending, Descending, BridgeDamage
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from contextlib import nullcontext
+from dataclasses import replace
+
+from .data import Deck, Axis, Support, Ascending, Descending, BridgeDamage, ExecutionProfile
 from .pipeline import DBPipeline, DBQueries
 from .database import DataBase
-from .solvers import NS_Solver, EW_Solver
+from .solvers import NS_BatchSolver, EW_Solver
+from .cube import DisplacementCube
+from .profiler import QueryProfiler
 from .plotter import Plotter
 
-from numpy import ndarray, array
+from numpy import ndarray, array, arange, concatenate, empty, repeat, searchsorted
 from shapely.wkb import loads as wkbloads
 from typing import Union
 from matplotlib import pyplot as plt
@@ -37,21 +48,37 @@ class DamageAssessment:
         An instance of the DBPipeline class for processing the data through various steps.
     _buf_size : float
         The buffer distance used for processing geometries.
+    _cubes : dict
+        The memory-mapped displacement cubes of the ascending and descending data, `None` until they are exported.
+    deck_batch_size : int
+        The number of decks whose data is fetched with one batch query by the solvers and the report. Defaults to 1000.
     
     Methods
     -------
     connect_duckdb_file(db_path: str)
         Connects to a DuckDB file at the specified path.
-    load_source_files()
+    load_source_files(parallel: bool = False, max_workers: int = None, spatial_pushdown: float = None, use_cache: bool = False, pushdown_projection: str = None)
         Loads the source files for deck, axis, support, ascending, and descending data into the database.
-    preprocess(computational_projection: str, buffer_distance: float)
+    preprocess(computational_projection: str, buffer_distance: float, resume: bool = True, profile: bool = False, bulk_reprojection: bool = False)
         Preprocesses the data for damage assessment by building geometries, reprojecting them, and relating them.
+    sweep_buffer(computational_projection: str, buffer_distances: list[float], use_cube: bool = False)
+        Preprocesses and assesses the data for several buffer distances, sharing the stages that do not depend on the buffer distance.
+    run_tiled(computational_projection: str, buffer_distance: float, tile_size: float = None, halo: float = None, use_cube: bool = False, keep_tiles: bool = False, partitions: int = None, processes: int = 1)
+        Preprocesses and assesses the decks tile by tile, optionally in worker processes, and merges the results.
     filter(safebridge_data: Union[Ascending, Descending, Deck, Axis, Support], condition: Union[tuple, list[tuple]], logic: str = "AND")
         Filters the data in the specified table based on the provided conditions and logic.
-    assess_damage()
+    assess_damage(use_cube: bool = False)
+        Assesses the damage of the NS and EW oriented decks and stores the results in the `result` table.
+    append_acquisitions(ascending_file: str = None, descending_file: str = None, use_cube: bool = False, coordinate_tolerance: float = 1e-6)
+        Appends new acquisitions to the persistent scatter tables and recomputes only the `result` table.
+    export_displacement_cubes()
+        Exports the displacement time series of the processed points as memory-mapped cubes next to the database file.
 
     """
-    def __init__(self, deck:Deck, axis:Axis, support:Support, ascending = Ascending, descending = Descending):
+    # the number of decks whose data is fetched with one batch query by the solvers and the report
+    deck_batch_size = 1000
+
+    def __init__(self, deck:Deck, axis:Axis, support:Support, ascending = Ascending, descending = Descending, execution_profile: ExecutionProfile = None, workspace_root: str = "safebridgeDB"):
         """
         Initialize the DamageAssessment with deck, axis, support and persistent scatter data.
 
@@ -67,6 +94,10 @@ class DamageAssessment:
             The persistent scatter data for ascending orbit.
         descending : Descending
             The persistent scatter data for descending orbit.
+        execution_profile : ExecutionProfile, optional
+            The DuckDB execution settings (threads, memory limit, spill directory) applied to every database connection. The active settings are recorded in the `run_settings` table.
+        workspace_root : str
+            The root directory of the run workspaces. Every run writes its database file, displacement cubes and report into its own `{workspace_root}/{run_id}` folder, so several assessments can run in parallel. Defaults to `"safebridgeDB"`.
         """
         
         for obj in [ascending, descending]:
@@ -78,6 +109,10 @@ class DamageAssessment:
                 obj.scaling_factor = 1.0
             else:
                 raise ValueError(f"Invalid scaling factor for {obj} data. Use 'mm', 'cm', or 'm'.")
+            if obj.time_series_layout not in ["columns", "array"]:
+                raise ValueError(f"Invalid time series layout for {obj.table_name} data. Use 'columns' or 'array'.")
+            if obj.displacement_type not in ["DOUBLE", "FLOAT"]:
+                raise ValueError(f"Invalid displacement type for {obj.table_name} data. Use 'DOUBLE' or 'FLOAT'.")
             
             # rest of the type and value checks in here for ascending and descending points
             
@@ -90,9 +125,10 @@ class DamageAssessment:
                 raise ValueError(f"The table_name for {obj} must not be empty or contain only spaces.")
         
         self.damage = BridgeDamage(deck, axis, support, ascending, descending)
-        self.db = DataBase()
+        self.db = DataBase(execution_profile, workspace_root)
         self.query = DBQueries()
         self._plotter = Plotter()
+        self._cubes = None
     
     def connect_duckdb_file(self, db_path: str):
         """ Connects to a DuckDB file using the db attribute of the class.
@@ -104,30 +140,168 @@ class DamageAssessment:
             The path to the DuckDB file.
         """
         self.db.connect_duckdbfile(db_path)
+        # the displacement cubes of the previous database do not belong to the processed tables of this one
+        self._cubes = None
 
-    def load_source_files(self):
+    def load_source_files(self, parallel: bool = False, max_workers: int = None, spatial_pushdown: float = None, use_cache: bool = False, pushdown_projection: str = None) -> dict:
         """
         Loads the source files for deck, axis, support, ascending, and descending data.
+
+        The source files are independent of each other, so with `parallel=True` they are ingested at the same time from a thread pool. Each worker thread loads its file through its own cursor of the database connection, DuckDB releases the GIL while reading so the large persistent scatter files are parsed concurrently.
+
+        With `spatial_pushdown` the deck data is loaded first and only the persistent scatters inside the expanded envelopes of the decks are loaded from the ascending and descending files, the rest of the points are dropped while the files are read. See `DataBase.spatial_pushdown_filter` for the details.
+
+        With `use_cache=True` every loaded table is kept in the persistent ingest cache of the database directory, keyed on the content of its source file and the loading options. A later run with unchanged sources restores the tables from the cache instead of reading the source files again, only the changed sources are reloaded.
+
+        Arguments
+        ----------
+        parallel : bool
+            If True, the source files are loaded concurrently. Defaults to False.
+        max_workers : int, optional
+            The maximum number of worker threads for the parallel loading. Defaults to the number of source files.
+        spatial_pushdown : float, optional
+            The distance by which the deck envelopes are expanded, in metres like the buffer distance of `preprocess`, which it should cover. Defaults to None, all points are loaded.
+        use_cache : bool
+            If True, the loaded tables are kept in and restored from the ingest cache. Defaults to False.
+        pushdown_projection : str, optional
+            The projected coordinate reference system in metres in which the deck envelopes are expanded, e.g. the computational projection of `preprocess`. Defaults to the UTM zone of the decks.
+
+        Returns
+        -------
+        dict: The loading time in seconds for each table and the total loading time under the `total` key.
         """
         # before the loading the new files to db initialize the db connection with a new DuckDB file
         if self.db.con is None:
             self.db.setup()
-            
-        for i in self.damage.__dataclass_fields__.keys():
-            obj = self.damage.__getattribute__(i)
-            st = time.time()
-            self.db.load_file(obj.source_file, obj.table_name)
-            print(f"{obj.table_name} dataset has been loaded to db from {obj.source_file} in {time.time() - st:.2f} seconds.")
+        # the preprocessing stages of the previous source tables are no longer valid
+        self.db.con.execute("DROP TABLE IF EXISTS pipeline_stages")
 
-    def preprocess(self, computational_projection: str, buffer_distance: float):
+        objs = [getattr(self.damage, i) for i in self.damage.__dataclass_fields__.keys()]
+        timings = dict()
+        filters = dict()
+        st = time.time()
+        if spatial_pushdown is not None:
+            if spatial_pushdown < 0:
+                raise ValueError("Spatial pushdown distance must not be negative.")
+            table_name, elapsed = self._load_source_file(self.damage.deck, cache=use_cache)
+            timings[table_name] = elapsed
+            objs.remove(self.damage.deck)
+            for obj in [self.damage.ascending, self.damage.descending]:
+                filters[obj.table_name] = self._pushdown_filter(obj, spatial_pushdown, pushdown_projection)
+
+        if parallel:
+            with ThreadPoolExecutor(max_workers=max_workers or len(objs)) as executor:
+                futures = [executor.submit(self._load_source_file, obj, self.db.con.cursor(), filters.get(obj.table_name), use_cache) for obj in objs]
+                for future in as_completed(futures):
+                    table_name, elapsed = future.result()
+                    timings[table_name] = elapsed
+        else:
+            for obj in objs:
+                table_name, elapsed = self._load_source_file(obj, None, filters.get(obj.table_name), use_cache)
+                timings[table_name] = elapsed
+
+        for obj in [self.damage.ascending, self.damage.descending]:
+            if obj.table_name in filters:
+                self.db.con.execute(f"DROP TABLE IF EXISTS {obj.table_name}_cells")
+
+        timings['total'] = time.time() - st
+        print(f"All datasets have been loaded to db in {timings['total']:.2f} seconds{' (parallel)' if parallel else ''}.")
+        return timings
+
+    def _pushdown_filter(self, obj: Union[Ascending, Descending], margin: float, metric_projection: str = None) -> str:
+        """ Build the spatial pushdown filter of a persistent scatter source file from the loaded deck table.
+
+        The coordinates are taken from the latitude and longitude fields of the file, or from its geometry column if it has no such fields.
+
+        Arguments
+        ----------
+        obj : Union[Ascending, Descending]
+            The persistent scatter data.
+        margin : float
+            The distance by which the deck envelopes are expanded in metres.
+        metric_projection : str, optional
+            The projected coordinate reference system in which the deck envelopes are expanded. Defaults to the UTM zone of the decks.
+
+        Returns
+        -------
+        str: SQL condition keeping the points close to the decks.
+        """
+        col_names = self.db.source_columns(obj.source_file, geometry_field=obj.geometry_field)
+        if obj.lon_field in col_names and obj.lat_field in col_names:
+            x_field, y_field = obj.lon_field, obj.lat_field
+        elif "geom" in col_names:
+            x_field, y_field = "ST_X(geom)", "ST_Y(geom)"
+        else:
+            raise ValueError(f"{obj.table_name} source file must contain {obj.lat_field} and {obj.lon_field} fields or a geometry column.")
+        
+        return self.db.spatial_pushdown_filter(
+            self.damage.deck.table_name,
+            self.damage.deck.source_projection,
+            obj.source_projection,
+            margin,
+            x_field,
+            y_field,
+            obj.table_name,
+            metric_projection,
+        )
+
+    def _load_source_file(self, obj: Union[Deck, Axis, Support, Ascending, Descending], connection = None, where: str = None, cache: bool = False) -> tuple[str, float]:
+        """ Load a single source file into the database and report the loading time.
+
+        Arguments
+        ----------
+        obj : Union[Deck, Axis, Support, Ascending, Descending]
+            The data object whose source file is loaded.
+        connection : duckdb.DuckDBPyConnection, optional
+            The connection or cursor used for loading. If given, it is closed after the file is loaded.
+        where : str, optional
+            SQL condition selecting the rows to load.
+        cache : bool
+            If True, the table is restored from or stored in the ingest cache.
+
+        Returns
+        -------
+        tuple[str, float]: The table name and the loading time in seconds.
+        """
+        st = time.time()
+        try:
+            time_series_fields = None
+            packed = isinstance(obj, Ascending) and obj.time_series_layout == "array"
+            displacement_type = obj.displacement_type if isinstance(obj, Ascending) else "DOUBLE"
+            if packed or displacement_type != "DOUBLE":
+                time_series_fields, _ = self._extract_dates(self.db.source_columns(obj.source_file, connection, obj.geometry_field))
+                time_series_fields = time_series_fields.tolist()
+            # the rows of a spatial pushdown depend on the deck data as well
+            dependencies = [self.damage.deck.source_file] if where is not None else None
+            self.db.load_file(obj.source_file, obj.table_name, connection, obj.geometry_field, time_series_fields, where, cache, dependencies, packed, displacement_type)
+        finally:
+            if connection is not None:
+                connection.close()
+        elapsed = time.time() - st
+        print(f"{obj.table_name} dataset has been loaded to db from {obj.source_file} in {elapsed:.2f} seconds.")
+        return obj.table_name, elapsed
+
+    def preprocess(self, computational_projection: str, buffer_distance: float, resume: bool = True, profile: bool = False, bulk_reprojection: bool = False) -> dict:
         """ Preprocess the data for damage assessment.
 
+        The stages of `DBPipeline.stages` are run in order and the time of each stage is measured, with `profile=True` the statements of the stages are profiled as well. Every stage is committed together with its record in the `pipeline_stages` table of the database, so after an interruption the preprocessing of the same database, e.g. reopened with `connect_duckdb_file`, resumes from the first stage that has not been completed. The completed stages are skipped if they have been run with the same parameters, if the parameters have changed all stages are run again. The `result` table is initialized after the stages every time, also when all stages are skipped, so the next `assess_damage` does not add to the results of a previous run.
+
         Arguments
         ----------
         computational_projection : str
             The coordinate reference system for computations.
         buffer_distance : float
             The distance to buffer geometries.
+        resume : bool
+            If True, the completed stages are skipped. If False, all stages are run again. Defaults to True.
+        profile : bool
+            If True, the wall time, the rows read and written and the DuckDB operator profile of every SQL statement of the stages that are run are recorded with `QueryProfiler` and written to the `pipeline_profile` table and to the `*_profile.json` file next to the database file. Defaults to False.
+        bulk_reprojection : bool
+            If True, the persistent scatters are reprojected in bulk with pyproj instead of `ST_Transform`, which is not always faster, see `DBPipeline.build_process_tables`. Requires the optional `proj` dependencies. Defaults to False.
+
+        Returns
+        -------
+        dict: The time in seconds of each stage that has been run and the total time under the `total` key.
         """
         assert isinstance(computational_projection, str), "Computational projection must be a string representing the EPSG code."
         assert isinstance(buffer_distance, (int, float)), "Buffer distance must be a numeric value."
@@ -138,29 +312,115 @@ class DamageAssessment:
             raise ValueError("Computational projection must be specified.")
         
         self._buf_size = buffer_distance
+        self._cubes = None
         # Initialize the DBPipeline with the damage data and database connection
         self.dbpipeline = DBPipeline(self.damage, self.db.con)
+        if not resume:
+            self.dbpipeline.reset_stages()
+        completed = self.dbpipeline.completed_stages()
+
+        stages = self.dbpipeline.stages(computational_projection, buffer_distance, bulk_reprojection)
+        resume_from = 0
+        while resume_from < len(stages) and completed.get(stages[resume_from][0]) == self.dbpipeline.stage_parameters(stages[resume_from][1]):
+            resume_from += 1
+        # the stages rebuild the tables of the previous stages, once a later stage has been completed with other parameters its input tables are not the ones it expects and everything is rebuilt from the source tables
+        if any(name in completed for name, _ in stages[resume_from:]):
+            print("The completed stages have been run with other parameters, all stages are run again.")
+            resume_from = 0
+
+        # the stages run their statements through the profiler in place of the connection
+        profiler = QueryProfiler(self.db.con) if profile else None
+        if profiler is not None:
+            self.dbpipeline.connection = profiler
 
-        # 1-building point geometries for the ascending and descending constalliations
-        self.dbpipeline.build_point_geometry()
-        # 2-creating the proc_{table_name} tables with the reprojection of geometries to computational projection
-        self.dbpipeline.build_process_tables(computational_projection)    
-        # 3-reodering the axis vertices, calculating the length and azimuth
-        self.dbpipeline.process_axis()
-        # 4-calculating the deck span counts, generating the deck buffer geometries
-        self.dbpipeline.process_deck(buffer_distance)
-        # 5-relating the axis and the deck geometries, calculating the deck length
-        self.dbpipeline.relate_deck_axis()
-        # 6-creating sector geometries from the deck geometries
-        self.dbpipeline.create_sectors()
-        # 7-deck and sector assignment to the points
-        self.dbpipeline.relate_deck_pspoints()
-        # 8 project points on tho the axis line record the projected point as proj_axis and claculate the normalized distance along the axis line stating from the start point of the axis line as ndist_axis field
-        self.dbpipeline.relate_axis_pspoints()
-        # 9 check if there is at least one projected point for both orbital orientation within the radius of buffer_distance/2 at the both edge of the deck geometry
-        self.dbpipeline.deck_edge_control(buffer_distance)
-        self.dbpipeline.init_result_table()
+        timings = dict()
+        st = time.time()
+        try:
+            for i, (name, stage) in enumerate(stages):
+                if i < resume_from:
+                    print(f"The {name} stage has already been completed, it is skipped.")
+                    continue
+                with profiler.stage(name) if profiler is not None else nullcontext():
+                    timings[name] = self.dbpipeline.run_stage(name, stage)
+        finally:
+            if profiler is not None:
+                self.dbpipeline.connection = self.db.con
+                profiler.close()
+                profile_file = os.path.splitext(self.db._db_path)[0] + '_profile.json'
+                profiler.save("pipeline_profile", profile_file)
+                print(f"The profile of the preprocessing stages has been written to the pipeline_profile table and {profile_file}.")
+        # the results of a previous assessment are cleared even if all stages have been skipped
+        self.dbpipeline.init_result_table(buffer_distance)
+        timings['total'] = time.time() - st
+        print(f"Preprocessing has been completed in {timings['total']:.2f} seconds.")
+        return timings
     
+    def sweep_buffer(self, computational_projection: str, buffer_distances: list[float], use_cube: bool = False) -> dict:
+        """ Preprocess and assess the data for several buffer distances in one run.
+
+        The stages of `DBPipeline.stages` before `process_deck` do not depend on the buffer distance, they are run once and their processed tables are kept as `sweep_proc_*` snapshots. For every buffer distance the processed tables are restored from the snapshots, the remaining stages build the deck buffers, sectors, point relations and edge checks, and the decks are assessed with `assess_damage`. The results of all buffer distances are collected in the `result` table, tagged by its `buffer_distance` column. The processed tables, the stage log and the report of `generate_report` correspond to the last buffer distance.
+
+        Arguments
+        ----------
+        computational_projection : str
+            The coordinate reference system for computations.
+        buffer_distances : list[float]
+            The buffer distances to assess, in meters.
+        use_cube : bool
+            If True, the decks are assessed with the displacement cubes. Defaults to False.
+
+        Returns
+        -------
+        dict: The time in seconds of the shared stages under the `shared` key, of each buffer distance under the `buffer_{distance}` keys and the total time under the `total` key.
+        """
+        assert isinstance(computational_projection, str), "Computational projection must be a string representing the EPSG code."
+        assert all(isinstance(i, (int, float)) for i in buffer_distances), "Buffer distances must be numeric values."
+
+        if len(buffer_distances) == 0 or min(buffer_distances) <= 0:
+            raise ValueError("Buffer distances must be given and greater than 0.")
+        if len(set(buffer_distances)) != len(buffer_distances):
+            raise ValueError("Buffer distances must be unique.")
+
+        self.dbpipeline = DBPipeline(self.damage, self.db.con)
+        self.dbpipeline.reset_stages()
+        self.dbpipeline.completed_stages()
+        stages = self.dbpipeline.stages(computational_projection, buffer_distances[0])
+        shared = [name for name, _ in stages].index("process_deck")
+        tables = [getattr(self.damage, i).table_name for i in self.damage.__dataclass_fields__.keys()]
+
+        timings = dict()
+        st = time.time()
+        for name, stage in stages[:shared]:
+            self.dbpipeline.run_stage(name, stage)
+        for table_name in tables:
+            self.db.con.execute(f"CREATE OR REPLACE TABLE sweep_proc_{table_name} AS SELECT * FROM proc_{table_name}")
+        timings['shared'] = time.time() - st
+
+        for buffer_distance in buffer_distances:
+            bt = time.time()
+            self._buf_size = buffer_distance
+            self._cubes = None
+            for table_name in tables:
+                self.db.con.execute(f"CREATE OR REPLACE TABLE proc_{table_name} AS SELECT * FROM sweep_proc_{table_name}")
+            for name, stage in self.dbpipeline.stages(computational_projection, buffer_distance)[shared:]:
+                self.dbpipeline.run_stage(name, stage)
+            self.dbpipeline.init_result_table(buffer_distance)
+            self.assess_damage(use_cube=use_cube)
+            self.db.con.execute("CREATE OR REPLACE TABLE sweep_result AS SELECT * FROM result" if buffer_distance == buffer_distances[0] else "INSERT INTO sweep_result SELECT * FROM result")
+            timings[f'buffer_{buffer_distance}'] = time.time() - bt
+            print(f"Buffer distance {buffer_distance} has been assessed in {timings[f'buffer_{buffer_distance}']:.2f} seconds.")
+
+        # the result table of the last buffer distance gets the rows of the previous ones
+        self.db.con.execute(f"""
+            INSERT INTO result BY NAME SELECT * FROM sweep_result WHERE buffer_distance != {float(buffer_distances[-1])};
+            DROP TABLE sweep_result;
+        """)
+        for table_name in tables:
+            self.db.con.execute(f"DROP TABLE sweep_proc_{table_name}")
+        timings['total'] = time.time() - st
+        print(f"The sweep of {len(buffer_distances)} buffer distances has been completed in {timings['total']:.2f} seconds.")
+        return timings
+
     def filter(self, 
                safebridge_data: Union[Ascending, Descending, Deck, Axis, Support], 
                condition: Union[tuple, list[tuple]], 
@@ -245,23 +505,45 @@ class DamageAssessment:
             CREATE OR REPLACE TABLE proc_{safebridge_data.table_name} AS
             SELECT * FROM proc_{safebridge_data.table_name} WHERE uid IN ({final_query})
         """)
+        # the filtered process tables no longer match the completed stages, the next preprocessing starts from scratch
+        self.dbpipeline.reset_stages()
+        # the displacement cubes hold the points of the unfiltered tables, they are exported again by the next assessment with cubes
+        self._cubes = None
+        # the deck selection reads the point counts of the decks, they are counted again on the filtered tables
+        if "deck_eligibility" in self.db.con.sql("SELECT table_name FROM duckdb_tables()").fetchnumpy()['table_name'].tolist():
+            self.dbpipeline.build_deck_eligibility()
         
-    def assess_damage(self):
+    def assess_damage(self, use_cube: bool = False):
         """ Assess damage based on the processed data.
 
         This method evaluates the damage to the bridge based on the ascending and descending data. It uses the full time range of the both ascending and descending datasets to determine the extent of damage. 
         It will assess all available data for `NS` oriented bridges for `EW` oriented ones it will use the overlapping time period of the ascending and descending data. The method will perform the necessary calculations to determine the extent of damage and will store the results in the database with a table called `result`.
+
+        Arguments
+        ----------
+        use_cube : bool
+            If True, the displacement values are sliced from the memory-mapped displacement cubes instead of being queried from the database for every deck and sector. The cubes are exported with `export_displacement_cubes` if they do not exist yet. Defaults to False.
         
         """
         
         timeOverlapInfo = self._get_timeoverlap()
+        if use_cube and self._cubes is None:
+            self.export_displacement_cubes()
+        cubes = self._cubes if use_cube else None
         ns_decks = self.dbpipeline.get_ns_bridge_uid()
 
         st = time.time()
-        for deckUid in ns_decks:
-            ns_solver = NS_Solver(self._ns_solver_data(deckUid, timeOverlapInfo))
+        # the point data of the decks is fetched with one query per orbit and the quadratic fits are solved together for every batch of decks
+        for i in range(0, len(ns_decks), self.deck_batch_size):
+            ns_data = self._ns_solver_data(ns_decks[i:i + self.deck_batch_size], timeOverlapInfo, cubes)
+            deck = ns_data['deck']
+            ns_solver = {orbit: NS_BatchSolver(ns_data[orbit]['ndist'], ns_data[orbit]['disp'], ns_data[orbit]['index'], deck['deck_length'], deck['span_count']) for orbit in ['ascending', 'descending']}
+            tilt = {orbit: solver.quadratic_tilt() for orbit, solver in ns_solver.items()}
+            deflection = {orbit: solver.quadratic_deflection() for orbit, solver in ns_solver.items()}
+            quadratic_x = {orbit: solver._quadratic_x() for orbit, solver in ns_solver.items()}
+            quadratic_y = {orbit: solver._quadratic_y() for orbit, solver in ns_solver.items()}
 
-            self.db.con.execute(f"""
+            self.db.con.executemany(f"""
                 INSERT INTO result (rdeck,
                                 orient,
                                 tilt_asc, 
@@ -274,20 +556,20 @@ class DamageAssessment:
                                 ns_quadratic_dsc_y, 
                                 ns_analytical_asc_y,
                                 ns_analytical_dsc_y) 
-                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) """, (
-                    deckUid,
+                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) """, [(
+                    int(deckUid),
                     "NS",
-                    ns_solver.quadratic_tilt('ascending') * self.damage.ascending.scaling_factor,
-                    ns_solver.quadratic_deflection('ascending'),
-                    ns_solver.quadratic_tilt('descending') * self.damage.descending.scaling_factor,
-                    ns_solver.quadratic_deflection('descending'),
-                    ns_solver._quadratic_x('ascending'),
-                    ns_solver._quadratic_y('ascending'),
-                    ns_solver._quadratic_x('descending'),
-                    ns_solver._quadratic_y('descending'),
-                    ns_solver.analytical_curve('ascending'),
-                    ns_solver.analytical_curve('descending')
-                )
+                    float(tilt['ascending'][indx]) * self.damage.ascending.scaling_factor,
+                    float(deflection['ascending'][indx]),
+                    float(tilt['descending'][indx]) * self.damage.descending.scaling_factor,
+                    float(deflection['descending'][indx]),
+                    quadratic_x['ascending'][indx],
+                    quadratic_y['ascending'][indx],
+                    quadratic_x['descending'][indx],
+                    quadratic_y['descending'][indx],
+                    ns_solver['ascending'].analytical_curve(indx),
+                    ns_solver['descending'].analytical_curve(indx)
+                ) for indx, deckUid in enumerate(deck['rdeck'])]
             )
         print(f"NS solver completed in {time.time() - st:.2f} seconds.")
             
@@ -301,67 +583,313 @@ class DamageAssessment:
         
         ew_decks = self.dbpipeline.get_ew_bridge_uid()
         st1 = time.time()
-        for deckUid in ew_decks:
-            # QUERY
-            sectors = self.db.con.sql(f""" SELECT uid, sector_tag, ndist FROM sectors WHERE rdeck = {deckUid} ORDER BY ndist ASC""").fetchnumpy()
-            
+        for i in range(0, len(ew_decks), self.deck_batch_size):
+            ew_batch = ew_decks[i:i + self.deck_batch_size]
             # QUERY
-            deck_orientation_angle = self.db.con.sql(f"SELECT azimuth FROM proc_{self.damage.axis.table_name} WHERE rdeck = '{deckUid}'").fetchone()[0]
-            deck_length = self.db.con.sql(f"SELECT deck_length FROM proc_{self.damage.deck.table_name} WHERE uid = {deckUid}").fetchone()[0]
-            
-            
-            dataStore = dict()
-            
-            for indx, uid in enumerate(sectors['uid']):
-                asc_ts = self._sector_mean_ts(uid, 'ascending' , timeOverlapInfo['ascending']['name'],  self.damage.ascending.scaling_factor)
-                dsc_ts = self._sector_mean_ts(uid, 'descending', timeOverlapInfo['descending']['name'], self.damage.descending.scaling_factor)
+            parameters = dict(deckuids = ew_batch)
+            sectors = self.query.group_columns(self.db.con.execute(self.query.ew_sectors(batch=True), parameters).fetchnumpy(), ew_batch)
+            decks = self.query.group_rows(self.db.con.execute(self.query.ew_deck(f"proc_{self.damage.axis.table_name}", f"proc_{self.damage.deck.table_name}", batch=True), parameters).fetchall(), ew_batch)
+            if cubes is None:
+                asc_sector_ts = self._sector_mean_ts(ew_batch, 'ascending' , timeOverlapInfo['ascending']['name'],  self.damage.ascending.scaling_factor)
+                dsc_sector_ts = self._sector_mean_ts(ew_batch, 'descending', timeOverlapInfo['descending']['name'], self.damage.descending.scaling_factor)
+
+            for deckUid in ew_batch:
+                deck_orientation_angle, deck_length = decks[deckUid][0]
+                deck_sectors = sectors[deckUid]
+
+                dataStore = dict()
 
-                if (sectors['sector_tag'][indx] == 'N' or sectors['sector_tag'][indx] == 'S') and (asc_ts[0] is None or dsc_ts[0] is None):
-                    break
+                for indx, uid in enumerate(deck_sectors['uid']):
+                    if cubes is not None:
+                        asc_ts = cubes['ascending'].sector_mean_ts(uid, self.damage.ascending.scaling_factor)
+                        dsc_ts = cubes['descending'].sector_mean_ts(uid, self.damage.descending.scaling_factor)
+                    else:
+                        # the sectors without points have no mean time series
+                        asc_ts = asc_sector_ts.get(uid, (None,) * len(timeOverlapInfo['ascending']['name']))
+                        dsc_ts = dsc_sector_ts.get(uid, (None,) * len(timeOverlapInfo['descending']['name']))
+
+                    if (deck_sectors['sector_tag'][indx] == 'N' or deck_sectors['sector_tag'][indx] == 'S') and (asc_ts[0] is None or dsc_ts[0] is None):
+                        break
+                    
+                    average_ts = ew_solver.average_ts( ascending_ts  = asc_ts, descending_ts = dsc_ts)
+                    long, vert = ew_solver.los_long_vert_displacement( average_ts['ascending'], average_ts['descending'], deck_orientation_angle)
+                    dataStore[deck_sectors['sector_tag'][indx]] = dict(uid = uid, long = long[-1], vert = vert[-1])
                 
-                average_ts = ew_solver.average_ts( ascending_ts  = asc_ts, descending_ts = dsc_ts)
-                long, vert = ew_solver.los_long_vert_displacement( average_ts['ascending'], average_ts['descending'], deck_orientation_angle)
-                dataStore[sectors['sector_tag'][indx]] = dict(uid = uid, long = long[-1], vert = vert[-1])
-            
-            
-            tilt = ew_solver.get_tilt(dataStore, deck_length)    
-            deflection = ew_solver.get_deflection(dataStore, sectors['ndist'], deck_length)
-            
-            self.db.con.execute(f"""INSERT INTO result (rdeck, orient, tilt, defl) VALUES (?, ?, ?, ?)""", (deckUid, "EW", tilt * self.damage.ascending.scaling_factor, deflection))
+                
+                tilt = ew_solver.get_tilt(dataStore, deck_length)    
+                deflection = ew_solver.get_deflection(dataStore, deck_sectors['ndist'], deck_length)
+                
+                self.db.con.execute(f"""INSERT INTO result (rdeck, orient, tilt, defl) VALUES (?, ?, ?, ?)""", (deckUid, "EW", tilt * self.damage.ascending.scaling_factor, deflection))
         
         print(f"EW solver completed in {time.time() - st1:.2f} seconds.")
             
         
     #TODO: JOIN THE result and proc_{self.damage.deck.table_name} tables to write out the results
 
-    def _sector_mean_ts(self, uid:str, orbit:str, name_fields:list[str], scaling_factor:float = 1.0):
+    def run_tiled(self, computational_projection: str, buffer_distance: float, tile_size: float = None, halo: float = None, use_cube: bool = False, keep_tiles: bool = False, partitions: int = None, processes: int = 1) -> dict:
+        """ Preprocess and assess the decks tile by tile for data sets exceeding the memory or in parallel processes.
+
+        The decks are partitioned by a square grid of `tile_size` or into `partitions` spatially compact partitions of equal size, see `DBPipeline.partition_decks`. The persistent scatters are assigned to the partitions of all tiles in one pass, see `DBPipeline.partition_scatters`, and for every tile the source data of its decks and of the halo around them is copied into its own database file in the `tiles` folder of the workspace, which is preprocessed and assessed with `run_partition` through a separate connection. The processed tables and the results of the decks owned by the tile are merged into the tables of this database, so the peak memory of the processing depends on the size of the tiles instead of the size of the data set. The source files must be loaded with `load_source_files` before.
+
+        With `processes` larger than one the partitions are run by a pool of worker processes, which also runs the single-threaded parts, e.g. the sector generation and the solvers, on several cores. Every worker opens its own DuckDB database with the execution profile of this assessment, the memory limit of the profile, or 80% of the system memory if the profile does not set it, is divided among the workers, and so are the threads if the profile does not set them. The workers are started with the `spawn` method, so a script using them must guard its entry point with `if __name__ == "__main__":`.
+
+        Arguments
+        ----------
+        computational_projection : str
+            The coordinate reference system for computations.
+        buffer_distance : float
+            The distance to buffer geometries.
+        tile_size : float, optional
+            The size of the tiles in the units of the computational projection.
+        halo : float, optional
+            The distance around the decks of a tile in which the neighbouring decks are processed with them, in the units of the computational projection. Defaults to twice the buffer distance, the largest distance at which the sectors of two decks overlap.
+        use_cube : bool
+            If True, the partitions are assessed with their displacement cubes, see `assess_damage`. Defaults to False.
+        keep_tiles : bool
+            If True, the database files of the tiles are kept after merging. Defaults to False.
+        partitions : int, optional
+            The number of partitions of equal size, used if `tile_size` is not given. Defaults to four partitions per process.
+        processes : int
+            The number of worker processes. Defaults to 1, the tiles are run one after the other in this process.
+
+        Returns
+        -------
+        dict: The time in seconds of each tile and the total time under the `total` key.
         """
-        Calculate the mean time series for a given sector and orbit.
-        
+        if self.db.con is None:
+            raise RuntimeError("The source files must be loaded before the tiled execution.")
+        if buffer_distance <= 0 or (tile_size is not None and tile_size <= 0):
+            raise ValueError("Buffer distance and tile size must be greater than 0.")
+        if processes < 1:
+            raise ValueError("The number of processes must be at least 1.")
+        halo = 2 * buffer_distance if halo is None else halo
+        partitions = 4 * processes if tile_size is None and partitions is None else partitions
+
+        self._buf_size = buffer_distance
+        self._cubes = None
+        self.dbpipeline = DBPipeline(self.damage, self.db.con)
+        # the processed tables are rebuilt from the partitions, they do not belong to the completed stages anymore
+        self.dbpipeline.reset_stages()
+        tiles = self.dbpipeline.partition_decks(computational_projection, tile_size, partitions)
+        for table_name in self.dbpipeline.partition_tables(0):
+            self.db.con.execute(f"DROP TABLE IF EXISTS {table_name}")
+        self.dbpipeline.init_result_table(buffer_distance)
+        tile_dir = os.path.join(os.path.dirname(self.db._db_path), "tiles")
+        os.makedirs(tile_dir, exist_ok=True)
+        tile_paths = {tile: os.path.join(tile_dir, f"tile_{tile}.duckdb") for tile in tiles}
+
+        timings = dict()
+        st = time.time()
+        # the points are assigned to the partitions of all tiles in one pass over the point tables
+        partition_tables = self.dbpipeline.partition_scatters(computational_projection, buffer_distance, halo)
+        executor = None
+        if processes > 1:
+            executor = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"))
+        try:
+            runs = dict()
+            for tile in tiles:
+                if os.path.exists(tile_paths[tile]):
+                    os.remove(tile_paths[tile])
+                self.dbpipeline.export_partition(tile, tile_paths[tile])
+                if executor is None:
+                    # the tiles run in this process are merged one by one, so only one tile is processed at a time
+                    result = run_partition(self.damage, tile_paths[tile], computational_projection, buffer_distance, self.db.profile, use_cube)
+                    timings[f"tile_{tile}"] = self._merge_tile(tile, tile_paths[tile], result, keep_tiles)
+                else:
+                    runs[tile] = executor.submit(run_partition, self.damage, tile_paths[tile], computational_projection, buffer_distance, self._worker_profile(tile, processes), use_cube)
+            # the tiles of the workers are merged in the order of the tiles once they are completed
+            for tile, run in runs.items():
+                timings[f"tile_{tile}"] = self._merge_tile(tile, tile_paths[tile], run.result(), keep_tiles)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+            for table_name in partition_tables:
+                self.db.con.execute(f"DROP TABLE IF EXISTS {table_name}")
+        timings['total'] = time.time() - st
+        print(f"Tiled processing of {len(tiles)} tiles has been completed in {timings['total']:.2f} seconds{f' ({processes} processes)' if executor is not None else ''}.")
+        return timings
+
+    def _worker_profile(self, tile: int, processes: int) -> ExecutionProfile:
+        """ Get the execution profile of a worker process, the threads and the memory limit are divided among the workers and every worker spills to its own folder. """
+        profile = self.db.profile
+        threads = profile.threads if profile.threads is not None else max(1, (os.cpu_count() or 1) // processes)
+        # the memory limit of the connection is the one of the profile or 80% of the system memory if the profile does not set it
+        value, unit = re.fullmatch(r"\s*([\d.]+)\s*([KMGT]?i?B|bytes)\s*", self.db.con.execute("SELECT current_setting('memory_limit')").fetchone()[0]).groups()
+        units = {"bytes": 1, "B": 1, "KB": 10**3, "MB": 10**6, "GB": 10**9, "TB": 10**12, "KiB": 2**10, "MiB": 2**20, "GiB": 2**30, "TiB": 2**40}
+        memory_limit = f"{max(1, int(float(value) * units[unit] / processes) // 2**20)}MiB"
+        temp_directory = None if profile.temp_directory is None else os.path.join(profile.temp_directory, f"tile_{tile}")
+        return replace(profile, threads=threads, memory_limit=memory_limit, temp_directory=temp_directory)
+
+    def _merge_tile(self, tile: int, tile_path: str, result: dict, keep_tiles: bool) -> float:
+        """ Merge a processed tile into the database and remove its database file with its WAL, spill folder and displacement cubes unless the tiles are kept.
+
+        Returns
+        -------
+        float: The processing time of the tile reported by `run_partition`.
+        """
+        self.dbpipeline.merge_partition(tile, tile_path)
+        if not keep_tiles:
+            prefix = os.path.splitext(tile_path)[0]
+            for path in glob.glob(f"{prefix}.*") + glob.glob(f"{prefix}_*"):
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+        print(f"Tile {tile} has been processed in {result['total']:.2f} seconds.")
+        return result['total']
+
+    def append_acquisitions(self, ascending_file: str = None, descending_file: str = None, use_cube: bool = False, coordinate_tolerance: float = 1e-6) -> dict:
+        """ Append new acquisitions to the ascending and descending data and update the damage assessment.
+
+        New acquisitions only add date columns to the persistent scatter tables, the geometries, sectors, point to deck relations and normalized distances of the processed tables do not change. This method appends the dates of the new files that are later than the last loaded date to the existing tables, keeps all `proc_*` and `sectors` tables, and recomputes the results of the buffer distance of the processed tables with `assess_damage`. The results of other buffer distances of a previous `sweep_buffer` are kept but do not include the new acquisitions, a warning is printed and `sweep_buffer` must be run again to update them. The points are matched on the `id_field` of the data, or on the nearest latitude and longitude within `coordinate_tolerance` if it is not given, every loaded point must be in the new files. It can be used after `preprocess` or after reconnecting to a processed DuckDB file with `connect_duckdb_file`.
+
+        Arguments
+        ----------
+        ascending_file : str, optional
+            The path to the file with the new ascending acquisitions, in the same format as the ascending source file.
+        descending_file : str, optional
+            The path to the file with the new descending acquisitions, in the same format as the descending source file.
+        use_cube : bool
+            If True, the updated damage assessment uses re-exported displacement cubes. Defaults to False.
+        coordinate_tolerance : float
+            The largest difference of the latitude and longitude of matching points, in the units of the source projection, used if the data has no `id_field`. Defaults to 1e-6.
+
+        Returns
+        -------
+        dict: The names of the appended date columns of each orbit.
+
+        Raises
+        ------
+        ValueError: If the data has not been preprocessed, a key field is missing, a loaded point is not in the new file or a new date is not later than the loaded dates.
+        """
+        if self.db.con is None:
+            raise ValueError("There is no database connection. Run the damage assessment or connect to a processed DuckDB file first.")
+        if not hasattr(self, "dbpipeline"):
+            self.dbpipeline = DBPipeline(self.damage, self.db.con)
+        if "result" not in self.db.con.sql("SELECT table_name FROM duckdb_tables()").fetchnumpy()['table_name'].tolist():
+            raise ValueError("The data has not been preprocessed, run preprocess before appending new acquisitions.")
+
+        appended = dict()
+        for orbit, source_file in [('ascending', ascending_file), ('descending', descending_file)]:
+            if source_file is None:
+                continue
+            st = time.time()
+            obj = getattr(self.damage, orbit)
+            key_fields = [obj.id_field] if obj.id_field is not None else [obj.lat_field, obj.lon_field]
+            source_columns = self.db.source_columns(source_file, geometry_field=obj.geometry_field)
+            if any(field is None or field not in source_columns for field in key_fields):
+                raise ValueError(f"{source_file} must contain the {key_fields} fields to match the {obj.table_name} points.")
+
+            # the file may repeat the loaded dates, the earlier dates must be loaded already to keep the chronological order
+            loaded_names, loaded_dates = self._extract_dates(self._time_series_names(obj))
+            new_names, new_dates = self._extract_dates(source_columns)
+            later = new_dates > loaded_dates.max()
+            if not set(new_names[~later].tolist()) <= set(loaded_names.tolist()):
+                raise ValueError(f"The dates of {source_file} must be later than the loaded dates of the {obj.table_name} table.")
+            new_names = new_names[later]
+            if len(new_names) == 0:
+                print(f"{source_file} does not contain dates later than {loaded_dates.max()}, {obj.table_name} table is not changed.")
+                continue
+
+            matched = self.db.append_time_series(source_file, obj.table_name, key_fields, new_names.tolist(), obj.time_series_layout == "array", obj.displacement_type, obj.geometry_field, None if obj.id_field is not None else coordinate_tolerance)
+            appended[orbit] = new_names.tolist()
+            print(f"{len(new_names)} acquisitions have been appended to {matched} points of the {obj.table_name} table in {time.time() - st:.2f} seconds.")
+
+        if appended:
+            self._cubes = None
+            # only the results of the processed tables are reassessed, the table tags the new rows with their buffer distance by default
+            buffer_distance = self._processed_buffer_distance()
+            self.db.con.execute("DELETE FROM result WHERE buffer_distance = ?", (buffer_distance,))
+            self.assess_damage(use_cube=use_cube)
+            stale = self.db.con.sql("SELECT DISTINCT buffer_distance FROM result WHERE buffer_distance IS DISTINCT FROM ? ORDER BY buffer_distance", params=(buffer_distance,)).fetchnumpy()['buffer_distance'].tolist()
+            if stale:
+                print(f"Warning: the results of the buffer distances {stale} do not include the appended acquisitions, only the buffer distance {buffer_distance} has been reassessed. Run sweep_buffer again to update them.")
+        return appended
+
+    def _processed_buffer_distance(self) -> float:
+        """ Get the buffer distance of the processed tables.
+
+        The buffer distance is read from the `process_deck` record of the stage log, from the last preprocessing of this instance if the stage log is not available, e.g. after `run_tiled`, or from the `result` table otherwise.
+
+        Returns
+        -------
+        float: The buffer distance in meters.
+
+        Raises
+        ------
+        ValueError: If the buffer distance cannot be determined or the `result` table holds several buffer distances.
+        """
+        tables = self.db.con.sql("SELECT table_name FROM duckdb_tables()").fetchnumpy()['table_name'].tolist()
+        if self.dbpipeline.stage_log in tables:
+            parameters = self.db.con.execute(f"SELECT parameters FROM {self.dbpipeline.stage_log} WHERE stage = 'process_deck'").fetchone()
+            if parameters is not None:
+                return float(json.loads(parameters[0])[0])
+        if getattr(self, "_buf_size", None) is not None:
+            return float(self._buf_size)
+        distances = self.db.con.sql("SELECT DISTINCT buffer_distance FROM result WHERE buffer_distance IS NOT NULL ORDER BY buffer_distance").fetchnumpy()['buffer_distance'].tolist()
+        if len(distances) != 1:
+            raise ValueError(f"The buffer distance of the processed tables cannot be determined, the result table holds the buffer distances {distances}. Run preprocess or sweep_buffer again.")
+        return float(distances[0])
+
+    def export_displacement_cubes(self) -> dict:
+        """ Export the displacement time series of the processed ascending and descending points as memory-mapped cubes.
+
+        For each orbit a points x epochs matrix and its uid index are written as `.npy` files next to the DuckDB file of the database, the rows of each deck and sector are stored consecutively. The cubes of `"FLOAT"` displacement data are stored in single precision. The cubes are used by `assess_damage(use_cube=True)`.
+
+        Returns
+        -------
+        dict: The DisplacementCube of the ascending and descending data.
+        """
+        timeOverlapInfo = self._get_timeoverlap()
+        file_prefix = os.path.splitext(self.db._db_path)[0]
+        self._cubes = {
+            orbit : DisplacementCube.export(
+                self.db.con,
+                getattr(self.damage, orbit).table_name,
+                timeOverlapInfo[orbit]['field'].tolist(),
+                file_prefix,
+                dtype = "float32" if getattr(self.damage, orbit).displacement_type == "FLOAT" else "float64",
+            )
+            for orbit in ['ascending', 'descending']
+        }
+        return self._cubes
+
+    def _sector_mean_ts(self, deckUids:list[int], orbit:str, name_fields:list[str], scaling_factor:float = 1.0) -> dict:
+        """
+        Calculate the mean time series of the sectors of the given decks for an orbit.
+
+        The time series of all sectors of the decks are computed with a single query.
 
         Args:
-            uid (str): The unique identifier for the sector.
+            deckUids (list[int]): The unique identifiers of the decks.
             orbit (str): The orbital orientation ('ascending' or 'descending').
             name_fields (list[str]): The list of field names to calculate the mean for.
+            scaling_factor (float): The factor the displacements are multiplied with.
         Returns:
-            tuple: A tuple containing the unique identifier and the mean values for the specified fields.
+            dict: The mean values for the specified fields of each sector with points, keyed by the unique identifier of the sector.
         """
-        selectStatement = ",".join([f"MEAN({i} - {name_fields[0]})*{scaling_factor} AS {i}" for i in name_fields])
-        pointUIDs =f"SELECT uid FROM proc_{orbit} WHERE rsector == '{uid}'"
+        obj = getattr(self.damage, orbit)
+        parameters = dict(deckuids = list(deckUids))
 
-        return self.db.con.sql(f"SELECT {selectStatement} FROM {orbit} WHERE uid IN ({pointUIDs})").fetchall()[0]
+        if obj.time_series_layout == "array":
+            # the packed time series are averaged in the database, only the mean list of every sector is fetched
+            rows = self.db.con.execute(self.query.sector_mean_ts_list(obj.table_name, scaling_factor, batch=True), parameters).fetchall()
+            return {row[1]: tuple(row[2]) for row in rows}
+
+        rows = self.db.con.execute(self.query.sector_mean_ts(obj.table_name, name_fields, scaling_factor, batch=True), parameters).fetchall()
+        return {row[1]: row[2:] for row in rows}
     
     def _get_timeoverlap(self) -> dict:
         """
         Get the time overlap information between ascending and descending data.
 
+        The `name` entries hold the date column names of the orbits and the `field` entries the SQL expressions to select the displacement of each date, which are the column names themselves for the `"columns"` layout and the list elements `ts[i]` for the `"array"` layout.
+
         Returns:
             dict: A dictionary containing the start and end dates for both ascending and descending data.
         """
-        # ascName, ascDate = extract_dates(get_column_names(self.damage.ascending.table_name, self.db.con))
-        ascName, ascDate = self._extract_dates(self.dbpipeline.get_attributes(self.damage.ascending.table_name))
-        # dscName, dscDate = extract_dates(get_column_names(self.damage.descending.table_name, self.db.con))
-        dscName, dscDate = self._extract_dates(self.dbpipeline.get_attributes(self.damage.descending.table_name))
+        ascName, ascDate = self._extract_dates(self._time_series_names(self.damage.ascending))
+        dscName, dscDate = self._extract_dates(self._time_series_names(self.damage.descending))
 
         lmin = max(ascDate.min(), dscDate.min())
         lmax = min(ascDate.max(), dscDate.max())
@@ -371,53 +899,78 @@ class DamageAssessment:
         rmax = ascDate[ascDate >= lmax][0] if lmax_bounder == "descending" else dscDate[dscDate >= lmax][0] 
         return dict(
             rmin = lmin, rmax = rmax,
-            ascending = dict(name = ascName, date = ascDate),
-            descending = dict(name = dscName, date = dscDate),
+            ascending = dict(name = ascName, date = ascDate, field = self._time_series_fields(self.damage.ascending, ascName)),
+            descending = dict(name = dscName, date = dscDate, field = self._time_series_fields(self.damage.descending, dscName)),
         )
+
+    def _time_series_names(self, obj: Union[Ascending, Descending]) -> list[str]:
+        """ Get the candidate date column names of a persistent scatter table.
+
+        Arguments
+        ----------
+        obj : Union[Ascending, Descending]
+            The persistent scatter data.
+
+        Returns
+        -------
+        list[str]: The column names of the table, or the packed date names for the `"array"` layout.
+        """
+        if obj.time_series_layout == "array":
+            return self.db.con.sql(f"SELECT name FROM {obj.table_name}_dates ORDER BY idx").fetchnumpy()['name'].tolist()
+        return self.dbpipeline.get_attributes(obj.table_name)
+
+    def _time_series_fields(self, obj: Union[Ascending, Descending], name_fields: ndarray) -> ndarray:
+        """ Get the SQL expressions selecting the displacement of each date of a persistent scatter table.
+
+        Arguments
+        ----------
+        obj : Union[Ascending, Descending]
+            The persistent scatter data.
+        name_fields : ndarray
+            The date column names in chronological order.
+
+        Returns
+        -------
+        ndarray: The SQL expression for each date.
+        """
+        if obj.time_series_layout == "array":
+            return array([f"ts[{i + 1}]" for i in range(len(name_fields))])
+        return name_fields
         
-    def _ns_solver_data(self, deckUid:int, timeOverlapInfo:dict) -> dict:
+    def _ns_solver_data(self, deckUids:list[int], timeOverlapInfo:dict, cubes:dict = None) -> dict:
         """
         Prepare the data for the NS solver.
-        This method retrieves the necessary data for the NS solver based on the provided deck UID and time overlap information.
+        This method retrieves the necessary data for the NS solver based on the provided deck UIDs and time overlap information. The data of all decks is fetched with one query per table, the points of each orbit are returned as flat arrays with the index of their deck, as expected by the NS_BatchSolver.
         Arguments
         ----------
-            deckUid (int): The unique identifier for the deck.
+            deckUids (list[int]): The unique identifiers of the decks.
             timeOverlapInfo (dict): A dictionary containing the time overlap information for ascending and descending data.
+            cubes (dict): The displacement cubes of the ascending and descending data. If given, the point data is sliced from the cubes.
         Returns
         -------
-            dict: A dictionary containing the deck, ascending, and descending data for the NS solver.
+            dict: A dictionary containing the `rdeck`, `span_count` and `deck_length` arrays of the decks sorted by their UID under the `deck` key, and the `index`, `ndist` and `disp` arrays of the ascending and descending points.
         """
-        deck = self.db.con.sql(f"""
-                SELECT span_count, deck_length
-                FROM proc_{self.damage.deck.table_name}
-                WHERE uid = {deckUid}
-            """).fetchnumpy()
-
-        asc = self.db.con.sql(f"""
-            SELECT 
-                first.ndist_axis as ndist,
-                second.{timeOverlapInfo['ascending']['name'][-1]} - second.{timeOverlapInfo['ascending']['name'][0]}  as disp,
-            FROM (SELECT uid, ndist_axis FROM proc_{self.damage.ascending.table_name} WHERE rdeck = {deckUid}) as first
-            JOIN {self.damage.ascending.table_name} as second
-            ON first.uid = second.uid
-            ORDER BY first.ndist_axis ASC
-        """).fetchnumpy()
-
-        dsc = self.db.con.sql(f"""
-            SELECT 
-                first.ndist_axis as ndist,
-                second.{timeOverlapInfo['descending']['name'][-1]} - second.{timeOverlapInfo['descending']['name'][0]}  as disp,
-            FROM (SELECT uid, ndist_axis FROM proc_{self.damage.descending.table_name} WHERE rdeck = {deckUid}) as first
-            JOIN {self.damage.descending.table_name} as second
-            ON first.uid = second.uid
-            ORDER BY first.ndist_axis ASC
-        """).fetchnumpy()
-
-        return dict(deck = deck, ascending = asc, descending = dsc)
+        parameters = dict(deckuids = [int(i) for i in deckUids])
+        deck = self.db.con.execute(self.query.ns_deck(f"proc_{self.damage.deck.table_name}", batch=True), parameters).fetchnumpy()
+        data = dict(deck = deck)
+
+        for orbit in ['ascending', 'descending']:
+            if cubes is not None:
+                profiles = [cubes[orbit].deck_profile(uid) for uid in deck['rdeck']]
+                data[orbit] = dict(
+                    index = repeat(arange(len(profiles)), [i['ndist'].size for i in profiles]),
+                    ndist = concatenate([i['ndist'] for i in profiles] + [empty(0)]),
+                    disp = concatenate([i['disp'] for i in profiles] + [empty(0)]),
+                )
+                continue
+            points = self.db.con.execute(self.query.ns_scatters(getattr(self.damage, orbit).table_name, timeOverlapInfo[orbit]['field'], batch=True), parameters).fetchnumpy()
+            data[orbit] = dict(index = searchsorted(deck['rdeck'], points['rdeck']), ndist = points['ndist'], disp = points['disp'])
+        return data
 
     def generate_report(self, based_on:str=None):
         """ Generate a PDF report of the damage assessment results.
         This method generates a PDF report containing the damage assessment results for each deck in the database.
+        The report is written to the workspace of the run as `{run_id}_report.pdf`.
         The report will include plots for each deck based on the specified column name.
         
         Arguments
@@ -426,21 +979,27 @@ class DamageAssessment:
         
         Raises
         ------
-            ValueError: If the specified column does not exist in the damage deck table.
+            ValueError: If the specified column does not exist in the damage deck table, or if the buffer distance of the results cannot be determined after reconnecting to a DuckDB file.
         """
     
+        if not hasattr(self, "dbpipeline"):
+            self.dbpipeline = DBPipeline(self.damage, self.db.con)
         # valid_columns = get_column_names(self.damage.deck.table_name, self.db.con)
         valid_columns = self.dbpipeline.get_attributes(self.damage.deck.table_name)
         if based_on not in valid_columns and based_on is not None:
             raise ValueError(f"The {based_on} column does not exist in the {self.damage.deck.table_name} table.")
         
-        with PdfPages(self.db._db_path.split('.')[0] + '_report.pdf') as pdf:
+        with PdfPages(os.path.splitext(self.db._db_path)[0] + '_report.pdf') as pdf:
             # TODO: ITERATE OVER THE DECK UIDS FOR BOTH NS AND EW 
             # and generate the plots for each deck
-            for deckuid in self.db.con.sql(f"SELECT rdeck FROM result").fetchnumpy()['rdeck']:
-                fig, ax = self._plot(deckuid, self._buf_size)
-                pdf.savefig(fig)
-                plt.close(fig)
+            buffer_distance = self._buf_size if getattr(self, "_buf_size", None) is not None else self._processed_buffer_distance()
+            deckuids = self.db.con.execute("SELECT rdeck FROM result WHERE buffer_distance = ?", (float(buffer_distance),)).fetchnumpy()['rdeck'].tolist()
+            for i in range(0, len(deckuids), self.deck_batch_size):
+                layers = self._plot_layers(deckuids[i:i + self.deck_batch_size], buffer_distance)
+                for deckuid in deckuids[i:i + self.deck_batch_size]:
+                    fig, ax = self._plot(deckuid, buffer_distance, layers[deckuid])
+                    pdf.savefig(fig)
+                    plt.close(fig)
                 
 
     def export_results(self, bridge_object:Union[Deck, Axis, Support, Ascending, Descending],
@@ -472,72 +1031,132 @@ class DamageAssessment:
                 nameFields.append(date)
         return array(nameFields), array(dateFields)
 
-    def _plot(self, deckuid: int, buf_dist:float):
+    def _plot_layers(self, deckuids: list[int], buf_dist: float) -> dict:
+        """ Get the layers of the plots of the damage assessment results for the specified deck UIDs.
+        This method retrieves every layer of the plots of all decks with one query and splits it per deck.
+        
+        Arguments
+        ----------
+        deckuids (list[int]): The unique identifiers of the decks.
+        buf_dist (float): The buffer distance used for processing geometries.
+        
+        Returns
+        -------
+        dict: The keyword arguments of `Plotter.plot` of each deck, keyed by the deck UID.
+        """
+        timeoverlapInfo = self._get_timeoverlap()
+        parameters = dict(deckuids = [int(i) for i in deckuids])
+        rows = lambda query: self.query.group_rows(self.db.con.execute(query, parameters).fetchall(), deckuids)
+        columns = lambda query: self.query.group_columns(self.db.con.execute(query, parameters).fetchnumpy(), deckuids)
+
+        deck = rows(self.query.deck_geometry(f"proc_{self.damage.deck.table_name}", batch=True))
+        axis = rows(self.query.axis_geometry(f"proc_{self.damage.axis.table_name}", batch=True))
+        support = rows(self.query.support_geometry(f"proc_{self.damage.support.table_name}", batch=True))
+        sectors = rows(self.query.sector_geometry(batch=True))
+        deck_edge = rows(self.query.deck_edge(f"{self.damage.deck.table_name}", batch=True))
+        asc_points = columns(self.query.scatter_geometry(f'proc_{self.damage.ascending.table_name}', batch=True))
+        asc_proj = columns(self.query.projected_scatters(f'proc_{self.damage.ascending.table_name}', batch=True))
+        dsc_points = columns(self.query.scatter_geometry(f'proc_{self.damage.descending.table_name}', batch=True))
+        dsc_proj = columns(self.query.projected_scatters(f'proc_{self.damage.descending.table_name}', batch=True))
+        buf_edges = rows(self.query.buffer_edge(f"proc_{self.damage.axis.table_name}", f"proc_{self.damage.deck.table_name}", batch=True))
+        deck_edge_graph = rows(self.query.deck_edge_graph(f"proc_{self.damage.axis.table_name}", f"proc_{self.damage.deck.table_name}", batch=True))
+        asc_geom_graph = columns(self.query.scatter_graph(self.damage.ascending.table_name, timeoverlapInfo['ascending']['field'], batch=True))
+        dsc_geom_graph = columns(self.query.scatter_graph(self.damage.descending.table_name, timeoverlapInfo['descending']['field'], batch=True))
+        support_graph = columns(self.query.support_graph(self.damage.axis.table_name, self.damage.support.table_name, batch=True))
+        result = self.query.group_rows(self.db.con.execute(self.query.deck_result(batch=True), dict(parameters, buffer_distance=float(buf_dist))).fetchall(), deckuids)
+
+        layers = dict()
+        for deckuid in parameters['deckuids']:
+            (deck_orientation, asc_quad_x, asc_quad_y, dsc_quad_x, dsc_quad_y, asc_analytic, dsc_analytic,
+                tilt_asc, defl_asc, tilt_dsc, defl_dsc, tilt, defl) = result[deckuid][0]
+            layers[deckuid] = dict(
+                deck_geom = wkbloads(deck[deckuid][0][0]),
+                sector_geom = wkbloads(sectors[deckuid]),
+                axis_geom = wkbloads(axis[deckuid][0][0]),
+                support_geom = wkbloads(support[deckuid]),
+                deck_edges = wkbloads(deck_edge[deckuid][0]),
+                ascending_geom = asc_points[deckuid],
+                descending_geom = dsc_points[deckuid],
+                projected_ascending = asc_proj[deckuid],
+                projected_descending = dsc_proj[deckuid],
+                buffer_edges = buf_edges[deckuid][0],
+                deck_edge_graph = deck_edge_graph[deckuid][0],
+                ascending_geom_graph = asc_geom_graph[deckuid],
+                descending_geom_graph = dsc_geom_graph[deckuid],
+                support_graph = support_graph[deckuid],
+                deck_orientation = deck_orientation,
+                ascending_quad_solution = dict(x = [asc_quad_x], y = [asc_quad_y]),
+                descending_quad_solution = dict(x = [dsc_quad_x], y = [dsc_quad_y]),
+                ascending_analytic_solution = asc_analytic,
+                descending_analytic_solution = dsc_analytic,
+                ascending_tilt_deflection = (tilt_asc, defl_asc),
+                descending_tilt_deflection = (tilt_dsc, defl_dsc),
+                ew_tilt_deflection = (tilt, defl),
+            )
+        return layers
+
+    def _plot(self, deckuid: int, buf_dist:float, layers: dict = None):
         """ Plot the damage assessment results for a specific deck UID.
-        This method retrieves the necessary data for the specified deck UID and plots the damage assessment results using the Plotter class.
+        This method plots the damage assessment results of the deck using the Plotter class. The layers of the plot are retrieved with `_plot_layers` if they are not given.
         
         Arguments
         ----------
         deckuid (int): The unique identifier for the deck.
         buf_dist (float): The buffer distance used for processing geometries.
+        layers (dict): The layers of the plot of the deck from `_plot_layers`. Defaults to None.
         
         Returns
         -------
         fig: matplotlib.figure.Figure
             The figure object containing the plotted damage assessment results.
         """
-        timeoverlapInfo = self._get_timeoverlap()
+        if layers is None:
+            layers = self._plot_layers([deckuid], buf_dist)[int(deckuid)]
 
-        deck = wkbloads(self.db.con.sql(self.query.deck_geometry(deckuid, f"proc_{self.damage.deck.table_name}")).fetchone()[0])
-        axis = wkbloads(self.db.con.sql(self.query.axis_geometry(deckuid, f"proc_{self.damage.axis.table_name}")).fetchone()[0])
-        support = wkbloads(self.db.con.sql(self.query.support_geometry(deckuid, f"proc_{self.damage.support.table_name}")).fetchall())
-        sectors = wkbloads(self.db.con.sql(self.query.sector_geometry(deckuid)).fetchall())
-        deck_edge = wkbloads(self.db.con.sql(self.query.deck_edge(deckuid, f"{self.damage.deck.table_name}")).fetchall()[0])
-        asc_points = self.db.con.sql(self.query.scatter_geometry(deckuid, f'proc_{self.damage.ascending.table_name}')).fetchnumpy()
-        asc_proj = self.db.con.sql(self.query.projected_scatters(deckuid, f'proc_{self.damage.ascending.table_name}')).fetchnumpy()
-        dsc_points = self.db.con.sql(self.query.scatter_geometry(deckuid, f'proc_{self.damage.descending.table_name}')).fetchnumpy()
-        dsc_proj = self.db.con.sql(self.query.projected_scatters(deckuid, f'proc_{self.damage.descending.table_name}')).fetchnumpy()
-        buf_edges = self.db.con.sql(self.query.buffer_edge(deckuid, f"proc_{self.damage.axis.table_name}", f"proc_{self.damage.deck.table_name}")).fetchone()
-        deck_edge_graph = self.db.con.sql(self.query.deck_edge_graph(deckuid, f"proc_{self.damage.axis.table_name}", f"proc_{self.damage.deck.table_name}")).fetchone()
-        asc_geom_graph = self.db.con.sql(self.query.scatter_graph(deckuid, self.damage.ascending.table_name, timeoverlapInfo['ascending']['name'])).fetchnumpy()
-        dsc_geom_graph = self.db.con.sql(self.query.scatter_graph(deckuid, self.damage.descending.table_name, timeoverlapInfo['descending']['name'])).fetchnumpy()
-        support_graph = self.db.con.sql(self.query.support_graph(deckuid, self.damage.axis.table_name, self.damage.support.table_name)).fetchnumpy()
-        deck_orientation = self.db.con.sql(f"SELECT orientation FROM proc_{self.damage.deck.table_name} WHERE uid = {deckuid}").fetchone()[0]
-        ascending_quad_solution = self.db.con.sql(f"""SELECT ns_quadratic_asc_x as x, ns_quadratic_asc_y as y FROM result WHERE rdeck = {deckuid}""").fetchnumpy()
-        descending_quad_solution = self.db.con.sql(f"""SELECT ns_quadratic_dsc_x as x, ns_quadratic_dsc_y as y FROM result WHERE rdeck = {deckuid}""").fetchnumpy()
-        ascending_analytic_solution = self.db.con.sql(f"SELECT ns_analytical_asc_y FROM result WHERE rdeck = {deckuid}").fetchall()[0][0]
-        descending_analytic_solution = self.db.con.sql(f"SELECT ns_analytical_dsc_y FROM result WHERE rdeck = {deckuid}").fetchall()[0][0]
-        ascending_tilt_deflection = self.db.con.sql(f"SELECT tilt_asc, defl_asc FROM result WHERE rdeck = {deckuid}").fetchone()
-        descending_tilt_deflection = self.db.con.sql(f"SELECT tilt_dsc, defl_dsc FROM result WHERE rdeck = {deckuid}").fetchone()
-        ew_tilt_deflection = self.db.con.sql(f"SELECT tilt, defl FROM result WHERE rdeck = {deckuid}").fetchone()
-        
-        self._plotter.plot(
-            deck_geom = deck,
-            sector_geom = sectors,
-            axis_geom = axis,
-            support_geom = support,
-            deck_edges = deck_edge,
-            ascending_geom = asc_points,
-            descending_geom = dsc_points,
-            buf_dist = buf_dist,
-            projected_ascending=asc_proj,
-            projected_descending=dsc_proj,
-            buffer_edges = buf_edges,
-            deck_edge_graph = deck_edge_graph,
-            ascending_geom_graph = asc_geom_graph,
-            descending_geom_graph = dsc_geom_graph,
-            support_graph = support_graph,
-            deck_orientation = deck_orientation,
-            ascending_quad_solution=ascending_quad_solution,
-            descending_quad_solution=descending_quad_solution,
-            ascending_analytic_solution=ascending_analytic_solution,
-            descending_analytic_solution=descending_analytic_solution,
-            ascending_tilt_deflection = ascending_tilt_deflection,
-            descending_tilt_deflection = descending_tilt_deflection,
-            ew_tilt_deflection = ew_tilt_deflection
-        )
+        self._plotter.plot(buf_dist = buf_dist, **layers)
         
         
         self._plotter.postprocess(name_tag=deckuid)
 
-        return self._plotter.get_figure()
\ No newline at end of file
+        return self._plotter.get_figure()
+
+
+def run_partition(damage: BridgeDamage, db_path: str, computational_projection: str, buffer_distance: float, execution_profile: ExecutionProfile = None, use_cube: bool = False) -> dict:
+    """ Preprocess and assess the decks of a partition database file.
+
+    The partition is opened with its own connection, preprocessed with `DamageAssessment.preprocess` and assessed with `DamageAssessment.assess_damage`, the processed tables and the `result` table are stored in the partition file. The function only takes picklable arguments, so the partitions can also be run in other processes.
+
+    Arguments
+    ---------
+    damage : BridgeDamage
+        The data objects of the damage assessment, their table names are the names of the source tables in the partition.
+    db_path : str
+        The path of the partition database file, see `DBPipeline.export_partition`.
+    computational_projection : str
+        The coordinate reference system for computations.
+    buffer_distance : float
+        The distance to buffer geometries.
+    execution_profile : ExecutionProfile, optional
+        The DuckDB execution settings of the partition connection. Defaults to the DuckDB defaults.
+    use_cube : bool
+        If True, the decks are assessed with the displacement cubes of the partition. Defaults to False.
+
+    Returns
+    -------
+    dict: The time in seconds of each preprocessing stage, the assessment under the `assess_damage` key and the total time under the `total` key.
+    """
+    assessment = DamageAssessment(
+        *[getattr(damage, i) for i in damage.__dataclass_fields__.keys()],
+        execution_profile = execution_profile,
+        workspace_root = os.path.dirname(db_path),
+    )
+    assessment.connect_duckdb_file(db_path)
+    try:
+        timings = assessment.preprocess(computational_projection, buffer_distance)
+        st = time.time()
+        assessment.assess_damage(use_cube)
+        timings['assess_damage'] = time.time() - st
+        timings['total'] += timings['assess_damage']
+    finally:
+        assessment.db.con.close()
+    return timings
@@ -13,10 +13,13 @@ class BaseData:
         The name of the table associated with the data.
     source_projection : str
         The spatial reference system of the source data. Default is `"EPSG:4326"`.
+    geometry_field : str
+        The name of the geometry column (GEOMETRY or WKB) of a Parquet source file. Default is `None`, the GeoParquet geometry column is used if there is one.
     """
     source_file : str
     table_name : str
     source_projection : str = "EPSG:4326"
+    geometry_field : str = None
 
     
 @dataclass 
@@ -88,6 +91,12 @@ class Ascending(BaseData):
         The spatial reference system of the source data, Default is `"EPSG:4326"`.
     scaling_factor : float
         A scaling factor for the data, Default is `1.0`.
+    time_series_layout : "columns", "array"
+        The storage layout of the displacement time series. `"columns"` keeps one column per acquisition date, `"array"` packs them into a single `ts` list column and a `{table_name}_dates` table at load time. Default is `"columns"`.
+    id_field : str
+        The name of the field identifying a point across source files, used to join new acquisitions in `DamageAssessment.append_acquisitions`. Default is `None`, the points are matched on the latitude and longitude fields.
+    displacement_type : "DOUBLE", "FLOAT"
+        The storage type of the displacement values. `"FLOAT"` stores them in 4 bytes instead of 8, which is enough for millimetre precision and halves the memory and disk use of the time series, the solvers still compute in double precision. Default is `"DOUBLE"`.
     """
     table_name : str = "ascending"
     unit : Literal["mm", "cm", "m"] = "m"
@@ -96,6 +105,9 @@ class Ascending(BaseData):
     orbit_azimuth : float = None
     incidence_angle : float = None
     scaling_factor : float = None
+    time_series_layout : Literal["columns", "array"] = "columns"
+    id_field : str = None
+    displacement_type : Literal["DOUBLE", "FLOAT"] = "DOUBLE"
     
 
 @dataclass
@@ -122,6 +134,12 @@ class Descending(Ascending):
         The spatial reference system of the source data, defaulting to `"EPSG:4326"`.
     scaling_factor : float
         A scaling factor for the data, defaulting to `1.0`.
+    time_series_layout : "columns", "array"
+        The storage layout of the displacement time series, defaulting to `"columns"`.
+    id_field : str
+        The name of the field identifying a point across source files, defaulting to `None`.
+    displacement_type : "DOUBLE", "FLOAT"
+        The storage type of the displacement values, defaulting to `"DOUBLE"`.
     """
     table_name : str = "descending"
 
@@ -148,3 +166,33 @@ class BridgeDamage:
     support: Support
     ascending : Ascending
     descending : Descending
+
+
+@dataclass
+class ExecutionProfile:
+    """ ExecutionProfile is a dataclass that holds the DuckDB execution settings applied to every database connection.
+
+    Attributes
+    ----------
+    threads : int
+        The number of threads used by DuckDB. Default is `None`, all cores are used.
+    memory_limit : str
+        The maximum memory of DuckDB, e.g. `"16GB"`. Default is `None`, 80% of the system memory.
+    temp_directory : str
+        The directory where DuckDB spills to disk when the memory limit is reached, e.g. a fast local scratch disk. Default is `None`, next to the database file.
+    max_temp_directory_size : str
+        The maximum size of the spill directory, e.g. `"100GB"`. Default is `None`, 90% of the available disk space.
+    """
+    threads : int = None
+    memory_limit : str = None
+    temp_directory : str = None
+    max_temp_directory_size : str = None
+
+    def config(self) -> dict:
+        """ Get the DuckDB configuration of the profile.
+
+        Returns
+        -------
+        dict: The settings that are not None, to be passed to `duckdb.connect`.
+        """
+        return {name: value for name, value in self.__dict__.items() if value is not None}
@@ -1,26 +1,44 @@
 import os
+import glob
+import uuid
 import duckdb
+import hashlib
 from datetime import datetime
+from .data import ExecutionProfile
 
 class DataBase:
     """A class to manage a DuckDB database for SafeBridge.
     
-    This class initializes a DuckDB database in a specified directory, loads the spatial extension if available, and provides methods to load files into the database. It supports loading CSV and Shapefile formats into tables, creating sequences for unique IDs, and adding UID columns.
-    It also ensures that the database directory is created if it does not exist. The database file is named with a timestamp to ensure uniqueness. The database is stored in a folder named `"safebridgeDB"` which will be generated in your run time path. The class provides methods to initialize the database directory, load files,
+    This class initializes a DuckDB database in a specified directory, loads the spatial extension if available, and provides methods to load files into the database. It supports loading CSV, Shapefile and (Geo)Parquet formats into tables, creating sequences for unique IDs, and adding UID columns.
+    It also ensures that the database directory is created if it does not exist. Every run gets an isolated workspace folder named with a unique run ID, made of a timestamp and a random suffix, which holds the database file and the other outputs of the run, so several assessments can run side by side. The workspaces are stored in a root folder, by default `"safebridgeDB"` in your run time path. The class provides methods to initialize the database directory, load files,
     and manage the database connection.
     
     Attributes
     ----------
     db_path : str
         The path to the DuckDB database file.
+    root_dir : str
+        The root directory of the run workspaces and the ingest cache. Default is `"safebridgeDB"`.
+    run_id : str
+        The unique ID of the run, the name of its workspace folder and database file.
     con : duckdb.DuckDBPyConnection
         The connection to the DuckDB database.
+    cache_dir : str
+        The directory of the persistent ingest cache shared by the runs. Default is `"safebridgeDB/cache"`.
+    profile : ExecutionProfile
+        The DuckDB execution settings applied to every connection.
 
     Methods
     -------
         setup(): Sets up the DuckDB connection and loads the spatial extension.
-        init_db_dir(): Initializes the database directory and creates a new DuckDB database file.
-        load_file(source_file: str, table_name: str): Loads a file into the DuckDB database.
+        connect(duckdb_file: str): Opens a connection with the execution profile and the spatial extension.
+        init_db_dir(): Initializes the workspace of a new run and the path of its DuckDB database file.
+        load_file(source_file: str, table_name: str, connection: duckdb.DuckDBPyConnection = None, geometry_field: str = None, time_series_fields: list[str] = None, where: str = None, cache: bool = False, cache_dependencies: list[str] = None, packed: bool = False, displacement_type: str = "DOUBLE"): Loads a file into the DuckDB database.
+        append_time_series(source_file: str, table_name: str, key_fields: list[str], time_series_fields: list[str], packed: bool = False): Appends new acquisition dates of a source file to an existing table.
+        fingerprint(source_file: str): Computes the content hash of a source file for the ingest cache.
+        source_columns(source_file: str): Gets the column names of a source file without loading it.
+        spatial_pushdown_filter(deck_table: str, deck_projection: str, source_projection: str, margin: float, x_field: str, y_field: str, name: str, metric_projection: str = None): Builds a filter keeping only the points close to the decks.
+        utm_projection(deck_table: str, deck_projection: str): Gets the UTM zone of the decks.
         connect_duckdbfile(duckdb_file: str): Connects to an existing DuckDB database file.
     
     Raises
@@ -30,10 +48,22 @@ class DataBase:
         duckdb.DuckDBPyConnection: If the connection to the DuckDB database fails.
     
     """
-    def __init__(self):
-        """Initialize the DataBase class."""
+    def __init__(self, profile: ExecutionProfile = None, root_dir: str = "safebridgeDB"):
+        """Initialize the DataBase class.
+
+        Arguments
+        ---------
+        profile : ExecutionProfile, optional
+            The DuckDB execution settings (threads, memory limit, spill directory) applied to every connection. Defaults to the DuckDB defaults.
+        root_dir : str
+            The root directory of the run workspaces and the ingest cache. Defaults to `"safebridgeDB"`.
+        """
         
         self.con = None
+        self.root_dir = root_dir
+        self.run_id = None
+        self.cache_dir = os.path.join(root_dir, "cache")
+        self.profile = ExecutionProfile() if profile is None else profile
 
     def setup(self):
         """Set up the DuckDB connection and load the spatial extension.
@@ -46,16 +76,46 @@ class DataBase:
         """
 
         self._db_path = self.init_db_dir()
-        self.con = duckdb.connect(self._db_path)
+        self.con = self.connect(self._db_path)
+        self.record_settings()
+
+    def connect(self, duckdb_file: str) -> duckdb.DuckDBPyConnection:
+        """ Open a connection to a DuckDB file with the execution profile and load the spatial extension.
+
+        Arguments
+        ---------
+        duckdb_file : str
+            The path to the DuckDB database file.
+
+        Returns
+        -------
+        duckdb.DuckDBPyConnection: The connection to the database.
+        """
+        connection = duckdb.connect(duckdb_file, config=self.profile.config())
         # Load the spatial extension if available
-        self.con.load_extension("spatial")  
+        connection.load_extension("spatial")
+        return connection
+
+    def record_settings(self):
+        """ Record the active execution settings of the connection in the `run_settings` table of the database.
+
+        Every connection adds its settings stamped with `recorded_at`, so the table keeps the history of the settings the run has been processed with.
+        """
+        self.con.execute("""
+            CREATE TABLE IF NOT EXISTS run_settings (name VARCHAR, value VARCHAR, recorded_at TIMESTAMP WITH TIME ZONE);
+            INSERT INTO run_settings
+            SELECT name, value, now() AS recorded_at
+            FROM duckdb_settings()
+            WHERE name IN ('threads', 'memory_limit', 'temp_directory', 'max_temp_directory_size')
+            ORDER BY name;
+        """)
+        print("Execution settings: " + ", ".join(f"{name}={value}" for name, value in self.con.execute("SELECT name, value FROM run_settings WHERE recorded_at = (SELECT max(recorded_at) FROM run_settings) ORDER BY name").fetchall()))
 
 
     def init_db_dir(self) -> str:
-        """ Initialize the database directory and create a new DuckDB database file.
+        """ Initialize the workspace of a new run and the path of its DuckDB database file.
 
-        This method creates a directory for the DuckDB database if it does not exist.
-        It generates a new DuckDB database file with a timestamp to ensure uniqueness.
+        This method generates a unique run ID from the current time and a random suffix, so runs started at the same moment by different processes do not share a database file. The workspace `{root_dir}/{run_id}` is created and the database file is named `{run_id}.duckdb` inside it, the report and the displacement cubes of the run are written next to it.
         
         Returns
         -------
@@ -67,20 +127,20 @@ class DataBase:
         
         """
 
-        db_folder = "safebridgeDB"
-        os.makedirs(db_folder, exist_ok=True) # if the folder does not exist, it will be created if exist it will not raise an error
+        # Unique name assingment in here, the random suffix separates the runs started in the same second
+        self.run_id = f"{datetime.now().strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        run_folder = os.path.join(self.root_dir, self.run_id)
+        os.makedirs(run_folder, exist_ok=False) # a new run never reuses an existing workspace
         
-        # Unique name assingment in here 
-        fname = os.path.join(db_folder, 
-                             f"{datetime.now().strftime('%Y%m%d%H%M')}.duckdb"
-                             )
         # return the full path to the database file in case it will be used
-        return fname
+        return os.path.join(run_folder, f"{self.run_id}.duckdb")
     
-    def load_file(self, source_file: str, table_name: str):
+    def load_file(self, source_file: str, table_name: str, connection: duckdb.DuckDBPyConnection = None, geometry_field: str = None, time_series_fields: list[str] = None, where: str = None, cache: bool = False, cache_dependencies: list[str] = None, packed: bool = False, displacement_type: str = "DOUBLE"):
         """ Load a file into the DuckDB database.  
         
-        This method checks the file extension to determine the appropriate loading method. It supports CSV and Shapefile formats. For CSV files, it uses `read_csv_auto`, and for Shapefiles, it uses `ST_Read`. It creates a new table with the specified name. If the table already exists, it will be dropped and recreated. This method also creates a sequence for the table to generate unique IDs and adds a UID column to the table. If the file does not exist, it raises a `FileNotFoundError`. If the file format is unsupported, it raises a `ValueError`.
+        This method checks the file extension to determine the appropriate loading method. It supports CSV, Shapefile and (Geo)Parquet formats. For CSV files, it uses `read_csv_auto`, for Shapefiles, it uses `ST_Read`, and for Parquet files, it uses `read_parquet`, which reads the columns in parallel. It creates a new table with the specified name. If the table already exists, it will be dropped and recreated. This method also creates a sequence for the table to generate unique IDs and adds a UID column to the table. If the file does not exist, it raises a `FileNotFoundError`. If the file format is unsupported, it raises a `ValueError`.
+
+        The geometry of a Parquet file is stored in the `geom` column of the table. For GeoParquet files the primary geometry column is detected from the file metadata, for plain Parquet files the WKB encoded column is given with `geometry_field`. Parquet files without a geometry column are loaded as they are, e.g. persistent scatter tables with latitude and longitude fields.
         
         Arguments
         ---------
@@ -88,13 +148,29 @@ class DataBase:
             The path to the file to load.
         table_name : str
             The name of the table to create or append to.
+        connection : duckdb.DuckDBPyConnection, optional
+            The connection used to load the file. Defaults to the `con` attribute of the class. A cursor created with `con.cursor()` can be passed to load several files concurrently from different threads.
+        geometry_field : str, optional
+            The name of the geometry column (GEOMETRY or WKB encoded BLOB) of a Parquet file. Defaults to the first GEOMETRY column of the file.
+        time_series_fields : list[str], optional
+            The date columns of a persistent scatter file in chronological order. If given, they are cast to the `displacement_type` at load time.
+        where : str, optional
+            SQL condition on the columns of the source file. Only the rows satisfying the condition are loaded, e.g. the clause returned by `spatial_pushdown_filter`.
+        cache : bool
+            If True, the loaded table is kept in the ingest cache and restored from there while the source file and the loading options do not change. Defaults to False.
+        cache_dependencies : list[str], optional
+            Other source files the loaded rows depend on, e.g. the deck file of a spatial pushdown filter. They are part of the cache key.
+        packed : bool
+            If True, the `time_series_fields` are packed into a single `ts` list column and their names are stored in the `{table_name}_dates` table with their position `idx` in the list. Defaults to False.
+        displacement_type : str
+            The SQL type of the displacement values, `"DOUBLE"` or `"FLOAT"`. The displacements of millimetre precision fit in the 4 bytes of a `"FLOAT"`, which halves the size of the time series in memory and on disk. Defaults to `"DOUBLE"`.
         
         Raises
         ------
         FileNotFoundError: 
             If the specified file does not exist.
         ValueError
-            If the file format is unsupported.
+            If the file format is unsupported or the geometry field does not exist.
         """
 
         # Validate inputs
@@ -110,19 +186,410 @@ class DataBase:
         if not os.path.exists(source_file):
             raise FileNotFoundError(f"File {source_file} does not exist.")
         
-        if source_file.endswith('.csv'):
-            load_method = "read_csv_auto"
-        elif source_file.endswith('.shp'):
-            load_method = "ST_Read"
-        else:
-            raise ValueError("Unsupported file format. Only CSV and Shapefile are supported.")
+        connection = self.con if connection is None else connection
+        if cache:
+            cache_key = hashlib.sha256("|".join([
+                *[self.fingerprint(f) for f in [source_file, *(cache_dependencies or [])]],
+                str(geometry_field), str(time_series_fields), str(where), str(packed), displacement_type,
+            ]).encode()).hexdigest()
+            if self._restore_from_cache(cache_key, table_name, packed, connection):
+                return
+
+        select_statement = self._source_select(source_file, geometry_field, connection)
+        if where is not None:
+            select_statement = f"SELECT * FROM ({select_statement}) WHERE {where}"
+        if time_series_fields is not None and packed:
+            select_statement = f"""
+                SELECT * EXCLUDE ({", ".join(time_series_fields)}), [{", ".join(time_series_fields)}]::{displacement_type}[] AS ts
+                FROM ({select_statement})
+            """
+            connection.execute(f"""
+                CREATE OR REPLACE TABLE {table_name}_dates AS
+                SELECT idx::INTEGER AS idx, name FROM (SELECT unnest(?::VARCHAR[]) AS name, generate_subscripts(?::VARCHAR[], 1) AS idx)
+            """, (time_series_fields, time_series_fields))
+        elif time_series_fields is not None:
+            select_statement = f"""
+                SELECT * REPLACE ({", ".join(f"{field}::{displacement_type} AS {field}" for field in time_series_fields)})
+                FROM ({select_statement})
+            """
         
-        self.con.execute(f"""
-                         CREATE OR REPLACE TABLE {table_name} AS SELECT * FROM {load_method}('{source_file}');
+        connection.execute(f"""
+                         CREATE OR REPLACE TABLE {table_name} AS {select_statement};
                          CREATE OR REPLACE SEQUENCE {table_name}_id;
                          ALTER TABLE {table_name} ADD COLUMN uid INTEGER DEFAULT nextval('{table_name}_id');
                          """
                          )
+        if cache:
+            self._store_in_cache(cache_key, table_name, packed, connection)
+
+    def append_time_series(self, source_file: str, table_name: str, key_fields: list[str], time_series_fields: list[str], packed: bool = False, displacement_type: str = "DOUBLE", geometry_field: str = None, tolerance: float = None, connection: duckdb.DuckDBPyConnection = None) -> int:
+        """ Append new acquisition dates of a persistent scatter file to an existing table.
+
+        The source file is read into a temporary table and its date columns are joined to the rows of the existing table on the key fields, the other columns and the `uid` of the table are not touched. With a `tolerance` the key fields are matched within it and every point of the table gets the dates of the nearest point of the source file, e.g. for coordinates written with another precision. For the column layout every date becomes a new column of the table, for the packed layout the dates are appended to the `ts` list column and their names to the `{table_name}_dates` table. Every point of the table must be matched, points of the source file that are not in the table are ignored.
+
+        Arguments
+        ---------
+        source_file : str
+            The path to the file with the new acquisitions.
+        table_name : str
+            The name of the existing table.
+        key_fields : list[str]
+            The columns identifying a point in both the table and the source file, e.g. the point id or the latitude and longitude fields. They must be unique in the source file.
+        time_series_fields : list[str]
+            The new date columns of the source file in chronological order.
+        packed : bool
+            If True, the table stores its time series in the `ts` list column. Defaults to False.
+        displacement_type : str
+            The SQL type of the displacement values of the table, `"DOUBLE"` or `"FLOAT"`. Defaults to `"DOUBLE"`.
+        geometry_field : str, optional
+            The name of the geometry column of a Parquet file.
+        tolerance : float, optional
+            The largest difference of the numeric key fields of matching points. Defaults to None, the key fields must be equal.
+        connection : duckdb.DuckDBPyConnection, optional
+            The connection used to append the dates. Defaults to the `con` attribute of the class.
+
+        Returns
+        -------
+        int: The number of points of the table that received the new dates.
+
+        Raises
+        ------
+        FileNotFoundError:
+            If the specified file does not exist.
+        ValueError
+            If a key field is missing or not unique in the source file, or if a point of the table is not in the source file.
+        """
+        if not os.path.exists(source_file):
+            raise FileNotFoundError(f"File {source_file} does not exist.")
+
+        connection = self.con if connection is None else connection
+        connection.execute(f"""
+            CREATE OR REPLACE TEMP TABLE {table_name}_append AS
+            SELECT {", ".join([*key_fields, *time_series_fields])} FROM ({self._source_select(source_file, geometry_field, connection)})
+        """)
+        keys = ", ".join(key_fields)
+        duplicates = connection.execute(f"SELECT COUNT(*) - COUNT(DISTINCT ({keys})) FROM {table_name}_append").fetchone()[0]
+        if duplicates:
+            connection.execute(f"DROP TABLE {table_name}_append")
+            raise ValueError(f"The key fields {key_fields} are not unique in {source_file}.")
+
+        # the points of the table are matched once, the missing points would get NULL dates and NaN results
+        if tolerance is None:
+            join_condition = " AND ".join(f"first.{field} = second.{field}" for field in key_fields)
+            nearest = ""
+        else:
+            join_condition = " AND ".join(f"second.{field} BETWEEN first.{field} - {float(tolerance)} AND first.{field} + {float(tolerance)}" for field in key_fields)
+            nearest = f"QUALIFY row_number() OVER (PARTITION BY first.uid ORDER BY {' + '.join(f'abs(first.{field} - second.{field})' for field in key_fields)}) = 1"
+        connection.execute(f"""
+            CREATE OR REPLACE TEMP TABLE {table_name}_matched AS
+            SELECT first.uid, {", ".join(f"second.{field}" for field in time_series_fields)}
+            FROM {table_name} AS first
+            JOIN {table_name}_append AS second
+            ON {join_condition}
+            {nearest}
+        """)
+        connection.execute(f"DROP TABLE {table_name}_append")
+        matched, total = connection.execute(f"SELECT (SELECT COUNT(*) FROM {table_name}_matched), (SELECT COUNT(*) FROM {table_name})").fetchone()
+        if matched < total:
+            connection.execute(f"DROP TABLE {table_name}_matched")
+            raise ValueError(f"{total - matched} of {total} points of the {table_name} table are not in {source_file}, the key fields {key_fields} must match every point.")
+
+        if packed:
+            connection.execute(f"""
+                UPDATE {table_name} SET ts = list_concat(ts, [{", ".join(f"source.{field}" for field in time_series_fields)}]::{displacement_type}[])
+                FROM {table_name}_matched AS source
+                WHERE {table_name}.uid = source.uid
+            """)
+            connection.execute(f"""
+                INSERT INTO {table_name}_dates
+                SELECT (SELECT MAX(idx) FROM {table_name}_dates) + idx::INTEGER AS idx, name FROM (SELECT unnest(?::VARCHAR[]) AS name, generate_subscripts(?::VARCHAR[], 1) AS idx)
+            """, (time_series_fields, time_series_fields))
+        else:
+            for field in time_series_fields:
+                connection.execute(f"ALTER TABLE {table_name} ADD COLUMN {field} {displacement_type}")
+            connection.execute(f"""
+                UPDATE {table_name} SET {", ".join(f"{field} = source.{field}" for field in time_series_fields)}
+                FROM {table_name}_matched AS source
+                WHERE {table_name}.uid = source.uid
+            """)
+        connection.execute(f"DROP TABLE {table_name}_matched")
+        return matched
+
+    def fingerprint(self, source_file: str) -> str:
+        """ Compute the content hash of a source file.
+
+        The SHA-256 hash of the file content is stored in the ingest cache under a key made of the absolute path, size and modification time of the file, so an unchanged file is not read again to compute its hash. The sidecar files of a Shapefile (`.shx`, `.dbf`, `.prj`, ...) are part of the hash.
+
+        Arguments
+        ---------
+        source_file : str
+            The path to the source file.
+
+        Returns
+        -------
+        str: The hexadecimal content hash of the file.
+        """
+        files = [source_file]
+        if source_file.endswith('.shp'):
+            files = sorted(glob.glob(glob.escape(os.path.splitext(source_file)[0]) + ".*"))
+
+        stamp_dir = os.path.join(self.cache_dir, "fingerprints")
+        os.makedirs(stamp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        for fname in files:
+            stat = os.stat(fname)
+            stamp = os.path.join(stamp_dir, hashlib.sha256(f"{os.path.abspath(fname)}|{stat.st_size}|{stat.st_mtime_ns}".encode()).hexdigest())
+            if os.path.exists(stamp):
+                with open(stamp) as f:
+                    content_hash = f.read()
+            else:
+                file_digest = hashlib.sha256()
+                with open(fname, "rb") as f:
+                    for block in iter(lambda: f.read(1 << 20), b""):
+                        file_digest.update(block)
+                content_hash = file_digest.hexdigest()
+                tmp = f"{stamp}.{uuid.uuid4().hex}.tmp"
+                with open(tmp, "w") as f:
+                    f.write(content_hash)
+                os.replace(tmp, stamp)
+            digest.update(f"{os.path.basename(fname)}:{content_hash}".encode())
+        return digest.hexdigest()
+
+    def _restore_from_cache(self, cache_key: str, table_name: str, with_dates: bool, connection: duckdb.DuckDBPyConnection) -> bool:
+        """ Restore a loaded table from the ingest cache.
+
+        Arguments
+        ---------
+        cache_key : str
+            The cache key of the source file and its loading options.
+        table_name : str
+            The name of the table to restore.
+        with_dates : bool
+            If True, the `{table_name}_dates` table of the packed time series is restored as well.
+        connection : duckdb.DuckDBPyConnection
+            The connection used to restore the table.
+
+        Returns
+        -------
+        bool: True if the table has been restored, False if it is not in the cache.
+        """
+        cache_file = os.path.join(self.cache_dir, f"{cache_key}.duckdb")
+        if not os.path.exists(cache_file):
+            return False
+
+        alias = f"cache_{cache_key[:16]}_{uuid.uuid4().hex[:8]}"
+        connection.execute(f"""
+            ATTACH '{cache_file}' AS {alias} (READ_ONLY);
+            CREATE OR REPLACE TABLE {table_name} AS SELECT * FROM {alias}.data;
+            {f"CREATE OR REPLACE TABLE {table_name}_dates AS SELECT * FROM {alias}.dates;" if with_dates else ""}
+            DETACH {alias};
+        """)
+        next_uid = connection.execute(f"SELECT COALESCE(MAX(uid), 0) + 1 FROM {table_name}").fetchone()[0]
+        connection.execute(f"""
+            CREATE OR REPLACE SEQUENCE {table_name}_id START {next_uid};
+            ALTER TABLE {table_name} ALTER COLUMN uid SET DEFAULT nextval('{table_name}_id');
+        """)
+        print(f"The {table_name} table has been restored from the ingest cache.")
+        return True
+
+    def _store_in_cache(self, cache_key: str, table_name: str, with_dates: bool, connection: duckdb.DuckDBPyConnection):
+        """ Store a loaded table in the ingest cache.
+
+        The table is written to a temporary DuckDB file which is renamed to its final name at the end, so concurrent runs never see a partially written cache file.
+
+        Arguments
+        ---------
+        cache_key : str
+            The cache key of the source file and its loading options.
+        table_name : str
+            The name of the table to store.
+        with_dates : bool
+            If True, the `{table_name}_dates` table of the packed time series is stored as well.
+        connection : duckdb.DuckDBPyConnection
+            The connection used to store the table.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        cache_file = os.path.join(self.cache_dir, f"{cache_key}.duckdb")
+        tmp = f"{cache_file}.{uuid.uuid4().hex}.tmp"
+        alias = f"cache_{cache_key[:16]}_{uuid.uuid4().hex[:8]}"
+        connection.execute(f"""
+            ATTACH '{tmp}' AS {alias};
+            CREATE TABLE {alias}.data AS SELECT * FROM {table_name};
+            {f"CREATE TABLE {alias}.dates AS SELECT * FROM {table_name}_dates;" if with_dates else ""}
+            DETACH {alias};
+        """)
+        os.replace(tmp, cache_file)
+
+    def spatial_pushdown_filter(self, deck_table: str, deck_projection: str, source_projection: str, margin: float, x_field: str, y_field: str, name: str, metric_projection: str = None, connection: duckdb.DuckDBPyConnection = None) -> str:
+        """ Build a filter that keeps only the points close to the decks while a persistent scatter file is read.
+
+        The envelopes of the loaded deck geometries are built in `metric_projection` and expanded by `margin` in metres, the expanded envelopes are reprojected to the projection of the point data. The cells of a regular grid touched by the envelopes are stored in the `{name}_cells` table, the grid size is the median envelope size, so a deck covers only a few cells. The returned condition keeps the points in these cells with a hash semi join, and it also limits the points to the overall extent of the envelopes, which can be pushed down to the Parquet row groups.
+
+        Arguments
+        ---------
+        deck_table : str
+            The name of the loaded deck table.
+        deck_projection : str
+            The spatial reference system of the deck table.
+        source_projection : str
+            The spatial reference system of the point data.
+        margin : float
+            The distance by which the deck envelopes are expanded in metres. It should not be smaller than the buffer distance used for preprocessing.
+        x_field : str
+            The SQL expression of the x coordinate (longitude) of the points.
+        y_field : str
+            The SQL expression of the y coordinate (latitude) of the points.
+        name : str
+            The name prefix of the cell table, e.g. the table name of the point data.
+        metric_projection : str, optional
+            The projected spatial reference system in metres in which the envelopes are expanded, e.g. the computational projection. Defaults to the UTM zone of the decks, see `utm_projection`.
+        connection : duckdb.DuckDBPyConnection, optional
+            The connection used to create the cell table. Defaults to the `con` attribute of the class.
+
+        Returns
+        -------
+        str: SQL condition to be passed as `where` to `load_file`.
+        """
+        connection = self.con if connection is None else connection
+        metric_projection = self.utm_projection(deck_table, deck_projection, connection) if metric_projection is None else metric_projection
+        geometry = "geom" if deck_projection == metric_projection else f"ST_Transform(geom, '{deck_projection}', '{metric_projection}', always_xy := true)"
+        expanded = f"ST_MakeEnvelope(ST_XMin(env) - {margin}, ST_YMin(env) - {margin}, ST_XMax(env) + {margin}, ST_YMax(env) + {margin})"
+        if metric_projection != source_projection:
+            expanded = f"ST_Transform({expanded}, '{metric_projection}', '{source_projection}', always_xy := true)"
+        connection.execute(f"""
+            CREATE OR REPLACE TABLE {name}_envelopes AS
+            SELECT ST_XMin(env) AS minx, ST_YMin(env) AS miny, ST_XMax(env) AS maxx, ST_YMax(env) AS maxy
+            FROM (SELECT ST_Envelope({expanded}) AS env FROM (SELECT ST_Envelope({geometry}) AS env FROM {deck_table}));
+        """)
+        cell_size, minx, miny, maxx, maxy = connection.execute(f"""
+            SELECT median(greatest(maxx - minx, maxy - miny)), min(minx), min(miny), max(maxx), max(maxy) FROM {name}_envelopes
+        """).fetchone()
+        # the grid cells are addressed with a single key of the column and row indices
+        connection.execute(f"""
+            CREATE OR REPLACE TABLE {name}_cells AS
+            SELECT DISTINCT cx * 4294967296 + unnest(range(fy, ly + 1)) AS cell
+            FROM (
+                SELECT 
+                    unnest(range(floor(minx / {cell_size})::BIGINT, floor(maxx / {cell_size})::BIGINT + 1)) AS cx,
+                    floor(miny / {cell_size})::BIGINT AS fy,
+                    floor(maxy / {cell_size})::BIGINT AS ly
+                FROM {name}_envelopes
+            );
+            DROP TABLE {name}_envelopes;
+        """)
+        print(f"Spatial pushdown grid with cell size {cell_size:.6f} has been created for {name}.")
+        return f"""
+            {x_field} BETWEEN {minx} AND {maxx} AND {y_field} BETWEEN {miny} AND {maxy}
+            AND floor({x_field} / {cell_size})::BIGINT * 4294967296 + floor({y_field} / {cell_size})::BIGINT IN (SELECT cell FROM {name}_cells)
+        """
+
+    def utm_projection(self, deck_table: str, deck_projection: str, connection: duckdb.DuckDBPyConnection = None) -> str:
+        """ Get the UTM zone of the decks as a projected spatial reference system in metres.
+
+        The zone is the one of the mean longitude and latitude of the deck centroids.
+
+        Arguments
+        ---------
+        deck_table : str
+            The name of the loaded deck table.
+        deck_projection : str
+            The spatial reference system of the deck table.
+        connection : duckdb.DuckDBPyConnection, optional
+            The connection used to read the deck table. Defaults to the `con` attribute of the class.
+
+        Returns
+        -------
+        str: The WGS 84 UTM zone of the decks, e.g. `"EPSG:32631"`.
+        """
+        connection = self.con if connection is None else connection
+        geometry = "ST_Centroid(geom)" if deck_projection == "EPSG:4326" else f"ST_Transform(ST_Centroid(geom), '{deck_projection}', 'EPSG:4326', always_xy := true)"
+        lon, lat = connection.execute(f"SELECT avg(ST_X(centroid)), avg(ST_Y(centroid)) FROM (SELECT {geometry} AS centroid FROM {deck_table})").fetchone()
+        return f"EPSG:{(32600 if lat >= 0 else 32700) + int((lon + 180) // 6) % 60 + 1}"
+
+    def source_columns(self, source_file: str, connection: duckdb.DuckDBPyConnection = None, geometry_field: str = None) -> list[str]:
+        """ Get the column names of a source file without loading it.
+
+        Arguments
+        ---------
+        source_file : str
+            The path to the source file.
+        connection : duckdb.DuckDBPyConnection, optional
+            The connection used to inspect the file. Defaults to the `con` attribute of the class.
+        geometry_field : str, optional
+            The name of the geometry column of a Parquet file.
+
+        Returns
+        -------
+        list[str]: The column names of the source file as they will be loaded to the database.
+        """
+        connection = self.con if connection is None else connection
+        select_statement = self._source_select(source_file, geometry_field, connection)
+        return [row[0] for row in connection.execute(f"DESCRIBE {select_statement}").fetchall()]
+
+    def _source_select(self, source_file: str, geometry_field: str, connection: duckdb.DuckDBPyConnection) -> str:
+        """ Build the select statement reading a source file based on its extension.
+
+        Arguments
+        ---------
+        source_file : str
+            The path to the source file.
+        geometry_field : str
+            The name of the geometry column of a Parquet file.
+        connection : duckdb.DuckDBPyConnection
+            The connection used to inspect Parquet files.
+
+        Returns
+        -------
+        str: SQL select statement reading the source file.
+
+        Raises
+        ------
+        ValueError
+            If the file format is unsupported.
+        """
+        if source_file.endswith('.csv'):
+            return f"SELECT * FROM read_csv_auto('{source_file}')"
+        elif source_file.endswith('.shp'):
+            return f"SELECT * FROM ST_Read('{source_file}')"
+        elif source_file.endswith('.parquet'):
+            return self._parquet_select(source_file, geometry_field, connection)
+        raise ValueError("Unsupported file format. Only CSV, Shapefile and Parquet are supported.")
+
+    def _parquet_select(self, source_file: str, geometry_field: str, connection: duckdb.DuckDBPyConnection) -> str:
+        """ Build the select statement for a (Geo)Parquet file that exposes its geometry as the `geom` column.
+
+        GeoParquet geometry columns are converted to GEOMETRY by the spatial extension while reading, WKB encoded BLOB columns are decoded with `ST_GeomFromWKB`.
+
+        Arguments
+        ---------
+        source_file : str
+            The path to the Parquet file.
+        geometry_field : str
+            The name of the geometry column. If None, the first GEOMETRY column is used if there is one.
+        connection : duckdb.DuckDBPyConnection
+            The connection used to inspect the file schema.
+
+        Returns
+        -------
+        str: SQL select statement reading the Parquet file.
+
+        Raises
+        ------
+        ValueError
+            If the geometry field does not exist in the Parquet file.
+        """
+        schema = dict(connection.execute(f"SELECT column_name, column_type FROM (DESCRIBE SELECT * FROM read_parquet('{source_file}'))").fetchall())
+
+        if geometry_field is None:
+            geometry_field = next((name for name, dtype in schema.items() if dtype.startswith("GEOMETRY")), None)
+            if geometry_field is None:
+                return f"SELECT * FROM read_parquet('{source_file}')"
+        elif geometry_field not in schema:
+            raise ValueError(f"The geometry field {geometry_field} does not exist in {source_file}.")
+
+        geometry = geometry_field if schema[geometry_field].startswith("GEOMETRY") else f"ST_GeomFromWKB({geometry_field})"
+        exclude = ", ".join({geometry_field, "geom"} & set(schema))
+        return f"SELECT * EXCLUDE ({exclude}), {geometry} AS geom FROM read_parquet('{source_file}')"
 
     def connect_duckdbfile(self, duckdb_file: str):
         """Connect to an existing DuckDB database file.
@@ -146,5 +613,7 @@ class DataBase:
         if not os.path.exists(duckdb_file):
             raise FileNotFoundError(f"Database file {duckdb_file} does not exist.")
         
-        self.con = duckdb.connect(duckdb_file)
-        self.con.load_extension("spatial")
\ No newline at end of file
+        self._db_path = duckdb_file
+        self.run_id = os.path.splitext(os.path.basename(duckdb_file))[0]
+        self.con = self.connect(duckdb_file)
+        self.record_settings()
\ No newline at end of file
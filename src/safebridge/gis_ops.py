@@ -1,6 +1,8 @@
 """
-This module provides functions to perform various GIS operations such as extracting edges from polygons, extending lines, moving lines to points, and splitting polygons with multiple lines. It uses the Shapely library for geometric operations and supports WKB (Well-Known Binary) format for input geometries.
+This module provides functions to perform various GIS operations such as extracting edges from polygons, extending lines, moving lines to points, and splitting polygons with multiple lines. The `split_sectors` function performs the same steps for many decks at once on the vectorized array functions of Shapely 2, and `project_points_on_lines` projects many points onto lines with NumPy array math. It uses the Shapely library for geometric operations and supports WKB (Well-Known Binary) format for input geometries.
 """
+import shapely
+import numpy as np
 from shapely.ops import split
 from shapely.affinity import scale, translate
 from shapely.geometry import Polygon, LineString, Point
@@ -134,3 +136,132 @@ def multisplit(polygon : Polygon, lines: list[LineString]) -> list[Polygon]:
             collection.append(geom2.geoms[0])
             collection.append(geom2.geoms[1])
     return sort_by_centroid(collection)
+
+
+def split_sectors(decks: np.ndarray, buffers: np.ndarray, buffer_edges: np.ndarray, starts: np.ndarray, finishes: np.ndarray, extend_length: float = 1e3) -> np.ndarray:
+    """ Split the buffer geometries of many decks into their N, C and S sectors at once.
+
+    This is the vectorized counterpart of `extract_intersecting_edges`, `extend_line`, `move_lines_to_points` and `multisplit`. The two deck edges intersecting the buffer edge, sorted by their centroids, are extended and moved to the sorted start and finish points as in the per deck functions. Instead of splitting the buffer by the lines, the buffer is intersected with the half planes beyond each line, bounded by the extended line and `extend_length` deep, and the rest of the buffer is the central sector. The three parts are sorted by their centroids like the result of `multisplit`.
+
+    Arguments
+    ---------
+    decks : np.ndarray
+        The deck polygons.
+    buffers : np.ndarray
+        The buffer polygons of the decks.
+    buffer_edges : np.ndarray
+        The buffer edge lines of the decks.
+    starts : np.ndarray
+        The `(n, 2)` coordinates of the points the first deck edge is moved towards.
+    finishes : np.ndarray
+        The `(n, 2)` coordinates of the points the second deck edge is moved towards.
+    extend_length : float
+        The length by which the deck edges are extended on both ends and the depth of the half planes. Defaults to 1 km.
+
+    Returns
+    -------
+    np.ndarray: The `(n, 3)` array of the sector polygons of each deck in sorted order.
+    """
+    n = len(decks)
+    if n == 0:
+        return np.empty((0, 3), dtype=object)
+
+    # all edges of the exterior rings with the position of their deck
+    coords, owner = shapely.get_coordinates(shapely.get_exterior_ring(decks), return_index=True)
+    same = owner[:-1] == owner[1:]
+    heads, tails, owner = coords[:-1][same], coords[1:][same], owner[:-1][same]
+    hit = shapely.intersects(shapely.linestrings(np.stack([heads, tails], axis=1)), buffer_edges[owner])
+    heads, tails, owner = heads[hit], tails[hit], owner[hit]
+
+    # the first two intersecting edges of every deck by their centroids, see `sort_by_centroid`
+    mids = (heads + tails) / 2
+    order = np.lexsort((mids[:, 0], -mids[:, 1], owner))
+    heads, tails, mids, owner = heads[order], tails[order], mids[order], owner[order]
+    keep = np.arange(len(owner)) - np.searchsorted(owner, owner) < 2
+    missing = np.flatnonzero(np.bincount(owner[keep], minlength=n) < 2)
+    if len(missing):
+        raise ValueError(f"The decks at positions {missing.tolist()} do not have two edges intersecting their buffer edges.")
+    heads, tails, mids = heads[keep].reshape(n, 2, 2), tails[keep].reshape(n, 2, 2), mids[keep].reshape(n, 2, 2)
+
+    # the start and finish points sorted by their coordinates in the same way
+    points = np.stack([starts, finishes], axis=1).astype(float)
+    swap = (points[:, 0, 1] < points[:, 1, 1]) | ((points[:, 0, 1] == points[:, 1, 1]) & (points[:, 0, 0] > points[:, 1, 0]))
+    points[swap] = points[swap, ::-1]
+
+    # extend the edges about their centroids and move the centroids to the points
+    length = np.linalg.norm(tails - heads, axis=2, keepdims=True)
+    factor = (length + 2 * extend_length) / length
+    heads = points + (heads - mids) * factor
+    tails = points + (tails - mids) * factor
+
+    # the half plane of every line on the side away from the other line
+    direction = (tails - heads) / np.linalg.norm(tails - heads, axis=2, keepdims=True)
+    normal = np.stack([-direction[..., 1], direction[..., 0]], axis=2)
+    towards = np.einsum("ijk,ijk->ij", points[:, ::-1] - points, normal) > 0
+    normal[towards] *= -1
+    depth = normal * extend_length
+    sides = shapely.polygons(np.stack([heads, tails, tails + depth, heads + depth, heads], axis=2))
+
+    sectors = np.stack([
+        shapely.intersection(buffers, sides[:, 0]),
+        shapely.difference(shapely.difference(buffers, sides[:, 0]), sides[:, 1]),
+        shapely.intersection(buffers, sides[:, 1]),
+    ], axis=1)
+    centroids = shapely.centroid(sectors)
+    order = np.lexsort((shapely.get_x(centroids), -shapely.get_y(centroids)), axis=1)
+    return np.take_along_axis(sectors, order, axis=1)
+
+
+def project_points_on_lines(points: np.ndarray, lines: np.ndarray, line_index: np.ndarray) -> np.ndarray:
+    """ Project points onto their lines with NumPy array math.
+
+    Every point is projected onto the closest point of its line, the projection on each segment is clamped to the segment ends. The segments of all lines are processed at once by their position in the line, so a line with more than two vertices costs one pass over the points per segment and the closest segment wins, the first one on ties.
+
+    Arguments
+    ---------
+    points : np.ndarray
+        The `(n, 2)` coordinates of the points.
+    lines : np.ndarray
+        The shapely LineStrings.
+    line_index : np.ndarray
+        The position of the line of each point in `lines`.
+
+    Returns
+    -------
+    np.ndarray: The `(n, 2)` coordinates of the projected points.
+    """
+    coords, owner = shapely.get_coordinates(lines, return_index=True)
+    first = np.searchsorted(owner, np.arange(len(lines)))
+    n_segments = np.bincount(owner, minlength=len(lines)) - 1
+
+    projected = np.full(points.shape, np.nan)
+    best = np.full(len(points), np.inf)
+    start = first[line_index]
+    for j in range(int(n_segments.max()) if len(lines) else 0):
+        valid = np.flatnonzero(n_segments[line_index] > j)
+        a, b, p = coords[start[valid] + j], coords[start[valid] + j + 1], points[valid]
+        ab = b - a
+        denominator = np.einsum("ij,ij->i", ab, ab)
+        t = np.clip(np.einsum("ij,ij->i", p - a, ab) / np.where(denominator > 0, denominator, 1), 0, 1)
+        candidate = a + t[:, None] * ab
+        distance = np.einsum("ij,ij->i", p - candidate, p - candidate)
+        closer = distance < best[valid]
+        best[valid[closer]] = distance[closer]
+        projected[valid[closer]] = candidate[closer]
+    return projected
+
+def same_projection(source: str, target: str) -> bool:
+    """ Checks if two coordinate reference systems given as strings are the same, e.g. `EPSG:28992` and `epsg:28992`.
+
+    Arguments
+    ---------
+    source : str
+        The source coordinate reference system.
+    target : str
+        The target coordinate reference system.
+
+    Returns
+    -------
+    bool : True if the strings refer to the same coordinate reference system, a transformation between them is the identity.
+    """
+    return "".join(source.split()).upper() == "".join(target.split()).upper()
@@ -1,7 +1,19 @@
+import json
+import time
+import shapely
+import numpy as np
 from .gis_ops import *
 from duckdb import DuckDBPyConnection
+from functools import partial
+from typing import Callable
 from .data  import BridgeDamage
 
+try:
+    # optional, the persistent scatters can be reprojected in bulk with PROJ through pyproj instead of row by row in DuckDB
+    from pyproj import Transformer
+except ImportError:
+    Transformer = None
+
 class DBPipeline:
     """ DBPipeline class for the BridgeDamage data.
 
@@ -13,13 +25,32 @@ class DBPipeline:
         The BridgeDamage data object containing deck, axis, support, ascending, and descending data.
     dbconnection : DuckDBPyConnection
         The database connection object.
+
+    Attributes
+    ----------
+    scatters : list[Ascending]
+        The persistent scatter data related to the decks and axes together, the ascending and descending data.
+    stage_log : str
+        The name of the table recording the completed stages, `pipeline_stages`.
     
     Methods
     -------
+    stages(computational_projection: str, buffer_distance: float, bulk_reprojection: bool = False)
+        Gets the preprocessing stages in their execution order.
+    completed_stages()
+        Gets the completed stages recorded in the stage log.
+    run_stage(name: str, stage: Callable)
+        Runs a stage in a transaction and records it in the stage log.
+    reset_stages()
+        Clears the stage log.
+    stage_parameters(stage: Callable)
+        Gets the parameters of a stage as recorded in the stage log.
     build_point_geometry()
         Builds geometries for the ascending and descending data.
-    build_process_tables(computational_projection: str)
+    build_process_tables(computational_projection: str, bulk_reprojection: bool = False)
         Generates process tables for the deck, axis, support, ascending, and descending data.
+    reproject_points(obj: Ascending, computational_projection: str)
+        Reprojects the points of a persistent scatter table in bulk with pyproj.
     process_axis()
         Processes the axis data by reordering vertices and calculating length and azimuth.
     process_deck(buffer_distance: float)
@@ -30,12 +61,28 @@ class DBPipeline:
         Creates sectors from the deck geometries.
     relate_deck_pspoints()
         Relates deck and point data.
+    create_sector_cells()
+        Creates the grid index of the sector geometries used to relate the points to the sectors.
     relate_axis_pspoints()
         Relates axis and point data.
+    scatter_union(columns: str)
+        Gets the union of the processed persistent scatter tables tagged with their table name.
     deck_edge_control(buffer_distance: float)
         Checks if there is at least one projected point for both orbital orientations within the radius of buffer_distance / 2 at both edges of the deck geometry.
-    init_result_table()
-        Initializes the result table for the processed data.
+    init_result_table(buffer_distance: float = None)
+        Initializes the result table for the processed data, tagged with the buffer distance.
+    partition_decks(computational_projection: str, tile_size: float, partitions: int)
+        Partitions the decks by a square grid of tiles or into partitions of equal size.
+    partition_scatters(computational_projection: str, buffer_distance: float, halo: float)
+        Assigns the decks and the persistent scatters of all tiles to their partitions in one pass.
+    export_partition(tile: int, db_path: str)
+        Copies the source data of a tile into a new database file.
+    partition_tables(sector_offset: int)
+        Gets the processed tables of a partition and the query of their owned rows.
+    merge_partition(tile: int, db_path: str)
+        Merges the processed tables and the results of a partition.
+    build_deck_eligibility()
+        Materializes the per-deck point counts of each orbit and sector used for the deck selection.
     get_ns_bridge_uid()
         Gets the UID of the bridge with North-South orientation.
     get_ew_bridge_uid()
@@ -55,12 +102,105 @@ class DBPipeline:
 
         self.damage = bridgedamage
         self.connection = dbconnection
+        self.scatters = [bridgedamage.ascending, bridgedamage.descending]
+        self.stage_log = "pipeline_stages"
 
     
+    def stages(self, computational_projection: str, buffer_distance: float, bulk_reprojection: bool = False) -> list[tuple[str, Callable]]:
+        """ Get the preprocessing stages of the pipeline in their execution order.
+
+        Every stage builds its tables with `CREATE TABLE AS SELECT` statements that compute all derived columns in a single projection, instead of adding columns and filling them with updates. The stages are run with `run_stage`, which records them in the stage log, so an interrupted preprocessing can be resumed from the first stage that has not been completed. The `result` table is not a stage, it is initialized by every preprocessing with `init_result_table`. The buffer distance is bound as a float, so `6` and `6.0` are recorded as the same parameter.
+
+        Arguments
+        ---------
+        computational_projection : str
+            The coordinate reference system for computations.
+        buffer_distance : float
+            The distance to buffer geometries in meters.
+        bulk_reprojection : bool
+            If True, the persistent scatters are reprojected with pyproj, see `build_process_tables`. Defaults to False.
+
+        Returns
+        -------
+        list[tuple[str, Callable]]: The name and the callable of each stage.
+        """
+        buffer_distance = float(buffer_distance)
+        return [
+            # 1-building point geometries for the ascending and descending constalliations
+            ("build_point_geometry", self.build_point_geometry),
+            # 2-creating the proc_{table_name} tables with the reprojection of geometries to computational projection
+            ("build_process_tables", partial(self.build_process_tables, computational_projection, bulk_reprojection)),
+            # 3-reodering the axis vertices, calculating the length and azimuth
+            ("process_axis", self.process_axis),
+            # 4-calculating the deck span counts, generating the deck buffer geometries
+            ("process_deck", partial(self.process_deck, buffer_distance)),
+            # 5-relating the axis and the deck geometries, calculating the deck length
+            ("relate_deck_axis", self.relate_deck_axis),
+            # 6-creating sector geometries from the deck geometries
+            ("create_sectors", self.create_sectors),
+            # 7-deck and sector assignment to the points
+            ("relate_deck_pspoints", self.relate_deck_pspoints),
+            # 8 project points on tho the axis line record the projected point as proj_axis and claculate the normalized distance along the axis line stating from the start point of the axis line as ndist_axis field
+            ("relate_axis_pspoints", self.relate_axis_pspoints),
+            # 9 check if there is at least one projected point for both orbital orientation within the radius of buffer_distance/2 at the both edge of the deck geometry
+            ("deck_edge_control", partial(self.deck_edge_control, buffer_distance)),
+            # 10 count the points of each orbit in the sectors of each deck for the deck selection of the solvers
+            ("build_deck_eligibility", self.build_deck_eligibility),
+        ]
+
+    def completed_stages(self) -> dict[str, str]:
+        """ Get the completed stages recorded in the stage log of the database.
+
+        Returns
+        -------
+        dict[str, str]: The parameters of each completed stage by the stage name, an empty dict if no stage has been recorded yet.
+        """
+        self.connection.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.stage_log} (stage VARCHAR PRIMARY KEY, parameters VARCHAR, seconds DOUBLE, completed_at TIMESTAMP DEFAULT current_timestamp);
+        """)
+        data = self.connection.sql(f"SELECT stage, parameters FROM {self.stage_log}").fetchnumpy()
+        return dict(zip(data['stage'].tolist(), data['parameters'].tolist()))
+
+    def run_stage(self, name: str, stage: Callable) -> float:
+        """ Run a preprocessing stage in a single transaction and record it in the stage log.
+
+        The tables of the stage and its record in the stage log are committed together, so a stage interrupted by an error leaves the database as it was before the stage and can be run again.
+
+        Arguments
+        ---------
+        name : str
+            The name of the stage.
+        stage : Callable
+            The callable of the stage, see `stages`.
+
+        Returns
+        -------
+        float: The time in seconds of the stage.
+        """
+        st = time.time()
+        self.connection.begin()
+        try:
+            stage()
+            self.connection.execute(f"INSERT OR REPLACE INTO {self.stage_log} (stage, parameters, seconds) VALUES (?, ?, ?)", (name, self.stage_parameters(stage), time.time() - st))
+            self.connection.commit()
+        except BaseException:
+            self.connection.rollback()
+            raise
+        return time.time() - st
+
+    def reset_stages(self):
+        """ Clear the stage log so all stages are run again by the next preprocessing. """
+        self.connection.execute(f"DROP TABLE IF EXISTS {self.stage_log}")
+
+    @staticmethod
+    def stage_parameters(stage: Callable) -> str:
+        """ Get the parameters of a stage as a JSON list, the arguments bound with `partial` or an empty list. """
+        return json.dumps(list(stage.args) if isinstance(stage, partial) else [])
+
     def build_point_geometry(self):
         """ Build geometries for the ascending and descending data.
 
-        This method checks if the source files for ascending and descending data are in CSV format, and if so, it generates geometries for the latitude and longitude fields.
+        This method generates geometries from the latitude and longitude fields of the ascending and descending tables. Tables that already contain a `geom` column, e.g. loaded from a GeoParquet file or a Parquet file with an embedded WKB geometry, are used directly and their geometry is not rebuilt.
 
         Raises
         -------
@@ -68,41 +208,81 @@ class DBPipeline:
         """
         for orbit in ['ascending', 'descending']:
             obj = getattr(self.damage, orbit)
-            if obj.source_file.endswith('.csv'):
-                col_names = self.get_attributes(obj.table_name)
-
-                if obj.lat_field not in col_names or obj.lon_field not in col_names:
-                    raise ValueError(f"{orbit} table must contain {obj.lat_field} and {obj.lon_field} fields.")
-                if "geom" not in self.get_attributes(obj.table_name):
-                    self.connection.execute(f"""
-                        ALTER TABLE {obj.table_name} ADD COLUMN geom GEOMETRY;
-                        UPDATE {obj.table_name} SET geom = ST_Point({obj.lon_field}, {obj.lat_field});    
-                    """)
-                    print(f"The geometry column has been added to the {orbit} table.")
+            col_names = self.get_attributes(obj.table_name)
+            if "geom" in col_names:
+                print(f"The {orbit} table already has a geometry column, it is used as it is.")
+                continue
+
+            if obj.lat_field not in col_names or obj.lon_field not in col_names:
+                raise ValueError(f"{orbit} table must contain {obj.lat_field} and {obj.lon_field} fields.")
+            self.connection.execute(f"""
+                ALTER TABLE {obj.table_name} ADD COLUMN IF NOT EXISTS geom GEOMETRY;
+                UPDATE {obj.table_name} SET geom = ST_Point({obj.lon_field}, {obj.lat_field});    
+            """)
+            print(f"The geometry column has been added to the {orbit} table.")
             
-    def build_process_tables(self, computational_projection: str):
+    def build_process_tables(self, computational_projection: str, bulk_reprojection: bool = False):
         """ Generate process tables for the deck, axis, support, ascending, and descending data.
 
-        This method creates new tables with the prefix `proc_` for each data type, reprojecting the geometries to the specified computational projection.
+        This method creates new tables with the prefix `proc_` for each data type, reprojecting the geometries to the specified computational projection. The geometries of the tables already in the computational projection are copied without a transformation. The tables are reprojected with `ST_Transform`, with `bulk_reprojection` the persistent scatters are reprojected in bulk by `reproject_points` instead. The bulk path is opt-in and not always faster, it moves the coordinates through NumPy and back, see `benchmarks/bench_reprojection.py`.
 
         Arguments
         ---------
         computational_projection : str
             The coordinate reference system for computations.
+        bulk_reprojection : bool
+            If True, the persistent scatters are reprojected with pyproj, which must be installed. Defaults to False.
         
         Raises
         -------
         ValueError: If the computational projection is not specified.
+        ImportError: If the bulk reprojection is requested and pyproj is not installed.
         """
+        if bulk_reprojection and Transformer is None:
+            raise ImportError("The bulk reprojection requires pyproj, install it with `pip install safebridge[proj]`.")
         
         for i in self.damage.__dataclass_fields__.keys():
             obj = getattr(self.damage, i)
-            self.connection.execute(f"""
-                CREATE OR REPLACE TABLE proc_{obj.table_name} AS
-                SELECT uid, ST_Transform(geom, '{obj.source_projection}', '{computational_projection}', always_xy := true) AS geom FROM {obj.table_name};
-            """)
+            if same_projection(obj.source_projection, computational_projection):
+                self.connection.execute(f"""
+                    CREATE OR REPLACE TABLE proc_{obj.table_name} AS
+                    SELECT uid, geom FROM {obj.table_name};
+                """)
+                print(f"Process table called `proc_{obj.table_name}` has been created from `{obj.table_name}` table, the geometry is already in `{computational_projection}` CRS.")
+                continue
+            if bulk_reprojection and obj in self.scatters:
+                self.reproject_points(obj, computational_projection)
+            else:
+                self.connection.execute(f"""
+                    CREATE OR REPLACE TABLE proc_{obj.table_name} AS
+                    SELECT uid, ST_Transform(geom, '{obj.source_projection}', '{computational_projection}', always_xy := true) AS geom FROM {obj.table_name};
+                """)
             print(f"Process table called `proc_{obj.table_name}` has been created from `{obj.table_name}` table and the geoemtry has been reprojected to `{computational_projection}` CRS.")
 
+    def reproject_points(self, obj, computational_projection: str):
+        """ Create the process table of a persistent scatter table by reprojecting its points in bulk with pyproj.
+
+        The coordinates of the points are fetched as NumPy arrays, transformed with a single call of a pyproj `Transformer` and written back as point geometries, which avoids the per row setup of `ST_Transform` at the cost of a round trip through Python, it is not always faster than `ST_Transform`. The points without a geometry keep a NULL geometry.
+
+        Arguments
+        ---------
+        obj : Ascending | Descending
+            The persistent scatter data.
+        computational_projection : str
+            The coordinate reference system for computations.
+        """
+        data = self.connection.execute(f"SELECT uid, ST_X(geom) AS x, ST_Y(geom) AS y FROM {obj.table_name}").fetchnumpy()
+        x, y = Transformer.from_crs(obj.source_projection, computational_projection, always_xy=True).transform(
+            np.ma.filled(np.ma.asarray(data['x'], dtype=np.float64), np.nan),
+            np.ma.filled(np.ma.asarray(data['y'], dtype=np.float64), np.nan),
+        )
+        self.connection.register("point_rows", dict(uid=np.asarray(data['uid']), x=x, y=y))
+        self.connection.execute(f"""
+            CREATE OR REPLACE TABLE proc_{obj.table_name} AS
+            SELECT uid, CASE WHEN isfinite(x) AND isfinite(y) THEN ST_Point(x, y) END AS geom FROM point_rows;
+        """)
+        self.connection.unregister("point_rows")
+
     def process_axis(self):
         """ Process the axis data by reordering vertices and calculating length and azimuth.
 
@@ -115,28 +295,31 @@ class DBPipeline:
         self.connection.execute(f"""\
             -- Reorder the axis geometries based on the centroid
             -- This ensures that the axis starts from the leftmost point in north aligned map view.
+            -- Add length and azimuth columns to the axis table calculated from the reordered geometries
                         
-            UPDATE proc_{self.damage.axis.table_name} SET geom = CASE
-                WHEN ST_Y(ST_StartPoint(geom)) > ST_Y(ST_Centroid(geom)) 
-                    THEN ST_Reverse(geom) 
-                WHEN ST_Y(ST_StartPoint(geom)) = ST_Y(ST_Centroid(geom)) AND ST_X(ST_StartPoint(geom)) > ST_X(ST_Centroid(geom)) 
-                    THEN ST_Reverse(geom) 
-                ELSE 
-                    geom
-            END;
-        
-            -- Add length and azimuth columns to the axis table
-                        
-            ALTER TABLE proc_{self.damage.axis.table_name} ADD COLUMN length FLOAT;
-            ALTER TABLE proc_{self.damage.axis.table_name} ADD COLUMN azimuth FLOAT;
-            UPDATE proc_{self.damage.axis.table_name}
-            SET length = ST_Distance(ST_StartPoint(geom), ST_EndPoint(geom)),
-                azimuth = degrees(2*pi() + pi()/2 - atan2(ST_Y(ST_EndPoint(geom)) - ST_Y(ST_StartPoint(geom)), ST_X(ST_EndPoint(geom)) - ST_X(ST_StartPoint(geom))) % (2*pi())) % 360 ;
+            CREATE OR REPLACE TABLE proc_{self.damage.axis.table_name} AS
+            SELECT
+                *,
+                ST_Distance(ST_StartPoint(geom), ST_EndPoint(geom))::FLOAT AS length,
+                (degrees(2*pi() + pi()/2 - atan2(ST_Y(ST_EndPoint(geom)) - ST_Y(ST_StartPoint(geom)), ST_X(ST_EndPoint(geom)) - ST_X(ST_StartPoint(geom))) % (2*pi())) % 360)::FLOAT AS azimuth
+            FROM (
+                SELECT * REPLACE (
+                    CASE
+                        WHEN ST_Y(ST_StartPoint(geom)) > ST_Y(ST_Centroid(geom)) 
+                            THEN ST_Reverse(geom) 
+                        WHEN ST_Y(ST_StartPoint(geom)) = ST_Y(ST_Centroid(geom)) AND ST_X(ST_StartPoint(geom)) > ST_X(ST_Centroid(geom)) 
+                            THEN ST_Reverse(geom) 
+                        ELSE 
+                            geom
+                    END AS geom
+                )
+                FROM proc_{self.damage.axis.table_name}
+            );
         """)
 
         print(f"Geometries in proc_{self.damage.axis.table_name} have been reordered based on the axis centroid for further evaluation.")
         print(f"Length and azimuth columns have been added to proc_{self.damage.axis.table_name} table.")
-    
+
     def process_deck(self, buffer_distance:float):
         """ Process the deck data by generating mulitple attiributes.
 
@@ -151,42 +334,33 @@ class DBPipeline:
         
         self.connection.execute(f"""
             -- Calculate the span count for each deck geometry based on overlaps with support geometries
+            -- Create buffer geometries for the deck geometries
                         
-            ALTER TABLE proc_{self.damage.deck.table_name} ADD COLUMN span_count INTEGER;
-            UPDATE proc_{self.damage.deck.table_name} 
-            SET span_count = COALESCE(second.overlap + 1, 1)
-            FROM (
+            CREATE OR REPLACE TABLE proc_{self.damage.deck.table_name} AS
+            SELECT
+                first.*,
+                COALESCE(second.overlap + 1, 1)::INTEGER AS span_count,
+                ST_Buffer(first.geom, {buffer_distance}) AS buffer
+            FROM proc_{self.damage.deck.table_name} AS first
+            LEFT JOIN (
                 SELECT first.uid, COUNT(second.uid) AS overlap
                 FROM proc_{self.damage.deck.table_name} AS first
-                LEFT JOIN proc_{self.damage.support.table_name} AS second
+                JOIN proc_{self.damage.support.table_name} AS second
                 ON ST_Overlaps(first.geom, second.geom)
                 GROUP BY first.uid
             ) AS second
-            WHERE proc_{self.damage.deck.table_name}.uid = second.uid;
-        
+            ON first.uid = second.uid;
+
             
             -- Establish the relation between support and deck geometries
+            -- if not related deck exists the support geometries are left out, a support intersecting several decks is related to the deck with the lowest uid
 
-            ALTER TABLE proc_{self.damage.support.table_name} ADD COLUMN rdeck INTEGER;
-            UPDATE proc_{self.damage.support.table_name}
-            SET rdeck = second.rdeck
-            FROM (
-                SELECT first.uid as sup_uid, second.uid AS rdeck
-                FROM proc_{self.damage.support.table_name} AS first
-                JOIN proc_{self.damage.deck.table_name} AS second
-                ON ST_Intersects(first.geom, second.geom)
-            ) AS second
-            WHERE proc_{self.damage.support.table_name}.uid = second.sup_uid;
-            
-            -- if not related deck exists remove the support geometries
-            DELETE FROM proc_{self.damage.support.table_name} WHERE rdeck IS NULL;
-    
-            
-            -- Create buffer geometries for the deck geometries
-            
-            ALTER TABLE proc_{self.damage.deck.table_name} ADD COLUMN buffer GEOMETRY;
-            UPDATE proc_{self.damage.deck.table_name} 
-            SET buffer = ST_Buffer(geom, {buffer_distance});
+            CREATE OR REPLACE TABLE proc_{self.damage.support.table_name} AS
+            SELECT first.*, second.uid AS rdeck
+            FROM proc_{self.damage.support.table_name} AS first
+            JOIN proc_{self.damage.deck.table_name} AS second
+            ON ST_Intersects(first.geom, second.geom)
+            QUALIFY row_number() OVER (PARTITION BY first.uid ORDER BY second.uid) = 1;
         """)
         print(f"Span count has been calculated for proc_{self.damage.deck.table_name} table.")
         print(f"The relation between {self.damage.support.table_name} and {self.damage.deck.table_name} has been established.")
@@ -195,79 +369,78 @@ class DBPipeline:
     def relate_deck_axis(self):
         """ Data pipelines to relate deck and axis geometries.
         
-        This method establishes the relation between deck and axis geometries, adding deck_edge, deck_length, buffer_edge, and orientation columns to the deck table, and rdeck column to the axis table. It calculates the deck_edge, deck_length, and buffer_edge based on the intersection of deck and axis geometries, and determines the orientation based on the azimuth of the axis geometry.
+        This method establishes the relation between deck and axis geometries, adding deck_edge, deck_length, buffer_edge, and orientation columns to the deck table, and rdeck column to the axis table. Every deck is paired once with the intersecting axis with the lowest uid, and the same pairs give the `rdeck` of the axes, so the deck columns, the axis of a deck and the projection of its points in `relate_axis_pspoints` always use the same axis. An axis paired with several decks has a row for each of them. It calculates the deck_edge, deck_length, and buffer_edge based on the intersection of deck and axis geometries, and determines the orientation based on the azimuth of the axis geometry.
         """
 
         self.connection.execute(f"""
-            -- Establish the relation between deck and axis geometries
-            -- Add raxis column to the deck table and calculate deck_edge, deck_length, and buffer_edge
-            -- Update the deck table with the related axis geometries
+            -- Pair every deck with one axis, the pairs are used for the deck columns, the rdeck of the axes and the projection of the points
+            -- if not related axis exists the deck geometries are left out, a deck intersecting several axes is paired with the axis with the lowest uid
+
+            CREATE OR REPLACE TEMP TABLE deck_axis_pairs AS
+            SELECT first.uid AS deck_uid, second.uid AS axis_uid
+            FROM proc_{self.damage.deck.table_name} AS first
+            JOIN proc_{self.damage.axis.table_name} AS second
+            ON ST_Intersects(first.geom, second.geom)
+            QUALIFY row_number() OVER (PARTITION BY first.uid ORDER BY second.uid) = 1;
+
+            -- Calculate deck_edge, deck_length, buffer_edge and orientation of the deck table from the paired axis geometries
             
-            ALTER TABLE proc_{self.damage.deck.table_name} ADD COLUMN deck_edge GEOMETRY;
-            ALTER TABLE proc_{self.damage.deck.table_name} ADD COLUMN deck_length FLOAT;
-            ALTER TABLE proc_{self.damage.deck.table_name} ADD COLUMN buffer_edge GEOMETRY;
-            ALTER TABLE proc_{self.damage.deck.table_name} ADD COLUMN orientation CHAR(2);
-            UPDATE proc_{self.damage.deck.table_name} 
-            SET deck_edge = second.deck_edge,
-                deck_length = second.deck_length,
-                buffer_edge = second.buffer_edge,
-                orientation = second.orient
+            CREATE OR REPLACE TABLE proc_{self.damage.deck.table_name} AS
+            SELECT
+                * EXCLUDE (axis_geom, azimuth),
+                ST_Length(deck_edge)::FLOAT AS deck_length,
+                ST_Intersection(buffer, axis_geom) AS buffer_edge,
+                CASE 
+                    WHEN
+                        (azimuth >= 0 AND azimuth <= 45) OR
+                        (azimuth >= 315 AND azimuth <= 360) OR
+                        (azimuth >= 135 AND azimuth <= 225)
+                    THEN 'NS'
+                    ELSE 'EW'
+                END AS orientation
             FROM (
-                SELECT 
-                    first.uid, 
-                    ST_Intersection(first.geom, second.geom) AS deck_edge,
-                    ST_Length(ST_Intersection(first.geom, second.geom)) AS deck_length,
-                    ST_Intersection(first.buffer, second.geom) AS buffer_edge,
-                    CASE 
-                        WHEN
-                            (second.azimuth >= 0 AND second.azimuth <= 45) OR
-                            (second.azimuth >= 315 AND second.azimuth <= 360) OR
-                            (second.azimuth >= 135 AND second.azimuth <= 225)
-                        THEN 'NS'
-                        ELSE 'EW'
-                    END AS orient
+                SELECT first.*, ST_Intersection(first.geom, second.geom) AS deck_edge, second.geom AS axis_geom, second.azimuth
                 FROM proc_{self.damage.deck.table_name} AS first
+                JOIN deck_axis_pairs AS pairs
+                ON first.uid = pairs.deck_uid
                 JOIN proc_{self.damage.axis.table_name} AS second
-                ON ST_Intersects(first.geom, second.geom)
-            ) AS second
-            WHERE proc_{self.damage.deck.table_name}.uid = second.uid;
-            
-            -- if not related axis exists remove the deck geometries
-            DELETE FROM proc_{self.damage.deck.table_name} WHERE orientation IS NULL;
+                ON pairs.axis_uid = second.uid
+            );
         
             
-            -- Add rdeck column to the axis table and update it with the related deck geometries
+            -- Add rdeck column to the axis table with the paired decks, an axis paired with several decks has a row for each of them
                             
-            ALTER TABLE proc_{self.damage.axis.table_name} ADD COLUMN rdeck INTEGER;
-            UPDATE proc_{self.damage.axis.table_name}
-            SET rdeck = second.related
-            FROM (
-                SELECT first.uid as uid, second.uid AS related
-                FROM proc_{self.damage.axis.table_name} AS first
-                JOIN proc_{self.damage.deck.table_name} AS second
-                ON ST_Intersects(first.geom, second.geom)
-            ) AS second
-            WHERE proc_{self.damage.axis.table_name}.uid = second.uid;
+            CREATE OR REPLACE TABLE proc_{self.damage.axis.table_name} AS
+            SELECT first.*, pairs.deck_uid AS rdeck
+            FROM proc_{self.damage.axis.table_name} AS first
+            LEFT JOIN deck_axis_pairs AS pairs
+            ON first.uid = pairs.axis_uid;
+
+            DROP TABLE deck_axis_pairs;
         """)
         print(f"The relation between {self.damage.deck.table_name} and {self.damage.axis.table_name} has been established.")
 
     def create_sectors(self):
         """ Create sectors from the deck geometries, calculating centroids and normalized distances.
 
-        This method extracts relevant data from the deck table, creates a sequence for sector IDs, and generates a sectors table with `geometry`, `sector_tag`, and `rdeck` columns. It also calculates centroids for each sector based on the deck edges and adds a normalized distance column. The sectors are created by splitting the deck buffer geometries with extended lines from the deck edges.
+        This method extracts relevant data from the deck table, creates a sequence for sector IDs, and generates a sectors table with `geometry`, `sector_tag`, and `rdeck` columns. It also calculates centroids for each sector based on the deck edges and adds a normalized distance column. The sectors are created by splitting the deck buffer geometries with extended lines from the deck edges for all decks at once with `split_sectors`, and are written to the sectors table in a single insert.
         """
         data = self.connection.sql(f"""
             --- Extract relevant data from the deck table for sector creation
 
-            SELECT
-                uid,
-                ST_AsWKB(geom),
-                ST_AsWKB(buffer),
-                ST_AsWKB(buffer_edge),
-                ST_AsWKB(ST_Centroid(ST_MakeLine(ST_StartPoint(deck_edge), ST_StartPoint(buffer_edge)))) AS start,
-                ST_AsWKB(ST_Centroid(ST_MakeLine(ST_EndPoint(deck_edge), ST_EndPoint(buffer_edge)))) AS finish,
-            FROM proc_{self.damage.deck.table_name}
-        """).fetchall()
+            SELECT uid, geom, buffer, buffer_edge, ST_X(start) AS start_x, ST_Y(start) AS start_y, ST_X(finish) AS finish_x, ST_Y(finish) AS finish_y
+            FROM (
+                SELECT
+                    uid,
+                    ST_AsWKB(geom) AS geom,
+                    ST_AsWKB(buffer) AS buffer,
+                    ST_AsWKB(buffer_edge) AS buffer_edge,
+                    ST_Centroid(ST_MakeLine(ST_StartPoint(deck_edge), ST_StartPoint(buffer_edge))) AS start,
+                    ST_Centroid(ST_MakeLine(ST_EndPoint(deck_edge), ST_EndPoint(buffer_edge))) AS finish
+                FROM proc_{self.damage.deck.table_name}
+            )
+            ORDER BY uid
+        """).fetchnumpy()
 
         self.connection.execute(f"""
             -- Create a sequence for sector IDs and a table for sectors with geometry, sector_tag, and rdeck columns
@@ -277,47 +450,47 @@ class DBPipeline:
             CREATE OR REPLACE SEQUENCE sector_id;
             CREATE OR REPLACE TABLE sectors (uid INTEGER DEFAULT nextval('sector_id'), geom GEOMETRY, sector_tag CHAR(1), rdeck INTEGER);
         """)
-        sector_tags = ["N","C","S"]
-        for i in data:
-            edges = extract_intersecting_edges(i[1], i[3])
-            split_lines = [extend_line(edge, 1e3) for edge in edges]  # Extend lines by 1 km
-            points = sort_by_centroid([wkbloads(point) for point in [i[4], i[5]]])
-
-            split_lines = move_lines_to_points(split_lines, points)
-            res = multisplit(wkbloads(i[2]), split_lines)
-            for t in range(3):
-                self.connection.execute(f"INSERT INTO sectors (geom, sector_tag, rdeck) VALUES (?, ?, ?)", (res[t].wkt, sector_tags[t], i[0]))
+        sectors = split_sectors(
+            decks = shapely.from_wkb([bytes(wkb) for wkb in data['geom']]),
+            buffers = shapely.from_wkb([bytes(wkb) for wkb in data['buffer']]),
+            buffer_edges = shapely.from_wkb([bytes(wkb) for wkb in data['buffer_edge']]),
+            starts = np.column_stack([data['start_x'], data['start_y']]),
+            finishes = np.column_stack([data['finish_x'], data['finish_y']]),
+            extend_length = 1e3,  # Extend lines by 1 km
+        )
+        sector_rows = dict(
+            geom = shapely.to_wkb(sectors.ravel()),
+            sector_tag = np.tile(["N", "C", "S"], len(sectors)),
+            rdeck = np.repeat(data['uid'], 3),
+        )
+        # all sectors are written in one insert from the WKB arrays, the uids follow the deck order and the N, C, S tags
+        self.connection.register("sector_rows", sector_rows)
+        self.connection.execute("INSERT INTO sectors (geom, sector_tag, rdeck) SELECT ST_GeomFromWKB(geom), sector_tag, rdeck FROM sector_rows")
+        self.connection.unregister("sector_rows")
 
         self.connection.execute(f"""
-            -- Add center column to the sectors table and update it with the calculated centroids based on sector_tag
+            -- Add center column to the sectors table with the calculated centroids based on sector_tag
+            -- Add ndist column to the sectors table with the normalized distance of the center from the start point of the axis line
                             
-            ALTER TABLE sectors ADD COLUMN center GEOMETRY;
-            UPDATE sectors SET center = CASE
-            WHEN sector_tag = 'N' THEN subquery.n_center
-            WHEN sector_tag = 'C' THEN subquery.c_center
-            WHEN sector_tag = 'S' THEN subquery.s_center
-            END
+            CREATE OR REPLACE TABLE sectors AS
+            SELECT * EXCLUDE (axis_geom, axis_length), (ST_Distance(ST_StartPoint(axis_geom), center)/axis_length)::FLOAT AS ndist
             FROM (
                 SELECT
-                    uid,
-                    ST_Centroid(ST_MakeLine(ST_EndPoint(buffer_edge), ST_Centroid(ST_MakeLine(ST_EndPoint(deck_edge), ST_EndPoint(buffer_edge))))) as n_center,
-                    ST_Centroid(ST_MakeLine(ST_StartPoint(deck_edge), ST_EndPoint(deck_edge))) as c_center,
-                    ST_Centroid(ST_MakeLine(ST_StartPoint(buffer_edge), ST_Centroid(ST_MakeLine(ST_StartPoint(deck_edge), ST_StartPoint(buffer_edge))))) as s_center
-                FROM 
-                    proc_{self.damage.deck.table_name}
-            ) AS subquery
-            WHERE sectors.rdeck = subquery.uid;
-
-            
-            -- Add ndist column to the sectors table and calculate the normalized distance from the start point of the axis line
-                            
-            ALTER TABLE sectors ADD COLUMN ndist FLOAT;
-            UPDATE sectors SET ndist = 
-            ST_Distance(ST_StartPoint(first.geom), second.center)/first.length
-            FROM proc_{self.damage.axis.table_name} AS first
-            JOIN sectors as second
-            ON first.rdeck = second.rdeck
-            WHERE second.uid = sectors.uid;        
+                    first.*,
+                    CASE
+                        WHEN first.sector_tag = 'N' THEN ST_Centroid(ST_MakeLine(ST_EndPoint(second.buffer_edge), ST_Centroid(ST_MakeLine(ST_EndPoint(second.deck_edge), ST_EndPoint(second.buffer_edge)))))
+                        WHEN first.sector_tag = 'C' THEN ST_Centroid(ST_MakeLine(ST_StartPoint(second.deck_edge), ST_EndPoint(second.deck_edge)))
+                        WHEN first.sector_tag = 'S' THEN ST_Centroid(ST_MakeLine(ST_StartPoint(second.buffer_edge), ST_Centroid(ST_MakeLine(ST_StartPoint(second.deck_edge), ST_StartPoint(second.buffer_edge)))))
+                    END AS center,
+                    third.geom AS axis_geom,
+                    third.length AS axis_length
+                FROM sectors AS first
+                JOIN proc_{self.damage.deck.table_name} AS second
+                ON first.rdeck = second.uid
+                LEFT JOIN proc_{self.damage.axis.table_name} AS third
+                ON first.rdeck = third.rdeck
+                QUALIFY row_number() OVER (PARTITION BY first.uid ORDER BY third.uid) = 1
+            );
         """)
         print(f"Sectors have been generated for the deck geometries in proc_{self.damage.deck.table_name} table.")
 
@@ -325,91 +498,124 @@ class DBPipeline:
         """ Establish the relation between deck and point data.
 
         This method adds `rdeck` and `rsector` columns to the `ascending` and `descending` tables, updating them with the related deck and sector geometries. It also cleans up any non-related points from the ascending and descending tables. Additionally, it adds `edge_check` column to the deck table and updates it based on the existence of projected points within the buffer distance from the deck edges.
+
+        The points are joined to the sectors through the `sector_cells` grid of `create_sector_cells`, so every point is tested with `ST_Within` only against the few sectors overlapping its grid cell instead of against all sectors. The points of all persistent scatter tables are related in a single join over their union, see `scatter_union`. A point within the overlapping sectors of neighbouring decks is related to the sector with the lowest uid, so the relation does not depend on the join order.
         """
+        cell_size = self.create_sector_cells()
         self.connection.execute(f"""
-            -- Add rdeck and rsector columns to the ascending and descending tables
-            -- Update these columns with the related deck and sector geometries
-                            
-            ALTER TABLE proc_{self.damage.ascending.table_name} ADD COLUMN rdeck INTEGER;
-            ALTER TABLE proc_{self.damage.ascending.table_name} ADD COLUMN rsector INTEGER;
-            UPDATE proc_{self.damage.ascending.table_name}
-            SET rdeck = second.rdeck,
-                rsector = second.rsector
-            FROM (
-                SELECT second.rdeck as rdeck, second.uid as rsector, first.uid as p_uid
-                FROM proc_{self.damage.ascending.table_name} AS first
-                JOIN sectors AS second
-                ON ST_Within(first.geom, second.geom)
-            ) AS second
-            WHERE proc_{self.damage.ascending.table_name}.uid = second.p_uid;
+            -- Relate the points of all persistent scatter tables to the sector geometries in one pass
             
-            -- clean deck non-related points
-            DELETE FROM proc_{self.damage.ascending.table_name} WHERE rdeck IS NULL;
-
-            -- Add rdeck and rsector columns to the descending table and update them with the related deck and sector geometries
+            CREATE OR REPLACE TEMP TABLE scatter_sectors AS
+            SELECT first.ps_table, first.uid as p_uid, arg_min(second.rdeck, second.uid) as rdeck, min(second.uid) as rsector
+            FROM ({self.scatter_union("uid, geom")}) AS first
+            JOIN sector_cells AS second
+            ON floor(ST_X(first.geom) / {cell_size})::BIGINT * 4294967296 + floor(ST_Y(first.geom) / {cell_size})::BIGINT = second.cell
+            AND ST_Within(first.geom, second.geom)
+            GROUP BY first.ps_table, first.uid;
+        """)
+        for obj in self.scatters:
+            self.connection.execute(f"""
+                -- Rebuild the {obj.table_name} table with the rdeck and rsector columns of the related deck and sector geometries
+                -- the deck non-related points are left out, which is cheaper than updating and deleting them
+                
+                CREATE OR REPLACE TABLE proc_{obj.table_name} AS
+                SELECT first.*, second.rdeck, second.rsector
+                FROM proc_{obj.table_name} AS first
+                JOIN (SELECT p_uid, rdeck, rsector FROM scatter_sectors WHERE ps_table = '{obj.table_name}') AS second
+                ON first.uid = second.p_uid;
+            """)
+        self.connection.execute("DROP TABLE sector_cells; DROP TABLE scatter_sectors;")
+        print(f"The relation between {' and '.join(obj.table_name for obj in self.scatters)} with the deck and sector geometries has been established.")
 
-            ALTER TABLE proc_{self.damage.descending.table_name} ADD COLUMN rdeck INTEGER;
-            ALTER TABLE proc_{self.damage.descending.table_name} ADD COLUMN rsector INTEGER;
-            UPDATE proc_{self.damage.descending.table_name}
-            SET rdeck = second.rdeck,
-                rsector = second.rsector
-            FROM (
-                SELECT second.rdeck as rdeck, second.uid as rsector, first.uid as p_uid
-                FROM proc_{self.damage.descending.table_name} AS first
-                JOIN sectors AS second
-                ON ST_Within(first.geom, second.geom)
-            ) AS second
-            WHERE proc_{self.damage.descending.table_name}.uid = second.p_uid;
-            -- clean deck non-related points
-            DELETE FROM proc_{self.damage.descending.table_name} WHERE rdeck IS NULL;
+    def create_sector_cells(self) -> float:
+        """ Create the `sector_cells` grid index of the sector geometries.
 
+        The plane is divided into square cells of the median sector extent and every sector is listed in the temporary `sector_cells` table once for each cell its bounding box overlaps, with the key `cx * 2^32 + cy` of the cell. A point lies in the cell `(floor(x / cell_size), floor(y / cell_size))`, so a hash join on the cell key pairs each point only with the sectors close to it before the exact `ST_Within` test.
 
+        Returns
+        -------
+        float: The size of the grid cells in the units of the computational projection.
+        """
+        cell_size = self.connection.sql("""
+            SELECT median(greatest(ST_XMax(geom) - ST_XMin(geom), ST_YMax(geom) - ST_YMin(geom))) FROM sectors
+        """).fetchone()[0]
+        cell_size = cell_size if cell_size else 1.0
+        self.connection.execute(f"""
+            CREATE OR REPLACE TEMP TABLE sector_cells AS
+            SELECT uid, rdeck, geom, cx * 4294967296 + cy AS cell
+            FROM (
+                SELECT uid, rdeck, geom, ymin, ymax,
+                    unnest(range(floor(xmin / {cell_size})::BIGINT, floor(xmax / {cell_size})::BIGINT + 1)) AS cx
+                FROM (SELECT uid, rdeck, geom, ST_XMin(geom) AS xmin, ST_XMax(geom) AS xmax, ST_YMin(geom) AS ymin, ST_YMax(geom) AS ymax FROM sectors)
+            ), LATERAL (SELECT unnest(range(floor(ymin / {cell_size})::BIGINT, floor(ymax / {cell_size})::BIGINT + 1)) AS cy)
         """)
-        print(f"The relation between {self.damage.ascending.table_name} and {self.damage.descending.table_name} with the deck and sector geometries has been established.")
+        return cell_size
 
     def relate_axis_pspoints(self):
         """ Relating axis and point data.
 
         This method adds `ndist_axis` and `proj_axis` columns to the ascending and descending tables, calculating the normalized distance along the axis line and the projected point on the axis line. It uses the axis geometries to determine the distance and projection for each point in the ascending and descending tables.
+
+        The points are projected onto the axis of their deck with `project_points_on_lines` as NumPy arrays, the axis of a deck is the one paired with it by `relate_deck_axis`. The normalized distance is the distance of the projected point from the start point of the axis divided by the axis length. The results are joined back to the point tables in bulk from the arrays.
         """
+        axes = self.connection.execute(f"""
+            SELECT rdeck, ST_AsWKB(geom) AS geom, length
+            FROM proc_{self.damage.axis.table_name}
+            WHERE rdeck IS NOT NULL
+            QUALIFY row_number() OVER (PARTITION BY rdeck ORDER BY uid) = 1
+            ORDER BY rdeck
+        """).fetchnumpy()
+        lines = shapely.from_wkb([bytes(wkb) for wkb in axes['geom']])
+        starts = shapely.get_coordinates(shapely.get_point(lines, 0))
 
-        self.connection.execute(f"""
-            -- Add ndist_axis and proj_axis columns to the ascending and descending tables
-            -- Calculate the normalized distance along the axis line and the projected point on the axis line
-                            
-            ALTER TABLE proc_{self.damage.ascending.table_name} ADD COLUMN ndist_axis FLOAT;
-            ALTER TABLE proc_{self.damage.ascending.table_name} ADD COLUMN proj_axis GEOMETRY;
-            UPDATE proc_{self.damage.ascending.table_name}
-            SET ndist_axis = ST_Distance(ST_StartPoint(subquery.lgeom), ST_EndPoint(ST_ShortestLine(subquery.geom, subquery.lgeom)))/subquery.linelen,
-                proj_axis = ST_EndPoint(ST_ShortestLine(subquery.geom, subquery.lgeom))
-            FROM (
-                SELECT second.*, first.geom as lgeom, first.length as linelen
-                FROM proc_{self.damage.axis.table_name} AS first
-                JOIN proc_{self.damage.ascending.table_name} AS second
-                ON first.rdeck = second.rdeck
-                ) AS subquery
-            WHERE proc_{self.damage.ascending.table_name}.uid = subquery.uid;
-            
-            --- Add ndist_axis and proj_axis columns to the descending table and calculate them similarly
+        for obj in self.scatters:
+            points = self.connection.execute(f"SELECT uid, rdeck, ST_X(geom) AS x, ST_Y(geom) AS y FROM proc_{obj.table_name}").fetchnumpy()
+            # the axis of every point by the deck it is related to, the points of decks without an axis get no projection
+            position = np.minimum(np.searchsorted(axes['rdeck'], points['rdeck']), max(len(lines) - 1, 0))
+            related = np.flatnonzero(axes['rdeck'][position] == points['rdeck']) if len(lines) else np.empty(0, dtype=int)
+            position = position[related]
+            projected = project_points_on_lines(np.column_stack([points['x'], points['y']])[related], lines, position)
 
-            ALTER TABLE proc_{self.damage.descending.table_name} ADD COLUMN ndist_axis FLOAT;
-            ALTER TABLE proc_{self.damage.descending.table_name} ADD COLUMN proj_axis GEOMETRY;
-            UPDATE proc_{self.damage.descending.table_name}
-            SET ndist_axis = ST_Distance(ST_StartPoint(subquery.lgeom), ST_EndPoint(ST_ShortestLine(subquery.geom, subquery.lgeom)))/subquery.linelen,
-                proj_axis = ST_EndPoint(ST_ShortestLine(subquery.geom, subquery.lgeom))
-            FROM (
-                SELECT second.*, first.geom as lgeom, first.length as linelen
-                FROM proc_{self.damage.axis.table_name} AS first
-                JOIN proc_{self.damage.descending.table_name} AS second
-                ON first.rdeck = second.rdeck
-                ) AS subquery
-            WHERE proc_{self.damage.descending.table_name}.uid = subquery.uid;
-        """)
-        print(f"Normalized distance along the axis line has been calculated for the {self.damage.ascending.table_name} and {self.damage.descending.table_name} tables.")
+            axis_rows = dict(
+                p_uid = points['uid'][related],
+                ndist_axis = (np.hypot(*(projected - starts[position]).T) / axes['length'][position].astype(np.float64)).astype(np.float32),
+                proj_x = projected[:, 0],
+                proj_y = projected[:, 1],
+            )
+            self.connection.register("axis_rows", axis_rows)
+            self.connection.execute(f"""
+                -- Add ndist_axis and proj_axis columns to the {obj.table_name} table
+                
+                CREATE OR REPLACE TABLE proc_{obj.table_name} AS
+                SELECT first.*, second.ndist_axis, ST_Point(second.proj_x, second.proj_y) AS proj_axis
+                FROM proc_{obj.table_name} AS first
+                LEFT JOIN axis_rows AS second
+                ON first.uid = second.p_uid;
+            """)
+            self.connection.unregister("axis_rows")
+        print(f"Normalized distance along the axis line has been calculated for the {' and '.join(obj.table_name for obj in self.scatters)} tables.")
+
+    def scatter_union(self, columns: str) -> str:
+        """ Get the union of the processed persistent scatter tables.
+
+        Every row is tagged with the name of its table in the `ps_table` column, so the points of all orbits can be processed by a single set-based statement and split again by the tag.
+
+        Arguments
+        ---------
+        columns : str
+            The comma separated columns selected from each `proc_{table_name}` table.
+
+        Returns
+        -------
+        str: SQL query of the tagged union of the tables.
+        """
+        return " UNION ALL ".join(f"SELECT '{obj.table_name}' AS ps_table, {columns} FROM proc_{obj.table_name}" for obj in self.scatters)
 
     def deck_edge_control(self, buffer_distance:float):
 
         """ Checks if there is at least one projected point for both orbital orientations within the radius of buffer_distance / 2 at both edges of the deck geometry.
+
+        The check is set-based: the distance of every projected point to the start and end point of the deck edge of its deck is calculated once in a single pass over the points of all persistent scatter tables, see `scatter_union`, the smallest distances of the ascending points to the start point and of the descending points to the end point are aggregated per deck and joined back to the deck table.
     
         Arguments
         ---------
@@ -418,29 +624,39 @@ class DBPipeline:
         """      
 
         self.connection.execute(f"""                
-            -- Add edge_check column to the deck table and update it based on the existence of projected points within the buffer distance from the deck edges
+            -- Add edge_check column to the deck table based on the existence of projected points within the buffer distance from the deck edges
             -- This will help to identify if the deck is covered by both ascending and descending points
             -- The edge_check will be TRUE if there is at least one projected point within the buffer distance from both edges of the deck geometry
                             
-            ALTER TABLE proc_{self.damage.deck.table_name} ADD COLUMN edge_check BOOLEAN;
-            UPDATE proc_{self.damage.deck.table_name}
-            SET edge_check = 
-                EXISTS (
-                    SELECT 1
-                    FROM proc_{self.damage.ascending.table_name} AS asc_table
-                    WHERE asc_table.rdeck = proc_{self.damage.deck.table_name}.uid
-                    AND ST_DWithin( ST_StartPoint(proc_{self.damage.deck.table_name}.deck_edge), asc_table.proj_axis, {buffer_distance / 2})
-                ) AND EXISTS (
-                    SELECT 1
-                    FROM proc_{self.damage.descending.table_name} AS desc_table
-                    WHERE desc_table.rdeck = proc_{self.damage.deck.table_name}.uid
-                    AND ST_DWithin( ST_EndPoint(proc_{self.damage.deck.table_name}.deck_edge), desc_table.proj_axis,  {buffer_distance / 2})
-                );
+            CREATE OR REPLACE TABLE proc_{self.damage.deck.table_name} AS
+            SELECT
+                deck.*,
+                COALESCE(edges.ascending_start <= {buffer_distance / 2} AND edges.descending_end <= {buffer_distance / 2}, FALSE) AS edge_check
+            FROM proc_{self.damage.deck.table_name} AS deck
+            LEFT JOIN (
+                SELECT
+                    points.rdeck,
+                    min(ST_Distance(deck.edge_start, points.proj_axis)) FILTER (WHERE points.ps_table = '{self.damage.ascending.table_name}') AS ascending_start,
+                    min(ST_Distance(deck.edge_end, points.proj_axis)) FILTER (WHERE points.ps_table = '{self.damage.descending.table_name}') AS descending_end
+                FROM ({self.scatter_union("rdeck, proj_axis")}) AS points
+                JOIN (SELECT uid, ST_StartPoint(deck_edge) AS edge_start, ST_EndPoint(deck_edge) AS edge_end FROM proc_{self.damage.deck.table_name}) AS deck
+                ON points.rdeck = deck.uid
+                GROUP BY points.rdeck
+            ) AS edges
+            ON deck.uid = edges.rdeck;
         """)
 
-    def init_result_table(self):
+    def init_result_table(self, buffer_distance: float = None):
         """ Initialize the result table for the processed data and creates a new table called `result`.
+
+        The `buffer_distance` column tags the results with the buffer distance of the processed tables, the rows inserted without it get the given value by default.
+
+        Arguments
+        ---------
+        buffer_distance : float, optional
+            The buffer distance of the processed tables in meters. Defaults to None, the rows are not tagged.
         """
+        default = "NULL" if buffer_distance is None else float(buffer_distance)
 
         self.connection.execute(f"""
             CREATE OR REPLACE TABLE result (
@@ -458,71 +674,68 @@ class DBPipeline:
                 ns_analytical_dsc_y DOUBLE[],
                 tilt DOUBLE,
                 defl DOUBLE,
+                buffer_distance DOUBLE DEFAULT {default},
             );
         """)
         print("Result table has been initialized.")
     
+    def build_deck_eligibility(self):
+        """ Materialize the `deck_eligibility` table used to select the decks for the solvers.
+
+        The table has one row per deck with its `orientation` and `edge_check` and the number of points of each orbit in each of its sectors as the integer columns `n_asc`, `c_asc`, `s_asc`, `n_dsc`, `c_dsc` and `s_dsc`, zero for the sectors without points. The counts are aggregated in a single pass over the points of all persistent scatter tables, see `scatter_union`, so the deck selection, e.g. `get_ns_bridge_uid` and `get_ew_bridge_uid`, does not scan the point tables again.
+        """
+        counts, columns = [], []
+        for obj, orbit in [(self.damage.ascending, "asc"), (self.damage.descending, "dsc")]:
+            for tag in ["N", "C", "S"]:
+                column = f"{tag.lower()}_{orbit}"
+                counts.append(f"count(*) FILTER (WHERE points.ps_table = '{obj.table_name}' AND sectors.sector_tag = '{tag}') AS {column}")
+                columns.append(f"COALESCE(counts.{column}, 0)::INTEGER AS {column}")
+        self.connection.execute(f"""
+            -- Count the points of each orbit in each sector of the decks, the decks without points get zero counts
+            
+            CREATE OR REPLACE TABLE deck_eligibility AS
+            SELECT deck.uid AS rdeck, deck.orientation, deck.edge_check, {", ".join(columns)}
+            FROM proc_{self.damage.deck.table_name} AS deck
+            LEFT JOIN (
+                SELECT points.rdeck, {", ".join(counts)}
+                FROM ({self.scatter_union("rdeck, rsector")}) AS points
+                JOIN sectors
+                ON points.rsector = sectors.uid
+                GROUP BY points.rdeck
+            ) AS counts
+            ON deck.uid = counts.rdeck
+            ORDER BY deck.uid;
+        """)
+        ns, ew = self.connection.execute(f"""
+            SELECT count(*) FILTER (WHERE {self.ns_eligible}), count(*) FILTER (WHERE {self.ew_eligible}) FROM deck_eligibility
+        """).fetchone()
+        print(f"Deck eligibility has been calculated, {ns} NS and {ew} EW oriented decks can be assessed.")
+
+    # the conditions of the deck selection on the columns of the deck_eligibility table
+    ns_eligible = "orientation = 'NS' AND edge_check AND n_asc + c_asc + s_asc > 0 AND n_dsc + c_dsc + s_dsc > 0"
+    ew_eligible = "orientation = 'EW' AND n_asc > 0 AND s_asc > 0 AND n_dsc > 0 AND s_dsc > 0"
+
     def get_ns_bridge_uid(self):
         """ Get the UID of the bridge with North-South orientation.
         
-        This method retrieves the UID of the bridge from the deck table that has an orientation of 'NS'.
+        This method retrieves the UID of the bridges from the `deck_eligibility` table that have an orientation of 'NS', a positive edge check and points of both orbits.
         
         Returns
         -------
         list[int]: The UID of the bridge with North-South orientation.
         """
-
-        query = f"""
-            SELECT rdeck
-            FROM proc_{self.damage.ascending.table_name}
-            WHERE rdeck IN (
-                SELECT rdeck
-                FROM proc_{self.damage.descending.table_name}
-                GROUP BY rdeck
-            )
-            GROUP BY rdeck ORDER BY rdeck
-        """
-        return self.connection.execute(f"""
-            SELECT uid 
-            FROM proc_{self.damage.deck.table_name}
-            WHERE orientation = 'NS' AND edge_check = TRUE
-            AND uid IN ({query});
-        """).fetchnumpy()['uid'].tolist()
+        return self.connection.execute(f"SELECT rdeck FROM deck_eligibility WHERE {self.ns_eligible} ORDER BY rdeck").fetchnumpy()['rdeck'].tolist()
 
     def get_ew_bridge_uid(self):
         """ Get the UID of the bridge with East-West orientation.
         
-        This method retrieves the UID of the bridge from the deck table that has an orientation of 'EW'.
+        This method retrieves the UID of the bridges from the `deck_eligibility` table that have an orientation of 'EW' and points of both orbits in their N and S sectors.
         
         Returns
         -------
         list[int]: The UID of the bridge with East-West orientation.
         """
-        desc_related_sectors = f"""
-            SELECT rdeck
-            FROM (
-                SELECT pa.rdeck, GROUP_CONCAT(DISTINCT s.sector_tag) AS sector_tags
-                FROM proc_{self.damage.descending.table_name} AS pa 
-                JOIN sectors AS s 
-                ON pa.rsector = s.uid
-                GROUP BY pa.rdeck
-                HAVING INSTR(sector_tags, 'S') > 0 AND INSTR(sector_tags, 'N') > 0
-            )
-            """
-        asc_related_sectors = f"""
-            SELECT rdeck
-            FROM (
-                SELECT pa.rdeck, GROUP_CONCAT(DISTINCT s.sector_tag) AS sector_tags
-                FROM proc_{self.damage.ascending.table_name} AS pa 
-                JOIN sectors AS s 
-                ON pa.rsector = s.uid
-                GROUP BY pa.rdeck
-                HAVING INSTR(sector_tags, 'S') > 0 AND INSTR(sector_tags, 'N') > 0
-            )
-            """
-        final_uids = f"SELECT rdeck FROM ({asc_related_sectors}) WHERE rdeck IN ({desc_related_sectors})"
-        
-        return self.connection.sql(f"SELECT uid FROM proc_{self.damage.deck.table_name} WHERE orientation = 'EW' AND uid IN ({final_uids})").fetchnumpy()['uid'].tolist()
+        return self.connection.execute(f"SELECT rdeck FROM deck_eligibility WHERE {self.ew_eligible} ORDER BY rdeck").fetchnumpy()['rdeck'].tolist()
     
     def get_attributes(self, table_name: str):
         """ Get the column names of the specified table.
@@ -539,252 +752,474 @@ class DBPipeline:
         list[str]: A list of column names in the specified table.
         """
         return self.connection.execute(f"select column_name from (describe {table_name})").fetchnumpy()['column_name'].tolist()
+
+    def partition_decks(self, computational_projection: str, tile_size: float = None, partitions: int = None) -> list[int]:
+        """ Partition the decks by a square grid of tiles or into a number of partitions of equal size for the tiled execution.
+
+        With `tile_size` every deck is owned by the grid tile containing the centroid of its geometry, so a deck crossing a tile border is processed once. With `partitions` the decks are ordered along the Hilbert curve of their centroids and split into partitions of the same number of decks, which keeps the partitions spatially compact and their processing times similar. The deck, axis and support geometries reprojected to the computational projection are kept in the temporary `tile_decks`, `tile_axes` and `tile_supports` tables, the tile of each deck is stored in the `tile` column of `tile_decks`.
+
+        Arguments
+        ---------
+        computational_projection : str
+            The coordinate reference system for computations.
+        tile_size : float, optional
+            The size of the tiles in the units of the computational projection.
+        partitions : int, optional
+            The number of partitions, used if `tile_size` is not given.
+
+        Returns
+        -------
+        list[int]: The ids of the tiles owning at least one deck.
+
+        Raises
+        ------
+        ValueError: If neither the tile size nor the number of partitions is given.
+        """
+        if tile_size is None and partitions is None:
+            raise ValueError("Either the tile size or the number of partitions must be given.")
+        for obj, name in [(self.damage.deck, "tile_decks"), (self.damage.axis, "tile_axes"), (self.damage.support, "tile_supports")]:
+            self.connection.execute(f"""
+                CREATE OR REPLACE TEMP TABLE {name} AS
+                SELECT uid, ST_Transform(geom, '{obj.source_projection}', '{computational_projection}', always_xy := true) AS geom FROM {obj.table_name};
+            """)
+        if tile_size is not None:
+            tile = f"dense_rank() OVER (ORDER BY floor(ST_X(ST_Centroid(geom)) / {tile_size}), floor(ST_Y(ST_Centroid(geom)) / {tile_size}))"
+        else:
+            tile = f"ntile({partitions}) OVER (ORDER BY ST_Hilbert(ST_Centroid(geom), (SELECT ST_Extent(ST_Extent_Agg(geom)) FROM tile_decks)), uid)"
+        self.connection.execute(f"""
+            CREATE OR REPLACE TEMP TABLE tile_decks AS
+            SELECT uid, geom, {tile}::INTEGER AS tile
+            FROM tile_decks;
+        """)
+        tiles = self.connection.execute("SELECT DISTINCT tile FROM tile_decks ORDER BY tile").fetchnumpy()['tile'].tolist()
+        print(f"The decks have been partitioned into {len(tiles)} {'tiles of size ' + str(tile_size) if tile_size is not None else 'partitions'}.")
+        return tiles
+
+    def partition_scatters(self, computational_projection: str, buffer_distance: float, halo: float) -> list[str]:
+        """ Assign the decks and the persistent scatters of all tiles to their partitions in one pass.
+
+        The partition of a tile holds the decks owned by the tile and, as a halo, the decks within `halo` of their envelope, which compete with the owned decks for the points in overlapping sectors. The decks intersecting the axes and supports of these decks are added as well, so the deck, axis and support relations of the owned decks are the same as in a run over the full data. The decks of every partition are stored in the temporary `partition_decks` table with their `tile`. The persistent scatters of a partition are the points in the envelope of its decks expanded by the buffer distance. Instead of scanning the point tables once per tile, every point is joined with the envelopes of all tiles at once and only its `uid` is stored with its `tile_key` in the temporary `tile_{table_name}` tables, so the size of the assignment does not depend on the number of epochs. `export_partition` reads the full rows of a tile with a semi-join on the `uid`. A point in the envelopes of several tiles is assigned to each of them.
+
+        Arguments
+        ---------
+        computational_projection : str
+            The coordinate reference system for computations.
+        buffer_distance : float
+            The distance to buffer geometries in meters.
+        halo : float
+            The distance around the owned decks in which the neighbouring decks are included, in the units of the computational projection. It should be at least twice the buffer distance.
+
+        Returns
+        -------
+        list[str]: The names of the temporary tables of the partitions, to be dropped after the export.
+        """
+        self.connection.execute(f"""
+            -- the decks of every tile with their neighbours and the decks sharing an axis or a support with them
+
+            CREATE OR REPLACE TEMP TABLE partition_decks AS
+            WITH envelopes AS (
+                SELECT tile, ST_MakeEnvelope(min(ST_XMin(geom)) - {halo}, min(ST_YMin(geom)) - {halo}, max(ST_XMax(geom)) + {halo}, max(ST_YMax(geom)) + {halo}) AS env
+                FROM tile_decks GROUP BY tile
+            ), near AS (
+                SELECT second.tile, first.uid, first.geom
+                FROM tile_decks AS first JOIN envelopes AS second ON ST_Intersects(first.geom, second.env)
+            ), shared AS (
+                SELECT second.tile, first.geom FROM tile_axes AS first JOIN near AS second ON ST_Intersects(first.geom, second.geom)
+                UNION ALL
+                SELECT second.tile, first.geom FROM tile_supports AS first JOIN near AS second ON ST_Intersects(first.geom, second.geom)
+            )
+            SELECT tile, uid, geom FROM near
+            UNION
+            SELECT second.tile, first.uid, first.geom FROM tile_decks AS first JOIN shared AS second ON ST_Intersects(first.geom, second.geom);
+        """)
+        tables = ["partition_decks"]
+        for obj in self.scatters:
+            col_names = self.get_attributes(obj.table_name)
+            x_field, y_field = ("ST_X(first.geom)", "ST_Y(first.geom)") if "geom" in col_names else (f"first.{obj.lon_field}", f"first.{obj.lat_field}")
+            # the corners of the extents are reprojected to the projection of the points, the halo covers the curvature of the reprojected edges
+            self.connection.execute(f"""
+                CREATE OR REPLACE TEMP TABLE tile_{obj.table_name} AS
+                WITH extents AS (
+                    SELECT tile, ST_XMin(env) AS minx, ST_YMin(env) AS miny, ST_XMax(env) AS maxx, ST_YMax(env) AS maxy
+                    FROM (
+                        SELECT tile, ST_Envelope(ST_Transform(ST_MakeEnvelope(
+                            min(ST_XMin(geom)) - {buffer_distance}, min(ST_YMin(geom)) - {buffer_distance}, max(ST_XMax(geom)) + {buffer_distance}, max(ST_YMax(geom)) + {buffer_distance}
+                        ), '{computational_projection}', '{obj.source_projection}', always_xy := true)) AS env
+                        FROM partition_decks GROUP BY tile
+                    )
+                )
+                SELECT second.tile AS tile_key, first.uid
+                FROM {obj.table_name} AS first JOIN extents AS second
+                ON {x_field} BETWEEN second.minx AND second.maxx AND {y_field} BETWEEN second.miny AND second.maxy;
+            """)
+            tables.append(f"tile_{obj.table_name}")
+        print(f"The persistent scatters have been assigned to the partitions of the tiles.")
+        return tables
+
+    def export_partition(self, tile: int, db_path: str):
+        """ Copy the source data of a tile into a new database file.
+
+        The decks of the partition are read from the tables of `partition_scatters` and the persistent scatters are the rows of the source tables whose `uid` is assigned to the tile, the axes and supports are the ones intersecting the partition decks. The source tables keep their names, projections and uids, see `partition_tables` for merging the processed tables back.
+
+        Arguments
+        ---------
+        tile : int
+            The id of the tile, see `partition_decks`.
+        db_path : str
+            The path of the new database file of the partition.
+        """
+        decks = f"(SELECT uid, geom FROM partition_decks WHERE tile = {tile})"
+        self.connection.execute(f"""
+            ATTACH '{db_path}' AS partition_db;
+            CREATE TABLE partition_db.{self.damage.deck.table_name} AS SELECT * FROM {self.damage.deck.table_name} WHERE uid IN (SELECT uid FROM {decks});
+            CREATE TABLE partition_db.{self.damage.axis.table_name} AS
+            SELECT * FROM {self.damage.axis.table_name} WHERE uid IN (SELECT first.uid FROM tile_axes AS first JOIN {decks} AS second ON ST_Intersects(first.geom, second.geom));
+            CREATE TABLE partition_db.{self.damage.support.table_name} AS
+            SELECT * FROM {self.damage.support.table_name} WHERE uid IN (SELECT first.uid FROM tile_supports AS first JOIN {decks} AS second ON ST_Intersects(first.geom, second.geom));
+        """)
+        for obj in self.scatters:
+            self.connection.execute(f"""
+                CREATE TABLE partition_db.{obj.table_name} AS
+                SELECT * FROM {obj.table_name} WHERE uid IN (SELECT uid FROM tile_{obj.table_name} WHERE tile_key = {tile});
+            """)
+            if f"{obj.table_name}_dates" in self.connection.execute("SELECT table_name FROM duckdb_tables() WHERE database_name = current_database()").fetchnumpy()['table_name'].tolist():
+                self.connection.execute(f"CREATE TABLE partition_db.{obj.table_name}_dates AS SELECT * FROM {obj.table_name}_dates")
+        self.connection.execute("DETACH partition_db;")
+
+    def partition_tables(self, sector_offset: int) -> dict[str, str]:
+        """ Get the processed tables of a partition and the query of their rows owned by its tile.
+
+        The rows related to the halo decks are left out, they are merged from the partitions of their own tiles. The sector uids of a partition start from one, so they are shifted by `sector_offset` in the `sectors` table and in the `rsector` column of the persistent scatter tables. The axes not related to any deck are not part of the processed axis table.
+
+        Arguments
+        ---------
+        sector_offset : int
+            The number of sector uids used by the partitions merged before.
+
+        Returns
+        -------
+        dict[str, str]: The select query of each table by its name, the partition database is attached as `partition_db` and the owned decks are listed in the `owned_decks` table.
+        """
+        owned = "(SELECT uid FROM owned_decks)"
+        tables = {
+            f"proc_{self.damage.deck.table_name}": f"SELECT * FROM partition_db.proc_{self.damage.deck.table_name} WHERE uid IN {owned}",
+            f"proc_{self.damage.axis.table_name}": f"SELECT * FROM partition_db.proc_{self.damage.axis.table_name} WHERE rdeck IN {owned}",
+            f"proc_{self.damage.support.table_name}": f"SELECT * FROM partition_db.proc_{self.damage.support.table_name} WHERE rdeck IN {owned}",
+            "sectors": f"SELECT * REPLACE (uid + {sector_offset} AS uid) FROM partition_db.sectors WHERE rdeck IN {owned}",
+            "deck_eligibility": f"SELECT * FROM partition_db.deck_eligibility WHERE rdeck IN {owned}",
+            "result": f"SELECT * FROM partition_db.result WHERE rdeck IN {owned}",
+        }
+        for obj in self.scatters:
+            tables[f"proc_{obj.table_name}"] = f"SELECT * REPLACE (rsector + {sector_offset} AS rsector) FROM partition_db.proc_{obj.table_name} WHERE rdeck IN {owned}"
+        return tables
+
+    def merge_partition(self, tile: int, db_path: str):
+        """ Merge the processed tables and the results of a partition into the tables of the database.
+
+        The tables are created from the first merged partition with the schema of the partition tables, drop them before merging the partitions of a new run.
+
+        Arguments
+        ---------
+        tile : int
+            The id of the tile of the partition.
+        db_path : str
+            The path of the database file of the partition.
+        """
+        existing = self.connection.execute("SELECT table_name FROM duckdb_tables() WHERE database_name = current_database()").fetchnumpy()['table_name'].tolist()
+        sector_offset = self.connection.execute("SELECT COALESCE(max(uid), 0) FROM sectors").fetchone()[0] if "sectors" in existing else 0
+        self.connection.execute(f"""
+            ATTACH '{db_path}' AS partition_db (READ_ONLY);
+            CREATE OR REPLACE TEMP TABLE owned_decks AS SELECT uid FROM tile_decks WHERE tile = {tile};
+        """)
+        for table_name, query in self.partition_tables(sector_offset).items():
+            if table_name not in existing:
+                self.connection.execute(f"CREATE TABLE {table_name} AS {query} LIMIT 0")
+            self.connection.execute(f"INSERT INTO {table_name} BY NAME {query}")
+        self.connection.execute("DETACH partition_db; DROP TABLE owned_decks;")
     
 class DBQueries:
     """ DBQueries class for generating SQL queries related to the BridgeDamage data.
 
-    This class provides methods to generate SQL queries for retrieving geometries and other related data from the database.
+    This class provides methods to generate SQL queries for retrieving geometries and other related data from the database. The queries do not contain the deck UID, it is bound as a parameter when they are run, so the query text is the same for every deck. By default a query selects the rows of the deck given with the `$deckuid` parameter, e.g. `connection.execute(query, dict(deckuid=uid))`. With `batch=True` it selects the rows of all decks in the `$deckuids` list parameter in a single execution, with the deck UID as the first column `rdeck` and the rows sorted by it, and the result is split per deck with `group_rows` or `group_columns`.
 
     Methods
     -------
-    deck_geometry(deckuid: int, deck_table: str) -> str
+    deck_geometry(deck_table: str, batch: bool = False) -> str
         Get the geometry of a deck by its UID.
-    buffer_geometry(deckuid: int, table_name: str) -> str
+    buffer_geometry(table_name: str, batch: bool = False) -> str
         Get the buffer geometry of a deck by its UID.
-    sector_geometry(deckuid: int) -> str
+    sector_geometry(batch: bool = False) -> str
         Get the sector geometry of a deck by its UID.
-    support_geometry(deckuid: int, table_name: str) -> str
+    support_geometry(table_name: str, batch: bool = False) -> str
         Get the support geometry of a deck by its UID.
-    axis_geometry(deckuid: int, table_name: str) -> str
+    axis_geometry(table_name: str, batch: bool = False) -> str
         Get the axis geometry of a deck by its UID.
-    deck_edge(deckuid: int, table_name: str) -> str
+    deck_edge(table_name: str, batch: bool = False) -> str
         Get the deck edge geometry of a deck by its UID.
-    scatter_geometry(deckuid: int, table_name: str) -> str
+    scatter_geometry(table_name: str, batch: bool = False) -> str
         Get the origin scatter points of a deck by its UID.
-    projected_scatters(deckuid: int, table_name: str) -> str
+    projected_scatters(table_name: str, batch: bool = False) -> str
         Get the projected scatter points of a deck by its UID.
-    buffer_edge(deckuid: int, axis_name: str, deck_name: str) -> str
+    buffer_edge(axis_name: str, deck_name: str, batch: bool = False) -> str
         Get the buffer edge geometry of a deck by its UID.
-    deck_edge_graph(deckuid: int, axis_name: str, deck_name: str) -> str
+    deck_edge_graph(axis_name: str, deck_name: str, batch: bool = False) -> str
         Get the deck edge graph of a deck by its UID.
+    scatter_graph(table_name: str, name_fields: list, batch: bool = False) -> str
+        Get the scatter data of a deck by its UID for graph generation.
+    support_graph(axis_name: str, support_name: str, batch: bool = False) -> str
+        Get the support graph data of a deck by its UID.
+    deck_result(batch: bool = False) -> str
+        Get the orientation and the result of a deck by its UID.
+    ns_deck(deck_table: str, batch: bool = False) -> str
+        Get the span count and the length of a deck by its UID for the NS solver.
+    ns_scatters(table_name: str, name_fields: list, batch: bool = False) -> str
+        Get the normalized distances and the displacements of the points of a deck by its UID for the NS solver.
+    ew_deck(axis_name: str, deck_name: str, batch: bool = False) -> str
+        Get the azimuth and the length of a deck by its UID for the EW solver.
+    ew_sectors(batch: bool = False) -> str
+        Get the sectors of a deck by its UID sorted by their normalized distance for the EW solver.
+    sector_mean_ts(table_name: str, name_fields: list, scaling_factor: float, batch: bool = False) -> str
+        Get the mean displacement time series of the sectors of a deck by its UID.
+    sector_mean_ts_list(table_name: str, scaling_factor: float, batch: bool = False) -> str
+        Get the mean packed displacement time series of the sectors of a deck by its UID.
+    group_rows(rows: list[tuple], deckuids: list[int]) -> dict
+        Split the rows of a batch query per deck.
+    group_columns(columns: dict, deckuids: list[int]) -> dict
+        Split the columns of a batch query per deck.
     """
     def __init__(self):
         pass
-    
-    def deck_geometry(self, deckuid: int, deck_table: str) -> str:
+
+    @staticmethod
+    def _select(column: str, batch: bool) -> str:
+        """ The deck UID column of a batch query, nothing for a single deck query. """
+        return f"{column} AS rdeck, " if batch else ""
+
+    @staticmethod
+    def _where(column: str, batch: bool) -> str:
+        """ The condition on the deck UID column of a single deck or a batch query. """
+        return f"{column} IN (SELECT unnest($deckuids))" if batch else f"{column} = $deckuid"
+
+    @staticmethod
+    def _order(batch: bool, *columns: str) -> str:
+        """ The order of the rows, batch queries are sorted by the deck UID first. """
+        columns = (["rdeck"] if batch else []) + list(columns)
+        return f" ORDER BY {', '.join(columns)}" if columns else ""
+
+    def deck_geometry(self, deck_table: str, batch: bool = False) -> str:
         """ Get the geometry of a deck by its UID. 
         
         Arguments
         ---------
-        deckuid : int
-            The UID of the deck.
         deck_table : str
             The name of the deck table.
+        batch : bool
+            If True, the query selects the decks of the `$deckuids` parameter. Defaults to False.
         
         Returns
         -------
         str: SQL query to retrieve the geometry of the specified deck.
         """
-        return f"SELECT ST_AsWKB(geom) FROM {deck_table} WHERE uid = {deckuid} "
+        return f"SELECT {self._select('uid', batch)}ST_AsWKB(geom) FROM {deck_table} WHERE {self._where('uid', batch)}{self._order(batch)}"
     
-    def buffer_geometry(self, deckuid: int, table_name: str) -> str:
+    def buffer_geometry(self, table_name: str, batch: bool = False) -> str:
         """ Get the buffer geometry of a deck by its UID.
 
         Arguments
         ---------
-        deckuid : int
-            The UID of the deck.
         table_name : str
             The name of the table.
+        batch : bool
+            If True, the query selects the decks of the `$deckuids` parameter. Defaults to False.
         
         Returns
         -------
         str: SQL query to retrieve the buffer geometry of the specified deck.
         """
-        return f"SELECT ST_AsWKB(buffer) FROM {table_name} WHERE uid = {deckuid} "
+        return f"SELECT {self._select('uid', batch)}ST_AsWKB(buffer) FROM {table_name} WHERE {self._where('uid', batch)}{self._order(batch)}"
     
-    def sector_geometry(self, deckuid: int) -> str:
+    def sector_geometry(self, batch: bool = False) -> str:
         """ Get the sector geometry of a deck by its UID.
         
         Arguments
         ---------
-        deckuid : int
-            The UID of the deck.
+        batch : bool
+            If True, the query selects the decks of the `$deckuids` parameter. Defaults to False.
         
         Returns
         -------
         str: SQL query to retrieve the sector geometry of the specified deck.
         
         """
-        return f"SELECT ST_AsWKB(geom) FROM sectors WHERE rdeck = {deckuid}"
+        return f"SELECT {self._select('rdeck', batch)}ST_AsWKB(geom) FROM sectors WHERE {self._where('rdeck', batch)}{self._order(batch)}"
 
-    def support_geometry(self, deckuid: int, table_name: str) -> str:
+    def support_geometry(self, table_name: str, batch: bool = False) -> str:
         """ Get the support geometry of a deck by its UID.
         
         Arguments
         ---------
-        deckuid : int
-            The UID of the deck.
         table_name : str
             The name of the table.
+        batch : bool
+            If True, the query selects the decks of the `$deckuids` parameter. Defaults to False.
         
         Returns
         -------
         str: SQL query to retrieve the support geometry of the specified deck.
         """
-        return f"SELECT ST_AsWKB(geom) FROM {table_name} WHERE rdeck = {deckuid}"
+        return f"SELECT {self._select('rdeck', batch)}ST_AsWKB(geom) FROM {table_name} WHERE {self._where('rdeck', batch)}{self._order(batch)}"
     
-    def axis_geometry(self, deckuid: int, table_name: str) -> str:
+    def axis_geometry(self, table_name: str, batch: bool = False) -> str:
         """ Get the axis geometry of a deck by its UID.
 
         Arguments
         ---------
-        deckuid : int
-            The UID of the deck.
         table_name : str
             The name of the deck table.
+        batch : bool
+            If True, the query selects the decks of the `$deckuids` parameter. Defaults to False.
         
         Returns
         -------
         str: SQL query to retrieve the support geometry of the specified deck.
         """
-        return f"SELECT ST_AsWKB(geom) FROM {table_name} WHERE rdeck = {deckuid}"
+        return f"SELECT {self._select('rdeck', batch)}ST_AsWKB(geom) FROM {table_name} WHERE {self._where('rdeck', batch)}{self._order(batch)}"
     
-    def deck_edge(self, deckuid: int, table_name:str) -> str:
+    def deck_edge(self, table_name:str, batch: bool = False) -> str:
         """ Get the deck edge geometry of a deck by its UID.
         
         Arguments
         ---------
-        deckuid : int
-            The UID of the deck.
         table_name : str
             The name of the table.
+        batch : bool
+            If True, the query selects the decks of the `$deckuids` parameter. Defaults to False.
         
         Returns
         -------
         str: SQL query to retrieve the support geometry of the specified deck.
         """
-        return f"SELECT ST_AsWKB(ST_StartPoint(deck_edge)) as st, ST_AsWKB(ST_EndPoint(deck_edge)) as ed, FROM proc_{table_name} WHERE uid = {deckuid}"
+        return f"SELECT {self._select('uid', batch)}ST_AsWKB(ST_StartPoint(deck_edge)) as st, ST_AsWKB(ST_EndPoint(deck_edge)) as ed, FROM proc_{table_name} WHERE {self._where('uid', batch)}{self._order(batch)}"
         
-    def scatter_geometry(self, deckuid:int, table_name: str) -> str:
+    def scatter_geometry(self, table_name: str, batch: bool = False) -> str:
         """ Get the origin scatter points of a deck by its UID.
         
         Arguments
         ---------
-        deckuid : int
-            The UID of the deck.
         table_name : str
             The name of the table.
+        batch : bool
+            If True, the query selects the decks of the `$deckuids` parameter. Defaults to False.
         
         Returns
         -------
         str: SQL query to retrieve the support geometry of the specified deck.    
         """
 
-        return f"SELECT ST_X(geom) as x, ST_Y(geom) as y FROM {table_name} WHERE rdeck = {deckuid}"
+        return f"SELECT {self._select('rdeck', batch)}ST_X(geom) as x, ST_Y(geom) as y FROM {table_name} WHERE {self._where('rdeck', batch)}{self._order(batch)}"
     
-    def projected_scatters(self, deckuid: int, table_name: str) -> str:
+    def projected_scatters(self, table_name: str, batch: bool = False) -> str:
         """ Get the projected scatter points of a deck by its UID.
         
         Arguments
         ---------
-        deckuid : int
-            The UID of the deck.
         table_name : str
             The name of the table.
+        batch : bool
+            If True, the query selects the decks of the `$deckuids` parameter. Defaults to False.
         
         Returns
         -------
         str: SQL query to retrieve the support geometry of the specified deck.
         """
-        return f"SELECT ST_X(proj_axis) as x, ST_Y(proj_axis) as y FROM {table_name} WHERE rdeck = {deckuid}"
+        return f"SELECT {self._select('rdeck', batch)}ST_X(proj_axis) as x, ST_Y(proj_axis) as y FROM {table_name} WHERE {self._where('rdeck', batch)}{self._order(batch)}"
     
-    def buffer_edge(self, deckuid:int, axis_name:str, deck_name:str) -> str:
+    def buffer_edge(self, axis_name:str, deck_name:str, batch: bool = False) -> str:
         """ Get the buffer edge geometry of a deck by its UID.
 
         Arguments
         ---------
-        deckuid : int
-            The UID of the deck.
         axis_name : str
             The name of the axis table.
         deck_name : str
             The name of the deck table.
+        batch : bool
+            If True, the query selects the decks of the `$deckuids` parameter. Defaults to False.
         
         Returns
         -------
         str: SQL query to retrieve the support geometry of the specified deck.
         """
         return f"""
-                SELECT
+                SELECT {self._select('axis.rdeck', batch)}
                     ST_Distance(ST_StartPoint(deck.buffer_edge), ST_StartPoint(axis.geom)) / axis.length as p1,
                     ST_Distance(ST_EndPoint(deck.buffer_edge), ST_StartPoint(axis.geom)) / axis.length as p2,
-                FROM (SELECT * FROM {axis_name} WHERE rdeck = {deckuid}) as axis
+                FROM (SELECT * FROM {axis_name} WHERE {self._where('rdeck', batch)}) as axis
                 JOIN {deck_name} as deck
-                ON axis.rdeck = deck.uid
+                ON axis.rdeck = deck.uid{self._order(batch)}
                 """
     
-    def deck_edge_graph(self, deckuid:int, axis_name:str, deck_name:str) -> str:
+    def deck_edge_graph(self, axis_name:str, deck_name:str, batch: bool = False) -> str:
         """ Get the deck edge graph of a deck by its UID for graph generation.
 
         Arguments
         ---------
-        deckuid : int
-            The UID of the deck.
         axis_name : str
             The name of the axis table.
         deck_name : str
             The name of the deck table.
+        batch : bool
+            If True, the query selects the decks of the `$deckuids` parameter. Defaults to False.
 
         Returns
         -------
         str: SQL query to retrieve the deck edge graph of the specified deck.
         """
         return f"""
-                SELECT
+                SELECT {self._select('axis.rdeck', batch)}
                     ST_Distance(ST_StartPoint(deck.deck_edge), ST_StartPoint(axis.geom)) / axis.length as p1,
                     ST_Distance(ST_EndPoint(deck.deck_edge), ST_StartPoint(axis.geom)) / axis.length as p2,
-                FROM (SELECT * FROM {axis_name} WHERE rdeck = {deckuid}) as axis
+                FROM (SELECT * FROM {axis_name} WHERE {self._where('rdeck', batch)}) as axis
                 JOIN {deck_name} as deck
-                ON axis.rdeck = deck.uid
+                ON axis.rdeck = deck.uid{self._order(batch)}
                 """
     
-    def scatter_graph(self, deckuid:int, table_name:str, name_fields: list):
+    def scatter_graph(self, table_name:str, name_fields: list, batch: bool = False) -> str:
         """ Get the scatter data of a deck by its UID for graph generation.
 
         Arguments
         ---------
-        deckuid : int
-            The UID of the deck.
         table_name : str
             The name of the table containing scatter data.
         name_fields : list
             The list of field names to be used in the query.
+        batch : bool
+            If True, the query selects the decks of the `$deckuids` parameter. Defaults to False.
 
         Returns
         -------
         str: SQL query to retrieve the scatter data of the specified deck.
         """
         return f""" 
-                SELECT 
+                SELECT {self._select('proc_scatter.rdeck', batch)}
                     proc_scatter.ndist_axis as x,
                     scatter.{name_fields[-1]} - scatter.{name_fields[0]}  as y,
-                FROM (SELECT * FROM proc_{table_name} WHERE rdeck = {deckuid}) as proc_scatter
+                FROM (SELECT * FROM proc_{table_name} WHERE {self._where('rdeck', batch)}) as proc_scatter
                 JOIN {table_name} as scatter
-                ON proc_scatter.uid = scatter.uid
+                ON proc_scatter.uid = scatter.uid{self._order(batch)}
                 """
     
-    def support_graph(self, deckuid:str, axis_name:str, support_name:str) -> str:
+    def support_graph(self, axis_name:str, support_name:str, batch: bool = False) -> str:
         """ Returns the query to retrieve the support graph data for a given deck UID.
 
         Arguments
         ---------
-        deckuid : str
-            The UID of the deck.
         axis_name : str
             The name of the axis table.
         support_name : str
             The name of the support table.
+        batch : bool
+            If True, the query selects the decks of the `$deckuids` parameter. Defaults to False.
         
         Returns
         -------
@@ -794,11 +1229,211 @@ class DBQueries:
         return f"""
               SELECT *
               FROM (
-                SELECT 
+                SELECT {self._select('support.rdeck', batch)}
                     ST_Distance(ST_StartPoint(axis.geom), ST_Centroid(ST_Intersection(support.geom, axis.geom))) / axis.length as p1,
-                FROM (SELECT * FROM proc_{support_name} WHERE rdeck = {deckuid}) AS support
+                FROM (SELECT * FROM proc_{support_name} WHERE {self._where('rdeck', batch)}) AS support
                 JOIN proc_{axis_name} AS axis
                 ON support.rdeck = axis.rdeck
               )
-              WHERE p1 IS NOT NULL
-              """
\ No newline at end of file
+              WHERE p1 IS NOT NULL{self._order(batch)}"""
+
+    def deck_result(self, batch: bool = False) -> str:
+        """ Get the orientation and the result of a deck by its UID for graph generation.
+
+        The buffer distance of the results is bound with the `$buffer_distance` parameter.
+
+        Arguments
+        ---------
+        batch : bool
+            If True, the query selects the decks of the `$deckuids` parameter. Defaults to False.
+
+        Returns
+        -------
+        str: SQL query to retrieve the orientation, the quadratic and analytical curves and the tilt and deflection of the specified deck.
+        """
+        return f"""
+                SELECT {self._select('result.rdeck', batch)}
+                    deck.orientation, result.ns_quadratic_asc_x, result.ns_quadratic_asc_y, result.ns_quadratic_dsc_x, result.ns_quadratic_dsc_y,
+                    result.ns_analytical_asc_y, result.ns_analytical_dsc_y, result.tilt_asc, result.defl_asc, result.tilt_dsc, result.defl_dsc, result.tilt, result.defl
+                FROM (SELECT * FROM result WHERE buffer_distance = $buffer_distance AND {self._where('rdeck', batch)}) AS result
+                JOIN deck_eligibility AS deck
+                ON result.rdeck = deck.rdeck{self._order(batch)}
+                """
+
+    def ns_deck(self, deck_table: str, batch: bool = False) -> str:
+        """ Get the span count and the length of a deck by its UID for the NS solver.
+
+        Arguments
+        ---------
+        deck_table : str
+            The name of the processed deck table.
+        batch : bool
+            If True, the query selects the decks of the `$deckuids` parameter. Defaults to False.
+
+        Returns
+        -------
+        str: SQL query to retrieve the span count and the length of the specified deck.
+        """
+        return f"SELECT {self._select('uid', batch)}span_count, deck_length FROM {deck_table} WHERE {self._where('uid', batch)}{self._order(batch)}"
+
+    def ns_scatters(self, table_name: str, name_fields: list, batch: bool = False) -> str:
+        """ Get the normalized distances and the displacements between the first and the last dates of the points of a deck by its UID for the NS solver.
+
+        Arguments
+        ---------
+        table_name : str
+            The name of the persistent scatter table.
+        name_fields : list
+            The list of field names of the dates.
+        batch : bool
+            If True, the query selects the decks of the `$deckuids` parameter. Defaults to False.
+
+        Returns
+        -------
+        str: SQL query to retrieve the points of the specified deck sorted by their normalized distance.
+        """
+        return f"""
+            SELECT {self._select('first.rdeck', batch)}
+                first.ndist_axis as ndist,
+                second.{name_fields[-1]}::DOUBLE - second.{name_fields[0]}::DOUBLE  as disp,
+            FROM (SELECT uid, rdeck, ndist_axis FROM proc_{table_name} WHERE {self._where('rdeck', batch)}) as first
+            JOIN {table_name} as second
+            ON first.uid = second.uid{self._order(batch, 'first.ndist_axis ASC')}
+        """
+
+    def ew_deck(self, axis_name: str, deck_name: str, batch: bool = False) -> str:
+        """ Get the azimuth of the axis and the length of a deck by its UID for the EW solver.
+
+        Arguments
+        ---------
+        axis_name : str
+            The name of the processed axis table.
+        deck_name : str
+            The name of the processed deck table.
+        batch : bool
+            If True, the query selects the decks of the `$deckuids` parameter. Defaults to False.
+
+        Returns
+        -------
+        str: SQL query to retrieve the azimuth and the length of the specified deck.
+        """
+        return f"""
+            SELECT {self._select('deck.uid', batch)}axis.azimuth, deck.deck_length
+            FROM (SELECT * FROM {deck_name} WHERE {self._where('uid', batch)}) AS deck
+            JOIN (SELECT * FROM {axis_name} QUALIFY row_number() OVER (PARTITION BY rdeck ORDER BY uid) = 1) AS axis
+            ON deck.uid = axis.rdeck{self._order(batch)}
+        """
+
+    def ew_sectors(self, batch: bool = False) -> str:
+        """ Get the sectors of a deck by its UID sorted by their normalized distance for the EW solver.
+
+        Arguments
+        ---------
+        batch : bool
+            If True, the query selects the decks of the `$deckuids` parameter. Defaults to False.
+
+        Returns
+        -------
+        str: SQL query to retrieve the uid, tag and normalized distance of the sectors of the specified deck.
+        """
+        return f"SELECT {self._select('rdeck', batch)}uid, sector_tag, ndist FROM sectors WHERE {self._where('rdeck', batch)}{self._order(batch, 'ndist ASC')}"
+
+    def sector_mean_ts(self, table_name: str, name_fields: list, scaling_factor: float, batch: bool = False) -> str:
+        """ Get the mean displacement time series of the sectors of a deck by its UID, relative to the first date.
+
+        Arguments
+        ---------
+        table_name : str
+            The name of the persistent scatter table with one column per date.
+        name_fields : list
+            The list of field names of the dates.
+        scaling_factor : float
+            The factor the displacements are multiplied with.
+        batch : bool
+            If True, the query selects the decks of the `$deckuids` parameter. Defaults to False.
+
+        Returns
+        -------
+        str: SQL query to retrieve the sector uid and the mean of each date of the sectors with points of the specified deck.
+        """
+        selectStatement = ",".join([f"MEAN(second.{i}::DOUBLE - second.{name_fields[0]}::DOUBLE)*{scaling_factor} AS {i}" for i in name_fields])
+        return f"""
+            SELECT {self._select('first.rdeck', batch)}first.rsector, {selectStatement}
+            FROM (SELECT uid, rdeck, rsector FROM proc_{table_name} WHERE {self._where('rdeck', batch)}) AS first
+            JOIN {table_name} AS second
+            ON first.uid = second.uid
+            GROUP BY ALL{self._order(batch)}
+        """
+
+    def sector_mean_ts_list(self, table_name: str, scaling_factor: float, batch: bool = False) -> str:
+        """ Get the mean packed displacement time series of the sectors of a deck by its UID, relative to the first date.
+
+        The `ts` lists of the points are unnested with their epoch and averaged per sector and epoch in the database, the NaN and NULL displacements are left out of the mean as with `nanmean`. Only the mean lists of the sectors are returned, so the fetched values do not grow with the number of points.
+
+        Arguments
+        ---------
+        table_name : str
+            The name of the persistent scatter table with the `ts` list column.
+        scaling_factor : float
+            The factor the displacements are multiplied with.
+        batch : bool
+            If True, the query selects the decks of the `$deckuids` parameter. Defaults to False.
+
+        Returns
+        -------
+        str: SQL query to retrieve the sector uid and the list of the mean of each date of the sectors with points of the specified deck, NaN for the dates without a valid displacement.
+        """
+        return f"""
+            SELECT {self._select('rdeck', batch)}rsector, list(coalesce(displacement, 'NaN'::DOUBLE) ORDER BY epoch) AS ts
+            FROM (
+                SELECT rdeck, rsector, epoch, avg(CASE WHEN isnan(displacement) THEN NULL ELSE displacement END) * {scaling_factor} AS displacement
+                FROM (
+                    SELECT first.rdeck, first.rsector, generate_subscripts(second.ts, 1) AS epoch, unnest(second.ts)::DOUBLE - second.ts[1]::DOUBLE AS displacement
+                    FROM (SELECT uid, rdeck, rsector FROM proc_{table_name} WHERE {self._where('rdeck', batch)}) AS first
+                    JOIN {table_name} AS second
+                    ON first.uid = second.uid
+                )
+                GROUP BY rdeck, rsector, epoch
+            )
+            GROUP BY rdeck, rsector{self._order(batch, 'rsector')}
+        """
+
+    @staticmethod
+    def group_rows(rows: list[tuple], deckuids: list[int]) -> dict[int, list[tuple]]:
+        """ Split the rows of a batch query, fetched with `fetchall`, per deck.
+
+        Arguments
+        ---------
+        rows : list[tuple]
+            The rows of the batch query, the deck UID is their first element.
+        deckuids : list[int]
+            The UID of the decks of the query.
+
+        Returns
+        -------
+        dict[int, list[tuple]]: The rows of each deck without the deck UID, as returned by the single deck query.
+        """
+        grouped = {int(uid): [] for uid in deckuids}
+        for row in rows:
+            grouped[row[0]].append(row[1:])
+        return grouped
+
+    @staticmethod
+    def group_columns(columns: dict, deckuids: list[int]) -> dict[int, dict]:
+        """ Split the columns of a batch query, fetched with `fetchnumpy`, per deck.
+
+        Arguments
+        ---------
+        columns : dict
+            The columns of the batch query sorted by the deck UID in the `rdeck` column.
+        deckuids : list[int]
+            The UID of the decks of the query.
+
+        Returns
+        -------
+        dict[int, dict]: The columns of each deck without the deck UID, as returned by the single deck query.
+        """
+        rdeck = np.asarray(columns['rdeck'])
+        deckuids = np.asarray(deckuids, dtype=rdeck.dtype)
+        starts, ends = np.searchsorted(rdeck, deckuids, 'left'), np.searchsorted(rdeck, deckuids, 'right')
+        return {int(uid): {name: value[st:ed] for name, value in columns.items() if name != 'rdeck'} for uid, st, ed in zip(deckuids, starts, ends)}
@@ -0,0 +1,130 @@
+"""
+This module provides the QueryProfiler class, a wrapper of a DuckDB connection that records the wall time, the rows read and written and the operator profile of DuckDB (the profile reported by `EXPLAIN ANALYZE`) of every SQL statement run through it. It is used by the profiling mode of `DamageAssessment.preprocess` to find the expensive statements of the `DBPipeline` stages.
+"""
+import json
+import time
+import duckdb
+from contextlib import contextmanager
+from duckdb import DuckDBPyConnection
+
+
+class QueryProfiler:
+    """ Profiling wrapper of a DuckDB connection.
+
+    The wrapper is passed to `DBPipeline` in place of the connection. The multi-statement strings given to `execute` are split into their statements, which are run one by one with the DuckDB profiler enabled, so every statement gets its own record. The other methods, e.g. `sql`, `begin` and `commit`, are passed to the connection without profiling, their time is only included in the wall time of their stage.
+
+    Attributes
+    ----------
+    connection : DuckDBPyConnection
+        The profiled database connection.
+    stages : list[dict]
+        The records of the profiled stages with the records of their statements under the `statements` key.
+
+    Methods
+    -------
+    stage(name: str)
+        Context manager recording the statements run inside it as a stage.
+    execute(query: str, parameters: list)
+        Runs the statements of a query and records their profiles.
+    close()
+        Disables the DuckDB profiler of the connection.
+    save(table_name: str, json_file: str)
+        Writes the records to a table of the database and to a JSON file.
+    """
+    # the operators writing the rows of their child into a table, their own cardinality is the count they return
+    sink_operators = {"CREATE_TABLE_AS", "BATCH_CREATE_TABLE_AS", "INSERT", "BATCH_INSERT", "UPDATE", "DELETE"}
+
+    def __init__(self, connection: DuckDBPyConnection):
+        """ Wrap a connection and enable its DuckDB profiler.
+
+        Arguments
+        ---------
+        connection : DuckDBPyConnection
+            The database connection to profile.
+        """
+        self.connection = connection
+        self.stages = []
+        self._current = None
+        # the profiles are collected for `get_profiling_information` without printing them after every statement
+        self.connection.execute("PRAGMA enable_profiling = 'no_output'")
+
+    def __getattr__(self, name: str):
+        return getattr(self.connection, name)
+
+    @contextmanager
+    def stage(self, name: str):
+        """ Record the statements run inside the context as the stage `name`, with its wall time and the sum of the rows of its statements. """
+        self._current = dict(stage=name, seconds=0.0, rows_in=0, rows_out=0, statements=[])
+        st = time.time()
+        try:
+            yield self._current
+        finally:
+            self._current['seconds'] = time.time() - st
+            self._current['rows_in'] = sum(i['rows_in'] for i in self._current['statements'])
+            self._current['rows_out'] = sum(i['rows_out'] for i in self._current['statements'])
+            self.stages.append(self._current)
+            self._current = None
+
+    def execute(self, query: str, parameters: list = None) -> DuckDBPyConnection:
+        """ Run the statements of a query one by one and record their wall time, rows and operator profile.
+
+        Arguments
+        ---------
+        query : str
+            The SQL query, it may contain several statements.
+        parameters : list, optional
+            The parameters of a prepared single statement query.
+
+        Returns
+        -------
+        DuckDBPyConnection: The connection with the result of the last statement.
+        """
+        statements = duckdb.extract_statements(query) if parameters is None else [query]
+        for statement in statements:
+            st = time.time()
+            if parameters is None:
+                self.connection.execute(statement)
+            else:
+                self.connection.execute(statement, parameters)
+            seconds = time.time() - st
+            if self._current is not None:
+                self._current['statements'].append(self._record(statement if isinstance(statement, str) else statement.query, seconds))
+        return self.connection
+
+    def _record(self, query: str, seconds: float) -> dict:
+        """ Build the record of a statement from the last profile of the connection. Statements without an operator tree, e.g. `DROP` or `PRAGMA`, are recorded with zero rows. """
+        profile = json.loads(self.connection.get_profiling_information(format='json'))
+        operators = profile.get('children', [])
+        rows_in, rows_out = profile.get('cumulative_rows_scanned', 0), profile.get('rows_returned', 0)
+        if operators and operators[0]['operator_type'] in self.sink_operators:
+            rows_out = sum(child['operator_cardinality'] for child in operators[0]['children'])
+        return dict(statement=len(self._current['statements']) + 1, query=query.strip(), seconds=seconds, rows_in=rows_in, rows_out=rows_out, profile=profile if operators else None)
+
+    def close(self):
+        """ Disable the DuckDB profiler of the connection. """
+        self.connection.execute("PRAGMA disable_profiling")
+
+    def save(self, table_name: str, json_file: str):
+        """ Write the records of the stages and their statements to a table and to a JSON file.
+
+        The table has one row per stage with `level = 'stage'` and one row per statement with `level = 'statement'`, the operator profile of the statements is stored in the `profile` JSON column.
+
+        Arguments
+        ---------
+        table_name : str
+            The name of the table, it is replaced if it exists.
+        json_file : str
+            The path of the JSON file.
+        """
+        rows = []
+        for stage in self.stages:
+            rows.append((stage['stage'], 'stage', None, None, stage['seconds'], stage['rows_in'], stage['rows_out'], None))
+            for i in stage['statements']:
+                rows.append((stage['stage'], 'statement', i['statement'], i['query'], i['seconds'], i['rows_in'], i['rows_out'], None if i['profile'] is None else json.dumps(i['profile'])))
+        self.connection.execute(f"""
+            CREATE OR REPLACE TABLE {table_name} (stage VARCHAR, level VARCHAR, statement INTEGER, query VARCHAR, seconds DOUBLE, rows_in BIGINT, rows_out BIGINT, profile JSON);
+        """)
+        if rows:
+            self.connection.executemany(f"INSERT INTO {table_name} VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        with open(json_file, 'w') as f:
+            json.dump(self.stages, f, indent=2)
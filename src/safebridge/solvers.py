@@ -29,6 +29,8 @@ class NS_Solver:
         Evaluates the polynomial function for the specified orbit.
     analytical_curve(orbit: str) -> np.ndarray:
         Computes the analytical curve for the specified orbit based on the polynomial fit.
+    beam_solution(ndist: np.ndarray, disp: np.ndarray, deck_length: float, span_count: int, xrange: np.ndarray) -> np.ndarray:
+        Fits the single or two span beam displacement to the points of a deck.
     
 
     """
@@ -147,6 +149,30 @@ class NS_Solver:
         Returns
         -------
             np.ndarray: The evaluated polynomial function values for the specified orbit.
+        """
+        
+        return self.beam_solution(self.data[orbit]['ndist'], self.data[orbit]['disp'], self.data['deck']['deck_length'][0], self.data['deck']['span_count'][0], self._quadratic_x(orbit))
+
+    @staticmethod
+    def beam_solution(ndist: np.ndarray, disp: np.ndarray, deck_length: float, span_count: int, xrange: np.ndarray) -> np.ndarray:
+        """ Fit the single or two span beam displacement to the points of a deck and evaluate it on xrange.
+
+        Arguments
+        ---------
+        ndist : np.ndarray
+            The normalized distances of the points along the deck axis.
+        disp : np.ndarray
+            The displacements of the points.
+        deck_length : float
+            The length of the deck.
+        span_count : int
+            The number of spans of the deck.
+        xrange : np.ndarray
+            The normalized distances to evaluate the fitted displacement at.
+
+        Returns
+        -------
+        np.ndarray: The fitted beam displacement at xrange, None if there are less than 3 points.
         
         Methods
         -------
@@ -161,10 +187,6 @@ class NS_Solver:
             Calculates the two span beam displacement.
         """
         
-        deck_length = self.data['deck']['deck_length'][0]
-        span_count = self.data['deck']['span_count'][0]
-        xrange = self._quadratic_x(orbit)
-        
         def fit_beam_displacement(x:np.ndarray, y:np.array, L0:float) -> np.ndarray:
             """ Method fits the single span beam displacement
             
@@ -252,12 +274,12 @@ class NS_Solver:
                     lambda x: (C0 / 24) * x**4 - (C0 * (13/96) * L + 4 * (-B + (C+A)/2) / L**3) * x**3 + (C0 * (5/32) * L**2 + 12 * (-B + (C+A)/2) / L**2) * x**2 + (-C0 * (29/384) * L**3 + (9*B - 7*C/2 -11*A/2) / L) * x + C0 * (5/384) * L**4 - B + C/2 + 3*A/2
                 ]
             )
-        if self.data[orbit]['ndist'].size >= 3:
+        if ndist.size >= 3:
             if span_count == 1 :
-                fit_params = fit_beam_displacement(self.data[orbit]['ndist'], self.data[orbit]['disp'], deck_length)
+                fit_params = fit_beam_displacement(ndist, disp, deck_length)
                 solution = one_span_beam_displacement(xrange, deck_length, *fit_params)
             else:
-                fit_params = fit_beam_displacement_two_spans(self.data[orbit]['ndist'], self.data[orbit]['disp'], deck_length)
+                fit_params = fit_beam_displacement_two_spans(ndist, disp, deck_length)
                 solution = two_span_beam_displacement(xrange, deck_length, *fit_params)
             
             return solution
@@ -265,6 +287,199 @@ class NS_Solver:
         
 
     
+class NS_BatchSolver:
+    """
+    A class to solve the quadratic tilt and deflection of many bridge decks at once from the displacement data of one orbit.
+    The points of all decks are given as flat arrays with the index of their deck. The degree 2 least squares fits of all decks are solved together from their normal equations, whose sums are accumulated per deck with `np.bincount`, and the tilt and deflection are computed in closed form from the coefficients of the parabolas. The results are the ones of `NS_Solver` for each deck, except that the deflection is the maximum over the whole normalized distance range instead of over the 50 points of `_quadratic_x`.
+
+    Attributes
+    ----------
+    ndist : np.ndarray
+        The normalized distances of the points, grouped by deck.
+    disp : np.ndarray
+        The displacements of the points, grouped by deck.
+    index : np.ndarray
+        The index of the deck of each point, grouped by deck.
+    deck_length : np.ndarray
+        The length of each deck.
+    span_count : np.ndarray
+        The span count of each deck.
+    coefficients : np.ndarray
+        The coefficients of the parabola of each deck in powers of the normalized distance relative to the mean normalized distance of the deck, highest power first.
+    center : np.ndarray
+        The mean normalized distance of the points of each deck.
+
+    Methods
+    -------
+    setup() -> None:
+        Solves the quadratic fits of all decks.
+    polynomial(x: np.ndarray) -> np.ndarray:
+        Evaluates the parabola of each deck.
+    quadratic_tilt() -> np.ndarray:
+        Calculates the quadratic tilt of each deck.
+    quadratic_deflection() -> np.ndarray:
+        Calculates the quadratic deflection of each deck.
+    _quadratic_x() -> np.ndarray:
+        Generates a linear space of x values for each deck.
+    _quadratic_y() -> np.ndarray:
+        Evaluates the parabola of each deck on its linear space of x values.
+    analytical_curve(deck: int) -> np.ndarray:
+        Computes the analytical curve of a deck, see `NS_Solver.beam_solution`.
+    """
+    def __init__(self, ndist: np.ndarray, disp: np.ndarray, index: np.ndarray, deck_length: np.ndarray, span_count: np.ndarray):
+        """
+        Initialize the NS_BatchSolver with the points of all decks of an orbit.
+
+        Args:
+            ndist (np.ndarray): The normalized distances of the points.
+            disp (np.ndarray): The displacements of the points.
+            index (np.ndarray): The index of the deck of each point, from 0 to the number of decks - 1. The points of a deck keep their order, the first and the last point of a deck give the ends of its tilt like in `NS_Solver`.
+            deck_length (np.ndarray): The length of each deck.
+            span_count (np.ndarray): The span count of each deck.
+        """
+        order = np.argsort(index, kind='stable')
+        self.ndist = np.asarray(ndist, dtype=np.float64)[order]
+        self.disp = np.asarray(disp, dtype=np.float64)[order]
+        self.index = np.asarray(index)[order]
+        self.deck_length = np.asarray(deck_length, dtype=np.float64)
+        self.span_count = np.asarray(span_count)
+        n_decks = self.deck_length.shape[0]
+        self.counts = np.bincount(self.index, minlength=n_decks)
+        self.starts = np.concatenate([[0], np.cumsum(self.counts)[:-1]]).astype(np.int64)
+        self._xrange = None
+        self.setup()
+
+    def setup(self):
+        """
+        Solve the degree 2 least squares fits of all decks.
+        The normalized distances are centered on their mean per deck before the sums of the normal equations are accumulated, which keeps the 3 x 3 systems well conditioned. The decks with less than 3 points or a singular system are fitted with `np.polyfit` like in `NS_Solver`.
+        """
+        n_decks = self.counts.shape[0]
+        count = np.maximum(self.counts, 1)
+        self.center = np.bincount(self.index, self.ndist, n_decks) / count
+        t = self.ndist - self.center[self.index]
+        # the sums of the powers of t and of the displacement times the powers of t of each deck
+        S = np.stack([self.counts.astype(np.float64)] + [np.bincount(self.index, t**k, n_decks) for k in range(1, 5)], axis=1)
+        T = np.stack([np.bincount(self.index, self.disp * t**k, n_decks) for k in range(3)], axis=1)
+        normal = S[:, [[4, 3, 2], [3, 2, 1], [2, 1, 0]]]
+        rhs = T[:, [2, 1, 0]]
+
+        solvable = self.counts >= 3
+        solvable[solvable] = np.linalg.cond(normal[solvable]) < 1 / np.finfo(np.float64).eps
+        self.coefficients = np.full((n_decks, 3), np.nan)
+        if solvable.any():
+            self.coefficients[solvable] = np.linalg.solve(normal[solvable], rhs[solvable][..., None])[..., 0]
+        for deck in np.flatnonzero(~solvable & (self.counts > 0)):
+            points = slice(self.starts[deck], self.starts[deck] + self.counts[deck])
+            # the rank deficient fits depend on the powers, they are fitted in the normalized distance and moved to the center
+            A, B, C = np.polyfit(self.ndist[points], self.disp[points], deg = 2)
+            m = self.center[deck]
+            self.coefficients[deck] = (A, 2 * A * m + B, (A * m + B) * m + C)
+
+    def polynomial(self, x: np.ndarray) -> np.ndarray:
+        """ Evaluate the parabola of each deck.
+
+        Arguments
+        ---------
+        x : np.ndarray
+            The normalized distances, one row per deck or one value per deck.
+
+        Returns
+        -------
+        np.ndarray: The values of the parabolas with the shape of x.
+        """
+        x = np.asarray(x, dtype=np.float64)
+        shape = (-1,) + (1,) * (x.ndim - 1)
+        t = x - self.center.reshape(shape)
+        a, b, c = (self.coefficients[:, i].reshape(shape) for i in range(3))
+        return (a * t + b) * t + c
+
+    def _ends(self) -> tuple[np.ndarray, np.ndarray]:
+        """ The normalized distances of the first and the last point of each deck. """
+        last = self.starts + np.maximum(self.counts, 1) - 1
+        return self.ndist[np.minimum(self.starts, self.ndist.size - 1)], self.ndist[np.minimum(last, self.ndist.size - 1)]
+
+    def quadratic_tilt(self) -> np.ndarray:
+        """ Calculate the quadratic tilt of each deck.
+
+        The tilt is the difference of the parabola between the first and the last point of the deck divided by the deck length.
+
+        Returns
+        -------
+        np.ndarray: The tilt ratio of each deck.
+        """
+        xleft, xright = self._ends()
+        return np.abs(self.polynomial(xright) - self.polynomial(xleft)) / self.deck_length
+
+    def quadratic_deflection(self) -> np.ndarray:
+        """ Calculate the quadratic deflection of each deck.
+
+        The deflection is the maximum distance between the parabola and the line of `NS_Solver.quadratic_deflection` over the normalized distance range of the deck, divided by the deck length. The line is built like in `NS_Solver`, with the value of the parabola at the last point at the first point and the other way around. The difference of the parabola and the line is a parabola as well, its maximum absolute value is at one of the ends of the range or at its vertex.
+
+        Returns
+        -------
+        np.ndarray: The deflection ratio of each deck.
+        """
+        xleft, xright = self._ends()
+        yleft, yright = self.polynomial(xright), self.polynomial(xleft)
+        slope = (yright - yleft) / (xright - xleft)
+        intercept = yleft - slope * xleft
+
+        xrange = self._quadratic_x()[:, [0, -1]]
+        a, b = self.coefficients[:, 0], self.coefficients[:, 1]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # the vertex of the difference, a * t**2 + (b - slope) * t + ..., in the normalized distance
+            vertex = self.center + (slope - b) / (2 * a)
+        vertex = np.where(np.isfinite(vertex), np.clip(vertex, xrange[:, 0], xrange[:, 1]), xrange[:, 0])
+        candidates = np.column_stack([xrange, vertex])
+        deflection = self.polynomial(candidates) - (slope[:, None] * candidates + intercept[:, None])
+        return np.abs(deflection).max(axis=1) / self.deck_length
+
+    def _quadratic_x(self) -> np.ndarray:
+        """ Generate a linear space of 50 x values between the minimum and the maximum normalized distance of each deck.
+
+        Returns
+        -------
+        np.ndarray: The linear spaces of x values, one row per deck.
+        """
+        if self._xrange is not None:
+            return self._xrange
+        n_decks = self.counts.shape[0]
+        empty = self.counts == 0
+        xmin = np.minimum.reduceat(self.ndist, self.starts[~empty]) if self.ndist.size else np.array([])
+        xmax = np.maximum.reduceat(self.ndist, self.starts[~empty]) if self.ndist.size else np.array([])
+        lower, upper = np.full(n_decks, np.nan), np.full(n_decks, np.nan)
+        lower[~empty], upper[~empty] = xmin, xmax
+        self._xrange = np.linspace(lower, upper, 50, axis=1)
+        return self._xrange
+
+    def _quadratic_y(self) -> np.ndarray:
+        """ Evaluate the parabola of each deck on its linear space of x values.
+
+        Returns
+        -------
+        np.ndarray: The values of the parabolas, one row per deck.
+        """
+        return self.polynomial(self._quadratic_x())
+
+    def analytical_curve(self, deck: int) -> np.ndarray:
+        """ Compute the analytical curve of a deck with `NS_Solver.beam_solution`.
+
+        The beam displacement is a nonlinear fit, it is solved for each deck separately.
+
+        Arguments
+        ---------
+        deck : int
+            The index of the deck.
+
+        Returns
+        -------
+        np.ndarray: The fitted beam displacement on the linear space of x values of the deck, None if the deck has less than 3 points.
+        """
+        points = slice(self.starts[deck], self.starts[deck] + self.counts[deck])
+        return NS_Solver.beam_solution(self.ndist[points], self.disp[points], self.deck_length[deck], self.span_count[deck], self._quadratic_x()[deck])
+
+
 class EW_Solver:
     """
     A class to solve the longitudinal and vertical displacement of a bridge deck using ascending and descending displacement data.